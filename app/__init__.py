@@ -8,22 +8,128 @@ from app.models import db
 
 def create_app():
     """Create and configure the Flask application."""
+    import os
     app = Flask(__name__)
-    app.config['SECRET_KEY'] = 'dev-secret-key-change-in-production'
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
     
     # Database configuration
-    import os
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///attendance.db?timeout=20')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # SQLite engine profile ('tuned' enables WAL + lock retries, 'default' leaves SQLite as-is)
+    app.config['SQLITE_ENGINE_PROFILE'] = os.environ.get('SQLITE_ENGINE_PROFILE', 'tuned')
+    app.config['SQLITE_WRITE_RETRIES'] = int(os.environ.get('SQLITE_WRITE_RETRIES', 5))
+    app.config['SQLITE_RETRY_BASE_DELAY'] = float(os.environ.get('SQLITE_RETRY_BASE_DELAY', 0.05))
+    
+    # Write-behind scan queue (off by default; accepted scans are journaled and committed in batches)
+    app.config['SCAN_WRITE_BEHIND'] = os.environ.get('SCAN_WRITE_BEHIND', '0') == '1'
+    app.config['SCAN_JOURNAL_DIR'] = os.environ.get('SCAN_JOURNAL_DIR')
+    app.config['SCAN_JOURNAL_FSYNC'] = os.environ.get('SCAN_JOURNAL_FSYNC', 'batch')  # always | batch | never
+    app.config['SCAN_FLUSH_INTERVAL'] = float(os.environ.get('SCAN_FLUSH_INTERVAL', 0.25))
+    app.config['SCAN_FLUSH_BATCH_SIZE'] = int(os.environ.get('SCAN_FLUSH_BATCH_SIZE', 500))
+    
+    # Scan event journal: every scan decision, appended in the background to segmented NDJSON files
+    app.config['SCAN_EVENTS_ENABLED'] = os.environ.get('SCAN_EVENTS_ENABLED', '1') == '1'
+    app.config['SCAN_EVENTS_DIR'] = os.environ.get('SCAN_EVENTS_DIR')
+    app.config['SCAN_EVENTS_SEGMENT_BYTES'] = int(os.environ.get('SCAN_EVENTS_SEGMENT_MB', 8)) * 1024 * 1024
+    app.config['SCAN_EVENTS_FSYNC'] = os.environ.get('SCAN_EVENTS_FSYNC', 'batch')  # batch | never
+    
+    # Scan rate limiting (token bucket per scanner session, debounce per student)
+    app.config['SCAN_RATE_LIMIT_ENABLED'] = os.environ.get('SCAN_RATE_LIMIT_ENABLED', '1') == '1'
+    app.config['SCAN_RATE_LIMIT_PER_SECOND'] = float(os.environ.get('SCAN_RATE_LIMIT_PER_SECOND', 5))
+    app.config['SCAN_RATE_LIMIT_BURST'] = int(os.environ.get('SCAN_RATE_LIMIT_BURST', 10))
+    app.config['SCAN_DEBOUNCE_SECONDS'] = float(os.environ.get('SCAN_DEBOUNCE_SECONDS', 2))
+    
+    # OTP store ('memory' is per worker; 'sqlite' shares a separate file across workers)
+    app.config['OTP_STORE'] = os.environ.get('OTP_STORE', 'memory')
+    app.config['OTP_STORE_PATH'] = os.environ.get('OTP_STORE_PATH')
+    app.config['OTP_TTL_SECONDS'] = int(os.environ.get('OTP_TTL_SECONDS', 300))
+    app.config['OTP_MAX_ATTEMPTS'] = int(os.environ.get('OTP_MAX_ATTEMPTS', 5))
+    
+    # Headcount result cache keyed by upload hash ('disk' shares results across workers, 'memory', 'off')
+    app.config['HEADCOUNT_CACHE'] = os.environ.get('HEADCOUNT_CACHE', 'disk')
+    app.config['HEADCOUNT_CACHE_PATH'] = os.environ.get('HEADCOUNT_CACHE_PATH')
+    app.config['HEADCOUNT_CACHE_SIZE'] = int(os.environ.get('HEADCOUNT_CACHE_SIZE', 128))
+    app.config['HEADCOUNT_CACHE_DISK_SIZE'] = int(os.environ.get('HEADCOUNT_CACHE_DISK_SIZE', 1024))
+    
+    # Headcount run history (written asynchronously to headcount_runs)
+    app.config['HEADCOUNT_HISTORY_ENABLED'] = os.environ.get('HEADCOUNT_HISTORY_ENABLED', '1') == '1'
+    
+    # Headcount detector backend (haar | lbp | dnn; classrooms may override) and model files
+    app.config['HEADCOUNT_DETECTOR'] = os.environ.get('HEADCOUNT_DETECTOR', 'haar')
+    # An explicitly chosen backend must load at startup; the implicit default only warns
+    app.config['HEADCOUNT_DETECTOR_REQUIRED'] = 'HEADCOUNT_DETECTOR' in os.environ
+    app.config['HEADCOUNT_MODELS_DIR'] = os.environ.get('HEADCOUNT_MODELS_DIR')  # Default: models/
+    app.config['HEADCOUNT_HAAR_CASCADE'] = os.environ.get('HEADCOUNT_HAAR_CASCADE')
+    app.config['HEADCOUNT_LBP_CASCADE'] = os.environ.get('HEADCOUNT_LBP_CASCADE')
+    app.config['HEADCOUNT_DNN_MODEL'] = os.environ.get('HEADCOUNT_DNN_MODEL')
+    
+    # Headcount image ingest: per-image size limit and the long side images are decoded down to
+    app.config['HEADCOUNT_MAX_IMAGE_BYTES'] = int(os.environ.get('HEADCOUNT_MAX_IMAGE_MB', 10)) * 1024 * 1024
+    app.config['HEADCOUNT_WORKING_SIZE'] = int(os.environ.get('HEADCOUNT_WORKING_SIZE', 1280))
+    
+    # Multi-frame headcount (clips and frame bursts); clips may need a larger upload limit
+    if os.environ.get('MAX_UPLOAD_MB'):
+        app.config['MAX_CONTENT_LENGTH'] = int(os.environ['MAX_UPLOAD_MB']) * 1024 * 1024
+    app.config['HEADCOUNT_FRAME_STRIDE'] = int(os.environ.get('HEADCOUNT_FRAME_STRIDE', 5))
+    app.config['HEADCOUNT_MAX_FRAMES'] = int(os.environ.get('HEADCOUNT_MAX_FRAMES', 60))
+    app.config['HEADCOUNT_WORKERS'] = int(os.environ.get('HEADCOUNT_WORKERS', 2))
+    app.config['HEADCOUNT_AGGREGATE'] = os.environ.get('HEADCOUNT_AGGREGATE', 'median')  # median | max_consensus
+    
+    # Scanner sessions: lifetime of a signed scanner-to-classroom token
+    app.config['SCANNER_TOKEN_TTL_SECONDS'] = int(os.environ.get('SCANNER_TOKEN_TTL_SECONDS', 12 * 60 * 60))
+    # Offline-queued scans carry their capture time; it is accepted within this many seconds
+    # of the token's lifetime and of the session window (clock skew, scans at the bell)
+    app.config['SCAN_CAPTURE_GRACE_SECONDS'] = int(os.environ.get('SCAN_CAPTURE_GRACE_SECONDS', 120))
+    
+    # Student QR codes: sign new codes, accept plain-id codes until a cutoff date (YYYY-MM-DD,
+    # unset = indefinitely), and reject signed codes issued before an epoch (revocation)
+    app.config['QR_SIGNED'] = os.environ.get('QR_SIGNED', '0') == '1'
+    app.config['QR_PLAIN_ACCEPTED_UNTIL'] = os.environ.get('QR_PLAIN_ACCEPTED_UNTIL')
+    app.config['QR_MIN_ISSUED_AT'] = int(os.environ.get('QR_MIN_ISSUED_AT', 0))
+    # Key for QR codes and scanner tokens; unset when only the built-in (public) SECRET_KEY is available
+    app.config['QR_SECRET_KEY'] = os.environ.get('QR_SECRET_KEY') or os.environ.get('SECRET_KEY')
+    
+    # Cold attendance archive: per-term SQLite files (term starts as MM-DD, comma-separated)
+    app.config['ARCHIVE_DIR'] = os.environ.get('ARCHIVE_DIR')
+    app.config['ARCHIVE_TERM_STARTS'] = os.environ.get('ARCHIVE_TERM_STARTS', '01-01,07-01')
+    app.config['ARCHIVE_CHUNK_SIZE'] = int(os.environ.get('ARCHIVE_CHUNK_SIZE', 1000))
+    
+    # Compiled timetable: full rebuild interval (picks up edits made by other workers)
+    app.config['TIMETABLE_REFRESH_SECONDS'] = int(os.environ.get('TIMETABLE_REFRESH_SECONDS', 60))
+    
+    # Read engine: a replica URL, or a snapshot copy of the SQLite primary refreshed every N seconds
+    # (0 = off). Endpoints that opt into read-your-writes read the primary for a while after a write.
+    app.config['DATABASE_READ_URL'] = os.environ.get('DATABASE_READ_URL')
+    app.config['READ_SNAPSHOT_SECONDS'] = int(os.environ.get('READ_SNAPSHOT_SECONDS', 0))
+    app.config['READ_SNAPSHOT_PATH'] = os.environ.get('READ_SNAPSHOT_PATH')
+    app.config['READ_YOUR_WRITES_SECONDS'] = float(os.environ.get('READ_YOUR_WRITES_SECONDS',
+                                                                  max(5, app.config['READ_SNAPSHOT_SECONDS'])))
+    
     # Initialize database
     db.init_app(app)
     
+    # Read engine for @use_read_replica queries (replica URL or snapshot file)
+    from app.read_routing import init_read_engine
+    init_read_engine(app)
+    
     # Create tables
     with app.app_context():
+        # Engine PRAGMAs must be registered before the first connection is opened
+        from app.db_engine import init_engine_profile
+        init_engine_profile(app)
+        
         db.create_all()
         
+        # Add indexes/columns introduced after the tables were first created
+        from app.schema import ensure_schema
+        ensure_schema()
+        
+        # Student full-text search index (kept in sync by ORM events from here on)
+        from app.student_search import student_search
+        student_search.init_app(app)
+        
         # Auto-Seed Logic
         from app.models import User
         try:
@@ -36,6 +142,75 @@ def create_app():
                 print("Database seeded automatically!")
         except Exception as e:
             print(f"Error during auto-seeding: {e}")
+        
+        # Take the first read snapshot (after seeding, so it has the schema and seed data)
+        from app.read_routing import read_snapshot
+        read_snapshot.init_app(app)
+        
+        # Compile the weekly timetable for active-session lookups
+        from app.timetable import timetable
+        timetable.init_app(app)
+        
+        # Build enrollment/present counters for databases that predate them
+        # (before journal replay, which increments them)
+        from app.counters import init_counters
+        init_counters(app)
+        
+        # Build attendance bitmaps for databases that predate them (before journal replay, which sets bits)
+        from app.attendance_bitmap import init_bitmaps
+        init_bitmaps(app)
+        
+        # Start the write-behind flusher (replays journals left by a previous run)
+        from app.scan_queue import scan_queue
+        scan_queue.init_app(app)
+        
+        # Start the background writer for headcount run history
+        from app.headcount_runs import headcount_runs
+        headcount_runs.init_app(app)
+        
+        # Warm the duplicate-scan set from today's records (after replay so it sees them)
+        from app.scan_dedupe import scan_dedupe
+        scan_dedupe.init_app(app)
+    
+    # Configure the OTP store
+    from app.otp_store import otp_store
+    otp_store.init_app(app)
+    
+    # Configure scanner session tokens
+    from app.scanner_tokens import scanner_tokens
+    scanner_tokens.init_app(app)
+    
+    # Configure student QR signing
+    from app.qr_payload import qr_codec
+    qr_codec.init_app(app)
+    
+    # Configure headcount detector backends
+    from app.headcount_detector import headcount_detectors
+    headcount_detectors.init_app(app)
+    
+    # Configure headcount image ingest
+    from app.image_ingest import image_ingest
+    image_ingest.init_app(app)
+    
+    # Configure the headcount result cache
+    from app.headcount_cache import headcount_cache
+    headcount_cache.init_app(app)
+    
+    # Configure multi-frame headcount sampling
+    from app.headcount_frames import frame_headcounter
+    frame_headcounter.init_app(app)
+    
+    # Configure scan rate limits
+    from app.rate_limit import scan_rate_limiter
+    scan_rate_limiter.init_app(app)
+    
+    # Configure the cold attendance archive
+    from app.archive import attendance_archive
+    attendance_archive.init_app(app)
+    
+    # Start the scan event journal writer
+    from app.scan_events import scan_events
+    scan_events.init_app(app)
     
     # Register routes
     register_routes(app)
@@ -0,0 +1,230 @@
+"""
+Per-term cold storage for attendance_records.
+archive_attendance.py moves records older than the current term into one SQLite
+file per term (attendance-<term start>.db), in chunked transactions so scans keep
+committing while it runs. Reads of archived days attach the term files to the
+main connection and UNION them with the hot table, so callers get the same
+record dicts either way. The hot table only holds the current term.
+"""
+import os
+import time as time_module
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, delete, insert, select, union_all
+
+from app.models import db, AttendanceRecord
+
+# Attached archives are named archive_0, archive_1, ... on the connection that reads them
+_SCHEMA_PREFIX = 'archive_'
+_COLUMNS = ('id', 'student_id', 'classroom_id', 'session_id', 'timestamp', 'status',
+            'ai_headcount', 'qr_scan_count', 'created_at')
+
+
+def parse_term_starts(value: str) -> List[Tuple[int, int]]:
+    """Parse 'MM-DD,MM-DD' term start days. Raises ValueError if one is not a valid day."""
+    starts = []
+    for part in value.split(','):
+        month, day = (int(p) for p in part.strip().split('-'))
+        date(2000, month, day)  # Validates (2000 is a leap year, so 02-29 is accepted)
+        starts.append((month, day))
+    if not starts:
+        raise ValueError("At least one term start is required")
+    return sorted(set(starts))
+
+
+def _archive_table(schema: str) -> Table:
+    """attendance_records as stored in an archive file (no foreign keys, the parent tables stay hot)."""
+    return Table(
+        'attendance_records', MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column('student_id', String(50), nullable=False),
+        Column('classroom_id', String(50), nullable=False),
+        Column('session_id', Integer),
+        Column('timestamp', DateTime, nullable=False),
+        Column('status', String(20), nullable=False),
+        Column('ai_headcount', Integer),
+        Column('qr_scan_count', Integer),
+        Column('created_at', DateTime),
+        Index('ix_archive_classroom_timestamp', 'classroom_id', 'timestamp', 'id'),
+        schema=schema
+    )
+
+
+def _record_dict(row) -> Dict:
+    """Same shape as AttendanceRecord.to_dict()."""
+    record = dict(row._mapping)
+    for key in ('timestamp', 'created_at'):
+        record[key] = record[key].isoformat() if record[key] else None
+    return record
+
+
+class AttendanceArchive:
+    """Moves old attendance into per-term SQLite files and reads across them."""
+
+    def __init__(self):
+        self.directory = None
+        self.term_starts = [(1, 1), (7, 1)]
+        self.chunk_size = 1000
+
+    def init_app(self, app):
+        """Configure the archive directory, term boundaries and chunk size."""
+        self.directory = app.config.get('ARCHIVE_DIR') or os.path.join(app.instance_path, 'archive')
+        self.term_starts = parse_term_starts(app.config.get('ARCHIVE_TERM_STARTS', '01-01,07-01'))
+        self.chunk_size = app.config.get('ARCHIVE_CHUNK_SIZE', 1000)
+
+    # Terms
+
+    def term_start(self, day: date) -> date:
+        """First day of the term containing day."""
+        candidates = [date(day.year, m, d) for m, d in self.term_starts if (m, d) <= (day.month, day.day)]
+        if candidates:
+            return candidates[-1]
+        month, last_day = self.term_starts[-1]
+        return date(day.year - 1, month, last_day)
+
+    def next_term_start(self, term_start: date) -> date:
+        """First day of the term after the one starting on term_start."""
+        for month, day in self.term_starts:
+            if (month, day) > (term_start.month, term_start.day):
+                return date(term_start.year, month, day)
+        month, day = self.term_starts[0]
+        return date(term_start.year + 1, month, day)
+
+    def current_term_start(self) -> date:
+        """The default archive cutoff: everything before the current term is cold."""
+        return self.term_start(datetime.now(pytz.timezone('Asia/Kolkata')).date())
+
+    def path_for(self, term_start: date) -> str:
+        return os.path.join(self.directory, f'attendance-{term_start.isoformat()}.db')
+
+    def archived_terms(self) -> List[date]:
+        """Start days of the terms that have an archive file, oldest first."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        terms = []
+        for name in os.listdir(self.directory):
+            if name.startswith('attendance-') and name.endswith('.db'):
+                try:
+                    terms.append(date.fromisoformat(name[len('attendance-'):-len('.db')]))
+                except ValueError:
+                    continue
+        return sorted(terms)
+
+    def is_archived(self, day: date) -> bool:
+        """Whether records for day may be in an archive file (one stat call)."""
+        return self.directory is not None and os.path.exists(self.path_for(self.term_start(day)))
+
+    def oldest_hot_day(self) -> Optional[date]:
+        """The first day still in attendance_records once anything has been archived, else None."""
+        if not self.archived_terms():
+            return None
+        oldest = db.session.query(db.func.min(AttendanceRecord.timestamp)).scalar()
+        return oldest.date() if oldest else self.current_term_start()
+
+    # Moving
+
+    def archive(self, before: Optional[date] = None, chunk_size: Optional[int] = None,
+                pause: float = 0.0) -> Dict[str, int]:
+        """
+        Move records with a timestamp before `before` (default: the current term start) into
+        their term's archive file, chunk_size records per transaction, sleeping `pause` seconds
+        between chunks. Rows are copied with INSERT OR IGNORE before they are deleted, so a run
+        interrupted between the two is finished by the next one.
+        Returns {term start iso: records moved}. Needs an app context.
+        """
+        before = before or self.current_term_start()
+        chunk_size = chunk_size or self.chunk_size
+        os.makedirs(self.directory, exist_ok=True)
+        cutoff = datetime.combine(before, datetime.min.time())
+        hot = AttendanceRecord.__table__
+        moved: Dict[str, int] = {}
+
+        # Nothing may hold a transaction on the shared connection while archives are attached
+        db.session.commit()
+        with db.engine.connect() as conn:
+            while True:
+                oldest = conn.execute(select(db.func.min(hot.c.timestamp)).where(hot.c.timestamp < cutoff)).scalar()
+                conn.commit()
+                if oldest is None:
+                    break
+
+                term = self.term_start(oldest.date())
+                term_cutoff = min(cutoff, datetime.combine(self.next_term_start(term), datetime.min.time()))
+                schema = f'{_SCHEMA_PREFIX}0'
+                archive = _archive_table(schema)
+                conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (self.path_for(term),))
+                try:
+                    archive.create(conn, checkfirst=True)
+                    conn.commit()
+                    count = 0
+                    while True:
+                        ids = conn.execute(
+                            select(hot.c.id).where(hot.c.timestamp < term_cutoff).order_by(hot.c.id).limit(chunk_size)
+                        ).scalars().all()
+                        if not ids:
+                            break
+                        conn.execute(insert(archive).prefix_with('OR IGNORE').from_select(
+                            list(_COLUMNS), select(*(hot.c[name] for name in _COLUMNS)).where(hot.c.id.in_(ids))
+                        ))
+                        conn.execute(delete(hot).where(hot.c.id.in_(ids)))
+                        conn.commit()
+                        count += len(ids)
+                        if pause:
+                            time_module.sleep(pause)
+                finally:
+                    conn.rollback()
+                    conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+                    conn.commit()
+
+                moved[term.isoformat()] = count
+                print(f"[ARCHIVE] Moved {count} record(s) to {self.path_for(term)}")
+        return moved
+
+    # Reading
+
+    def records_between(self, classroom_id: str, start: date, end: date) -> List[Dict]:
+        """
+        A classroom's attendance records from start to end (inclusive), newest first, read from
+        the hot table and every archive file whose term overlaps the range. Needs an app context.
+        """
+        terms = [term for term in self.archived_terms() if term <= end and self.next_term_start(term) > start]
+        range_start = datetime.combine(start, datetime.min.time())
+        range_end = datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+        def _select(table):
+            return select(*(table.c[name] for name in _COLUMNS)).where(
+                table.c.classroom_id == classroom_id,
+                table.c.timestamp >= range_start,
+                table.c.timestamp < range_end
+            )
+
+        if not terms:
+            rows = db.session.execute(_select(AttendanceRecord.__table__).order_by(
+                AttendanceRecord.timestamp.desc(), AttendanceRecord.id.desc())).all()
+            return [_record_dict(row) for row in rows]
+
+        db.session.commit()
+        with db.engine.connect() as conn:
+            schemas = []
+            try:
+                for i, term in enumerate(terms):
+                    schema = f'{_SCHEMA_PREFIX}{i}'
+                    conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (self.path_for(term),))
+                    schemas.append(schema)
+                combined = union_all(
+                    _select(AttendanceRecord.__table__),
+                    *(_select(_archive_table(schema)) for schema in schemas)
+                ).subquery()
+                rows = conn.execute(select(combined).order_by(combined.c.timestamp.desc(), combined.c.id.desc())).all()
+            finally:
+                conn.rollback()
+                for schema in schemas:
+                    conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+                conn.commit()
+        return [_record_dict(row) for row in rows]
+
+
+# Global instance
+attendance_archive = AttendanceArchive()
@@ -0,0 +1,246 @@
+"""
+Bitset attendance per classroom and day.
+Every student gets a dense bit position per classroom (ClassroomMember), and each
+classroom-day stores who attended as a packed bitset (AttendanceBitmap). The
+enrollment and attendance write paths maintain both inside their own transactions,
+so set questions (who is absent, who attended every day of a term, streaks,
+overlap between sections) become NumPy operations over a few rows instead of
+joins over attendance_records. Bitmaps are not archived, so term-long queries
+also cover archived terms. rebuild_bitmaps() recomputes them from the source tables.
+"""
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+
+from app.counters import ON_CONFLICT_INSERTS
+from app.models import db, AttendanceBitmap, AttendanceRecord, ClassroomMember, enrollment_table
+
+
+def _insert_ignore(table, values: Dict, index_elements):
+    """INSERT ... ON CONFLICT DO NOTHING, on the session's connection."""
+    insert = ON_CONFLICT_INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        db.session.execute(insert(table).values(**values).on_conflict_do_nothing(index_elements=index_elements))
+        return
+
+    key = [table.c[name] == values[name] for name in index_elements]
+    if db.session.query(table).filter(*key).first() is not None:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(**values))
+    except IntegrityError:
+        pass  # Another transaction inserted the row first
+
+
+def member_bit(classroom_id: str, student_id: str) -> int:
+    """
+    A student's bit in a classroom, assigned on first use. Runs in the caller's transaction;
+    the caller commits. Callers bump a counter row first, which serializes assignments
+    (SQLite's write lock, the counter row lock on PostgreSQL); the unique (classroom_id, bit)
+    index turns any remaining race into a retryable error instead of a shared bit.
+    """
+    bit = db.session.query(ClassroomMember.bit).filter(
+        ClassroomMember.classroom_id == classroom_id,
+        ClassroomMember.student_id == student_id
+    ).scalar()
+    if bit is not None:
+        return bit
+
+    bit = db.session.query(db.func.coalesce(db.func.max(ClassroomMember.bit) + 1, 0)).filter(
+        ClassroomMember.classroom_id == classroom_id
+    ).scalar()
+    db.session.add(ClassroomMember(classroom_id=classroom_id, student_id=student_id, bit=bit))
+    db.session.flush()
+    return bit
+
+
+def set_present(classroom_id: str, student_id: str, day: date):
+    """Set a student's bit in a classroom-day bitmap. Runs in the caller's transaction; the caller commits."""
+    bit = member_bit(classroom_id, student_id)
+    _insert_ignore(AttendanceBitmap.__table__, {'classroom_id': classroom_id, 'day': day, 'bits': b''},
+                   ['classroom_id', 'day'])
+    row = db.session.query(AttendanceBitmap).filter(
+        AttendanceBitmap.classroom_id == classroom_id,
+        AttendanceBitmap.day == day
+    ).with_for_update().one()
+
+    bits = bytearray(row.bits or b'')
+    if len(bits) <= bit >> 3:
+        bits.extend(bytes((bit >> 3) + 1 - len(bits)))
+    bits[bit >> 3] |= 1 << (bit & 7)
+    row.bits = bytes(bits)
+
+
+def _members(classroom_id: str) -> np.ndarray:
+    """Student ids of a classroom indexed by bit (None for a gap)."""
+    rows = db.session.query(ClassroomMember.bit, ClassroomMember.student_id).filter(
+        ClassroomMember.classroom_id == classroom_id
+    ).all()
+    members = np.full(max((bit for bit, _ in rows), default=-1) + 1, None, dtype=object)
+    for bit, student_id in rows:
+        members[bit] = student_id
+    return members
+
+
+def _enrolled(classroom_id: str, width: int) -> Tuple[np.ndarray, List[str]]:
+    """Mask of currently enrolled bits, and enrolled students that have no bit yet."""
+    rows = db.session.query(enrollment_table.c.student_id, ClassroomMember.bit).outerjoin(
+        ClassroomMember,
+        (ClassroomMember.classroom_id == enrollment_table.c.classroom_id)
+        & (ClassroomMember.student_id == enrollment_table.c.student_id)
+    ).filter(enrollment_table.c.classroom_id == classroom_id).all()
+    mask = np.zeros(width, dtype=bool)
+    mask[[bit for _, bit in rows if bit is not None]] = True
+    return mask, sorted(student_id for student_id, bit in rows if bit is None)
+
+
+def load_matrix(classroom_id: str, start: date, end: date) -> Tuple[List[date], np.ndarray, np.ndarray]:
+    """
+    A classroom's bitmaps from start to end (inclusive) as (days, members, matrix), where
+    matrix[d, b] is True if members[b] attended on days[d]. Only days with at least one
+    attendance (days the class met) have a row.
+    """
+    members = _members(classroom_id)
+    rows = db.session.query(AttendanceBitmap.day, AttendanceBitmap.bits).filter(
+        AttendanceBitmap.classroom_id == classroom_id,
+        AttendanceBitmap.day >= start,
+        AttendanceBitmap.day <= end
+    ).order_by(AttendanceBitmap.day).all()
+
+    width_bytes = (len(members) + 7) // 8
+    packed = np.zeros((len(rows), width_bytes), dtype=np.uint8)
+    for i, (_, bits) in enumerate(rows):
+        # Bitmaps written before later members joined are shorter; the missing bits are 0
+        bits = bits[:width_bytes]
+        packed[i, :len(bits)] = np.frombuffer(bits, dtype=np.uint8)
+    matrix = np.unpackbits(packed, axis=1, count=len(members), bitorder='little').astype(bool)
+    return [day for day, _ in rows], members, matrix
+
+
+def present_students(classroom_id: str, day: date) -> List[str]:
+    """Students with attendance in a classroom on a day, sorted."""
+    _, members, matrix = load_matrix(classroom_id, day, day)
+    if not len(matrix):
+        return []
+    return sorted(members[matrix[0]])
+
+
+def absent_students(classroom_id: str, day: date) -> List[str]:
+    """Currently enrolled students without attendance in a classroom on a day, sorted."""
+    _, members, matrix = load_matrix(classroom_id, day, day)
+    enrolled, unindexed = _enrolled(classroom_id, len(members))
+    present = matrix[0] if len(matrix) else np.zeros(len(members), dtype=bool)
+    return sorted(list(members[enrolled & ~present]) + unindexed)
+
+
+def attendance_streaks(classroom_id: str, start: date, end: date) -> Dict:
+    """
+    Per enrolled student over the days the class met between start and end: days present,
+    whether they attended every one, and their current and longest run of consecutive
+    attended days. Returns {'days': [...], 'students': {student_id: {...}}}.
+    """
+    days, members, matrix = load_matrix(classroom_id, start, end)
+    enrolled, unindexed = _enrolled(classroom_id, len(members))
+
+    # One pass over days, vectorized across students
+    run = np.zeros(len(members), dtype=np.int32)
+    longest = np.zeros(len(members), dtype=np.int32)
+    for row in matrix:
+        run = (run + 1) * row
+        np.maximum(longest, run, out=longest)
+    present = matrix.sum(axis=0, dtype=np.int32)
+
+    students = {}
+    for bit in np.flatnonzero(enrolled):
+        students[members[bit]] = {
+            'days_present': int(present[bit]),
+            'attended_all': bool(days) and int(present[bit]) == len(days),
+            'current_streak': int(run[bit]),
+            'longest_streak': int(longest[bit])
+        }
+    for student_id in unindexed:
+        students[student_id] = {'days_present': 0, 'attended_all': False, 'current_streak': 0, 'longest_streak': 0}
+
+    return {'days': [day.isoformat() for day in days], 'students': students}
+
+
+def attendance_overlap(classroom_ids: List[str], day: date) -> List[str]:
+    """Students with attendance in every one of the given classrooms on a day, sorted."""
+    overlap = None
+    for classroom_id in classroom_ids:
+        present = np.array(present_students(classroom_id, day), dtype=object)
+        overlap = present if overlap is None else np.intersect1d(overlap, present)
+    return sorted(overlap) if overlap is not None else []
+
+
+def rebuild_bitmaps(keep_before: Optional[date] = None) -> Dict[str, int]:
+    """
+    Recompute bitmaps from enrollments and attendance_records in one transaction, keeping existing
+    bit assignments. Bitmaps before keep_before are left as they are (their records have been archived).
+    """
+    try:
+        bitmaps = db.session.query(AttendanceBitmap)
+        if keep_before is not None:
+            bitmaps = bitmaps.filter(AttendanceBitmap.day >= keep_before)
+        bitmaps.delete()
+
+        members = {
+            (classroom_id, student_id): bit
+            for classroom_id, student_id, bit in db.session.query(
+                ClassroomMember.classroom_id, ClassroomMember.student_id, ClassroomMember.bit
+            )
+        }
+        next_bit = {}
+        for (classroom_id, _), bit in members.items():
+            next_bit[classroom_id] = max(next_bit.get(classroom_id, 0), bit + 1)
+
+        def bit_for(classroom_id, student_id):
+            key = (classroom_id, student_id)
+            if key not in members:
+                members[key] = next_bit.get(classroom_id, 0)
+                next_bit[classroom_id] = members[key] + 1
+                db.session.add(ClassroomMember(classroom_id=classroom_id, student_id=student_id, bit=members[key]))
+            return members[key]
+
+        for student_id, classroom_id in db.session.query(
+            enrollment_table.c.student_id, enrollment_table.c.classroom_id
+        ).order_by(enrollment_table.c.classroom_id, enrollment_table.c.enrolled_at, enrollment_table.c.student_id):
+            bit_for(classroom_id, student_id)
+
+        day_expr = db.func.date(AttendanceRecord.timestamp)
+        present_query = db.session.query(AttendanceRecord.classroom_id, day_expr, AttendanceRecord.student_id).distinct()
+        if keep_before is not None:
+            present_query = present_query.filter(AttendanceRecord.timestamp >= datetime.combine(keep_before, time.min))
+        present_bits: Dict[Tuple[str, date], List[int]] = {}
+        for classroom_id, day, student_id in present_query:
+            day = day if isinstance(day, date) else date.fromisoformat(day)
+            present_bits.setdefault((classroom_id, day), []).append(bit_for(classroom_id, student_id))
+
+        for (classroom_id, day), bits in present_bits.items():
+            row = np.zeros(max(bits) + 1, dtype=bool)
+            row[bits] = True
+            db.session.add(AttendanceBitmap(classroom_id=classroom_id, day=day,
+                                            bits=np.packbits(row, bitorder='little').tobytes()))
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    print(f"[BITMAPS] Rebuilt {len(present_bits)} classroom-day bitmap(s) over {len(members)} member(s)")
+    return {'members': len(members), 'bitmaps': len(present_bits)}
+
+
+def init_bitmaps(app):
+    """Build bitmaps on first run against a database that already has enrollments or attendance."""
+    if db.session.query(ClassroomMember.classroom_id).first() is not None:
+        return
+    has_data = (
+        db.session.query(enrollment_table.c.classroom_id).first() is not None
+        or db.session.query(AttendanceRecord.id).first() is not None
+    )
+    if has_data:
+        rebuild_bitmaps()
@@ -2,16 +2,28 @@
 Database-backed attendance management system.
 Handles student enrollment, time windows, and attendance tracking using SQLite.
 """
-from datetime import datetime, time, date
-from typing import Dict, List, Optional
+from datetime import datetime, time, date, timedelta
+from typing import Dict, List, Optional, Tuple
 from flask import current_app
 import pytz
-from app.models import db, Student, Classroom, AttendanceRecord, enrollment_table
+from sqlalchemy import and_, or_, select
+from app.models import db, User, Student, Classroom, ClassSession, AttendanceRecord, enrollment_table
+from app.pagination import DEFAULT_PAGE_SIZE, encode_cursor
+from app.db_engine import retry_on_lock
+from app.scan_queue import scan_queue
+from app.scan_dedupe import scan_dedupe
+from app.counters import increment_enrolled, increment_present, get_classroom_counts
+from app.attendance_bitmap import member_bit, set_present
+from app.timetable import timetable, SessionSlot
+from app.roster import record_roster_change
+from app.archive import attendance_archive
+from app.read_routing import use_read_replica
 
 
 class AttendanceManager:
     """Manages students, classes, enrollments, and attendance records using database."""
     
+    @retry_on_lock
     def add_student(self, student_id: str, name: str, **kwargs):
         """Register a new student."""
         with current_app.app_context():
@@ -33,12 +45,14 @@ class AttendanceManager:
             
             db.session.commit()
     
+    @retry_on_lock
     def add_classroom(self, classroom_id: str, name: str, 
                      time_window_start: str = "08:00", 
                      time_window_end: str = "18:00",
                      subject: Optional[str] = None,
-                     department: Optional[str] = None):
-        """Register a new classroom with time window for attendance."""
+                     department: Optional[str] = None,
+                     detector_backend: Optional[str] = None):
+        """Register a new classroom with time window for attendance (and optionally its headcount detector)."""
         with current_app.app_context():
             # Parse time strings to Time objects
             start_hour, start_min = map(int, time_window_start.split(':'))
@@ -57,6 +71,8 @@ class AttendanceManager:
                     classroom.subject = subject
                 if department:
                     classroom.department = department
+                if detector_backend:
+                    classroom.detector_backend = detector_backend
             else:
                 # Create new classroom
                 classroom = Classroom(
@@ -65,12 +81,56 @@ class AttendanceManager:
                     time_window_start=start_time,
                     time_window_end=end_time,
                     subject=subject,
-                    department=department
+                    department=department,
+                    detector_backend=detector_backend
                 )
                 db.session.add(classroom)
             
             db.session.commit()
     
+    def get_sessions(self, classroom_id: str) -> List[Dict]:
+        """Get a classroom's timetable sessions ordered by weekday and start time."""
+        with current_app.app_context():
+            sessions = ClassSession.query.filter_by(classroom_id=classroom_id).order_by(
+                ClassSession.day_of_week, ClassSession.start_time
+            ).all()
+            return [session.to_dict() for session in sessions]
+    
+    @retry_on_lock
+    def add_session(self, classroom_id: str, **fields) -> Optional[Dict]:
+        """Add a weekly session to a classroom's timetable. Returns None if the classroom does not exist."""
+        with current_app.app_context():
+            if not db.session.get(Classroom, classroom_id):
+                return None
+            session = ClassSession(classroom_id=classroom_id, **fields)
+            db.session.add(session)
+            db.session.commit()
+            return session.to_dict()
+    
+    @retry_on_lock
+    def update_session(self, session_id: int, **fields) -> Optional[Dict]:
+        """Replace a session's slot and term. Returns None if the session does not exist."""
+        with current_app.app_context():
+            session = db.session.get(ClassSession, session_id)
+            if not session:
+                return None
+            for key, value in fields.items():
+                setattr(session, key, value)
+            db.session.commit()
+            return session.to_dict()
+    
+    @retry_on_lock
+    def delete_session(self, session_id: int) -> bool:
+        """Remove a session from the timetable; its attendance records keep their session_id."""
+        with current_app.app_context():
+            session = db.session.get(ClassSession, session_id)
+            if not session:
+                return False
+            db.session.delete(session)
+            db.session.commit()
+            return True
+    
+    @retry_on_lock
     def enroll_student(self, student_id: str, classroom_id: str) -> bool:
         """Enroll a student in a classroom."""
         with current_app.app_context():
@@ -86,6 +146,28 @@ class AttendanceManager:
             
             # Add enrollment
             student.enrollments.append(classroom)
+            db.session.flush()
+            increment_enrolled(classroom_id)
+            member_bit(classroom_id, student_id)
+            record_roster_change(classroom_id, student_id, 'add')
+            db.session.commit()
+            
+            return True
+    
+    @retry_on_lock
+    def unenroll_student(self, student_id: str, classroom_id: str) -> bool:
+        """Remove a student from a classroom. Returns False if they were not enrolled."""
+        with current_app.app_context():
+            student = db.session.get(Student, student_id)
+            classroom = db.session.get(Classroom, classroom_id)
+            
+            if not student or not classroom or classroom not in student.enrollments:
+                return False
+            
+            student.enrollments.remove(classroom)
+            db.session.flush()
+            increment_enrolled(classroom_id, -1)
+            record_roster_change(classroom_id, student_id, 'remove')
             db.session.commit()
             
             return True
@@ -118,38 +200,28 @@ class AttendanceManager:
             return is_enrolled
     
     def is_within_time_window(self, classroom_id: str, current_time: Optional[datetime] = None) -> bool:
-        """Check if current time is within the attendance time window for a classroom."""
+        """Check if a classroom has a session (or its daily window) open at the given time."""
         with current_app.app_context():
             print(f"[TIME_WINDOW] Checking time window for classroom_id='{classroom_id}'")
             
-            classroom = Classroom.query.get(classroom_id)
-            if not classroom:
-                print(f"[TIME_WINDOW] Classroom '{classroom_id}' not found in database")
-                return False
-            
             if current_time is None:
                 current_time = datetime.now(pytz.timezone('Asia/Kolkata'))
             
-            current_time_only = current_time.time()
-            start_time = classroom.time_window_start
-            end_time = classroom.time_window_end
+            slot = timetable.resolve(classroom_id, current_time)
+            print(f"[TIME_WINDOW] Current time: {current_time.strftime('%H:%M:%S')}")
             
-            print(f"[TIME_WINDOW] Current time: {current_time_only.strftime('%H:%M:%S')}")
-            print(f"[TIME_WINDOW] Window: {start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}")
-            
-            is_within = start_time <= current_time_only <= end_time
-            
-            if is_within:
-                print(f"[TIME_WINDOW] Current time IS within window")
+            if slot is not None:
+                print(f"[TIME_WINDOW] Current time IS within window "
+                      f"{slot.start.strftime('%H:%M')} - {slot.end.strftime('%H:%M')}")
             else:
                 print(f"[TIME_WINDOW] Current time IS NOT within window")
             
-            return is_within
+            return slot is not None
     
-    def get_active_classroom(self, current_time: Optional[datetime] = None) -> Optional[str]:
+    def get_active_session(self, current_time: Optional[datetime] = None) -> Optional[SessionSlot]:
         """
-        Find the active classroom based on current time and time windows.
-        Returns the classroom_id of the classroom that is currently in session, or None if no class is active.
+        Find the timetable slot open right now in any classroom.
+        The slot's session_id is None when it is a classroom's daily time window.
         """
         with current_app.app_context():
             if current_time is None:
@@ -157,66 +229,117 @@ class AttendanceManager:
             
             print(f"[GET_ACTIVE_CLASSROOM] Looking for active classroom at {current_time.strftime('%H:%M:%S')}")
             
-            # Get all classrooms
-            classrooms = Classroom.query.all()
-            current_time_only = current_time.time()
+            # One bucket lookup in the compiled timetable instead of scanning every classroom
+            slot = timetable.active(current_time)
             
-            # Find classroom with current time within its time window
-            for classroom in classrooms:
-                start_time = classroom.time_window_start
-                end_time = classroom.time_window_end
-                
-                if start_time <= current_time_only <= end_time:
-                    print(f"[GET_ACTIVE_CLASSROOM] Found active classroom: {classroom.id} ({classroom.name})")
-                    print(f"[GET_ACTIVE_CLASSROOM] Time window: {start_time.strftime('%H:%M')} - {end_time.strftime('%H:%M')}")
-                    return classroom.id
-            
-            print(f"[GET_ACTIVE_CLASSROOM] No active classroom found")
-            return None
+            if slot is not None:
+                print(f"[GET_ACTIVE_CLASSROOM] Found active classroom: {slot.classroom_id} (session {slot.session_id})")
+                print(f"[GET_ACTIVE_CLASSROOM] Time window: {slot.start.strftime('%H:%M')} - {slot.end.strftime('%H:%M')}")
+            else:
+                print(f"[GET_ACTIVE_CLASSROOM] No active classroom found")
+            return slot
     
+    def get_bound_session(self, classroom_id: str, session_id: Optional[int] = None,
+                          current_time: Optional[datetime] = None) -> Optional[SessionSlot]:
+        """
+        The slot open now in a scanner's bound classroom (and session, if bound to one), or None
+        if it is outside its window. One lookup in that room's compiled timetable.
+        """
+        with current_app.app_context():
+            if current_time is None:
+                current_time = datetime.now(pytz.timezone('Asia/Kolkata'))
+            return timetable.resolve(classroom_id, current_time, session_id)
+    
+    def get_active_classroom(self, current_time: Optional[datetime] = None) -> Optional[str]:
+        """
+        Find the active classroom based on current time and the timetable.
+        Returns the classroom_id of the classroom that is currently in session, or None if no class is active.
+        """
+        slot = self.get_active_session(current_time)
+        return slot.classroom_id if slot is not None else None
+    
+    @retry_on_lock
     def mark_attendance(self, student_id: str, classroom_id: str, 
                        timestamp: Optional[datetime] = None,
                        ai_headcount: Optional[int] = None,
-                       qr_scan_count: Optional[int] = None) -> bool:
-        """Mark attendance for a student in a classroom."""
+                       qr_scan_count: Optional[int] = None,
+                       session_id: Optional[int] = None) -> bool:
+        """
+        Mark attendance for a student in a classroom, once per day and timetable session
+        (session_id None is the classroom's daily window).
+        """
         with current_app.app_context():
             print(f"[MARK_ATTENDANCE] Called with student_id='{student_id}', classroom_id='{classroom_id}'")
             
             if timestamp is None:
                 timestamp = datetime.now(pytz.timezone('Asia/Kolkata'))
             
-            print(f"[MARK_ATTENDANCE] Checking for existing attendance records...")
-            # Check if already marked today (prevent duplicates)
             today = timestamp.date()
-            existing = AttendanceRecord.query.filter_by(
+            
+            # Fast path: repeat scans of the same QR are rejected from memory without a query
+            if scan_dedupe.contains(student_id, classroom_id, today, session_id):
+                print(f"[MARK_ATTENDANCE] DENIED: Attendance already marked today (in-memory)")
+                return False
+            
+            print(f"[MARK_ATTENDANCE] Checking for existing attendance records...")
+            # Check if already marked today (prevent duplicates). All of today's sessions are read:
+            # the day's present counter counts students, so only their first record bumps it
+            todays_records = AttendanceRecord.query.filter_by(
                 student_id=student_id,
                 classroom_id=classroom_id
             ).filter(
                 db.func.date(AttendanceRecord.timestamp) == today
-            ).first()
+            ).all()
+            existing = next((r for r in todays_records if r.session_id == session_id), None)
             
             if existing:
+                # Marked by another worker; remember it so the next repeat skips the query
+                scan_dedupe.add(student_id, classroom_id, today, session_id)
                 print(f"[MARK_ATTENDANCE] DENIED: Attendance already marked today")
                 print(f"[MARK_ATTENDANCE] Existing record ID: {existing.id}, Timestamp: {existing.timestamp}")
                 return False  # Already marked today
             
+            # Write-behind mode: journal the scan and let the background flusher commit it
+            if scan_queue.enabled:
+                accepted = scan_queue.enqueue(student_id, classroom_id, timestamp, ai_headcount, qr_scan_count,
+                                              session_id=session_id)
+                scan_dedupe.add(student_id, classroom_id, today, session_id)
+                if accepted:
+                    print(f"[MARK_ATTENDANCE] SUCCESS: Attendance queued for batched write")
+                else:
+                    print(f"[MARK_ATTENDANCE] DENIED: Attendance already queued today")
+                return accepted
+            
             print(f"[MARK_ATTENDANCE] No existing record found for today. Creating new attendance record...")
             
             # Create new attendance record
             record = AttendanceRecord(
                 student_id=student_id,
                 classroom_id=classroom_id,
+                session_id=session_id,
                 timestamp=timestamp,
                 status='present',
                 ai_headcount=ai_headcount,
                 qr_scan_count=qr_scan_count
             )
             db.session.add(record)
+            if not todays_records:
+                increment_present(classroom_id, today)
+            set_present(classroom_id, student_id, today)
             db.session.commit()
+            scan_dedupe.add(student_id, classroom_id, today, session_id)
             
             print(f"[MARK_ATTENDANCE] SUCCESS: Attendance record created with ID: {record.id}")
             return True
     
+    def get_classroom_stats(self, classroom_id: str, day: Optional[date] = None) -> Dict[str, int]:
+        """Get enrolled and present counts for a classroom from the denormalized counters (one row read)."""
+        with current_app.app_context():
+            if day is None:
+                day = datetime.now(pytz.timezone('Asia/Kolkata')).date()
+            return get_classroom_counts(classroom_id, day)
+
+    @use_read_replica()
     def get_attendance_count(self, classroom_id: str, date: Optional[datetime] = None) -> int:
         """Get the count of students who marked attendance for a classroom on a given date."""
         with current_app.app_context():
@@ -236,6 +359,7 @@ class AttendanceManager:
             
             return count or 0
     
+    @use_read_replica()
     def get_attendance_list(self, classroom_id: str, date: Optional[datetime] = None) -> List[Dict]:
         """Get the list of attendance records for a classroom on a given date."""
         with current_app.app_context():
@@ -244,6 +368,10 @@ class AttendanceManager:
             
             target_date = date.date()
             
+            # Days in an archived term are read across the hot table and the term's archive file
+            if attendance_archive.is_archived(target_date):
+                return attendance_archive.records_between(classroom_id, target_date, target_date)
+            
             records = AttendanceRecord.query.filter_by(
                 classroom_id=classroom_id
             ).filter(
@@ -252,6 +380,301 @@ class AttendanceManager:
             
             return [record.to_dict() for record in records]
     
+    @use_read_replica()
+    def get_recent_scans(self, classroom_id: str, since_id: Optional[int] = None,
+                         limit: int = 10, day: Optional[date] = None) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Get a classroom's newest attendance records for a day, newest first, at most `limit`.
+        With since_id, only records with a larger id (an index range on (classroom_id, id)), so
+        polling costs what is new rather than the day's total. Returns (records, last_id).
+        """
+        with current_app.app_context():
+            if day is None:
+                day = datetime.now(pytz.timezone('Asia/Kolkata')).date()
+            day_start = datetime.combine(day, time.min)
+            
+            query = AttendanceRecord.query.filter(AttendanceRecord.classroom_id == classroom_id)
+            if since_id is not None:
+                query = query.filter(AttendanceRecord.id > since_id).order_by(AttendanceRecord.id.desc())
+            else:
+                query = query.order_by(AttendanceRecord.timestamp.desc(), AttendanceRecord.id.desc())
+            records = query.filter(
+                AttendanceRecord.timestamp >= day_start,
+                AttendanceRecord.timestamp < day_start + timedelta(days=1)
+            ).limit(limit).all()
+            
+            last_id = max((record.id for record in records), default=since_id)
+            return [record.to_dict() for record in records], last_id
+    
+    @use_read_replica()
+    def get_students_page(self, after: Optional[List] = None,
+                          limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Get one page of students sorted by (name, id).
+        `after` is the decoded cursor [name, id] of the previous page's last row.
+        Returns (students, next_cursor); next_cursor is None on the last page.
+        """
+        with current_app.app_context():
+            query = db.session.query(
+                Student.id, Student.name, Student.email, User.email
+            ).outerjoin(User, Student.user_id == User.id)
+            
+            if after:
+                after_name, after_id = after
+                query = query.filter(or_(
+                    Student.name > after_name,
+                    and_(Student.name == after_name, Student.id > after_id)
+                ))
+            
+            rows = query.order_by(Student.name, Student.id).limit(limit + 1).all()
+            
+            students = [
+                {'id': student_id, 'name': name, 'email': email or user_email}
+                for student_id, name, email, user_email in rows[:limit]
+            ]
+            next_cursor = None
+            if len(rows) > limit:
+                last = students[-1]
+                next_cursor = encode_cursor([last['name'], last['id']])
+            return students, next_cursor
+    
+    @use_read_replica()
+    def get_admin_data_page(self, after: Optional[List] = None,
+                            limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Get one page of classroom admin data sorted by classroom id.
+        `after` is the decoded cursor [classroom_id]. Returns (classrooms, next_cursor).
+        """
+        with current_app.app_context():
+            query = Classroom.query
+            if after:
+                query = query.filter(Classroom.id > after[0])
+            classrooms = query.order_by(Classroom.id).limit(limit + 1).all()
+            
+            has_more = len(classrooms) > limit
+            classrooms = classrooms[:limit]
+            
+            # One query for the rosters of every classroom on the page
+            rosters = {classroom.id: [] for classroom in classrooms}
+            if rosters:
+                rows = db.session.query(
+                    enrollment_table.c.classroom_id, enrollment_table.c.student_id
+                ).filter(
+                    enrollment_table.c.classroom_id.in_(list(rosters))
+                ).order_by(enrollment_table.c.classroom_id, enrollment_table.c.student_id).all()
+                for classroom_id, student_id in rows:
+                    rosters[classroom_id].append(student_id)
+            
+            result = [
+                {
+                    'classroom_id': classroom.id,
+                    'subject': classroom.subject,
+                    'department': classroom.department,
+                    'classroom': classroom.name,
+                    'start_time': classroom.time_window_start.strftime('%H:%M') if classroom.time_window_start else None,
+                    'end_time': classroom.time_window_end.strftime('%H:%M') if classroom.time_window_end else None,
+                    'student_ids': rosters[classroom.id]
+                }
+                for classroom in classrooms
+            ]
+            next_cursor = encode_cursor([result[-1]['classroom_id']]) if has_more else None
+            return result, next_cursor
+    
+    @use_read_replica()
+    def get_attendance_page(self, classroom_id: str, day: Optional[date] = None,
+                            after: Optional[List] = None,
+                            limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Get one page of a classroom's attendance records for a day, newest first.
+        `after` is the decoded cursor [timestamp_iso, id]. Returns (records, next_cursor).
+        """
+        with current_app.app_context():
+            if day is None:
+                day = datetime.now(pytz.timezone('Asia/Kolkata')).date()
+            
+            # Range on the raw column so the (classroom_id, timestamp, id) index is used
+            day_start = datetime.combine(day, time.min)
+            day_end = day_start + timedelta(days=1)
+            query = AttendanceRecord.query.filter(
+                AttendanceRecord.classroom_id == classroom_id,
+                AttendanceRecord.timestamp >= day_start,
+                AttendanceRecord.timestamp < day_end
+            )
+            
+            if after:
+                after_timestamp = datetime.fromisoformat(after[0])
+                after_id = after[1]
+                query = query.filter(or_(
+                    AttendanceRecord.timestamp < after_timestamp,
+                    and_(AttendanceRecord.timestamp == after_timestamp, AttendanceRecord.id < after_id)
+                ))
+            
+            records = query.order_by(
+                AttendanceRecord.timestamp.desc(), AttendanceRecord.id.desc()
+            ).limit(limit + 1).all()
+            
+            next_cursor = None
+            if len(records) > limit:
+                last = records[limit - 1]
+                next_cursor = encode_cursor([last.timestamp.isoformat(), last.id])
+            return [record.to_dict() for record in records[:limit]], next_cursor
+    
+    # Columnar reads: Core row tuples straight to {'columns', 'rows'}, no ORM objects or per-row dicts.
+    # `limit=None` returns every row; otherwise the cursors match the *_page methods.
+    
+    @use_read_replica()
+    def get_student_rows(self, after: Optional[List] = None,
+                         limit: Optional[int] = None) -> Tuple[List[str], List[Tuple], Optional[str]]:
+        """Students sorted by (name, id) as (columns, rows, next_cursor)."""
+        with current_app.app_context():
+            query = select(
+                Student.id, Student.name,
+                db.func.coalesce(db.func.nullif(Student.email, ''), User.email)
+            ).outerjoin(User, Student.user_id == User.id)
+            if after:
+                after_name, after_id = after
+                query = query.where(or_(
+                    Student.name > after_name,
+                    and_(Student.name == after_name, Student.id > after_id)
+                ))
+            query = query.order_by(Student.name, Student.id)
+            if limit is not None:
+                query = query.limit(limit + 1)
+            rows = [tuple(row) for row in db.session.execute(query)]
+            
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor([rows[-1][1], rows[-1][0]])
+            return ['id', 'name', 'email'], rows, next_cursor
+    
+    @use_read_replica()
+    def get_admin_data_rows(self, after: Optional[List] = None,
+                            limit: Optional[int] = None) -> Tuple[List[str], List[Tuple], Optional[str]]:
+        """Classroom admin data sorted by classroom id as (columns, rows, next_cursor)."""
+        with current_app.app_context():
+            query = select(Classroom.id, Classroom.subject, Classroom.department, Classroom.name,
+                           Classroom.time_window_start, Classroom.time_window_end)
+            if after:
+                query = query.where(Classroom.id > after[0])
+            query = query.order_by(Classroom.id)
+            if limit is not None:
+                query = query.limit(limit + 1)
+            classrooms = db.session.execute(query).all()
+            
+            next_cursor = None
+            if limit is not None and len(classrooms) > limit:
+                classrooms = classrooms[:limit]
+                next_cursor = encode_cursor([classrooms[-1][0]])
+            
+            rosters = {classroom[0]: [] for classroom in classrooms}
+            if rosters:
+                roster_query = select(enrollment_table.c.classroom_id, enrollment_table.c.student_id)
+                if limit is not None:
+                    roster_query = roster_query.where(enrollment_table.c.classroom_id.in_(list(rosters)))
+                for classroom_id, student_id in db.session.execute(
+                        roster_query.order_by(enrollment_table.c.classroom_id, enrollment_table.c.student_id)):
+                    if classroom_id in rosters:
+                        rosters[classroom_id].append(student_id)
+            
+            rows = [
+                (classroom_id, subject, department, name,
+                 start.strftime('%H:%M') if start else None,
+                 end.strftime('%H:%M') if end else None,
+                 rosters[classroom_id])
+                for classroom_id, subject, department, name, start, end in classrooms
+            ]
+            columns = ['classroom_id', 'subject', 'department', 'classroom', 'start_time', 'end_time', 'student_ids']
+            return columns, rows, next_cursor
+    
+    @use_read_replica()
+    def get_attendance_rows(self, classroom_id: str, day: Optional[date] = None,
+                            after: Optional[List] = None,
+                            limit: Optional[int] = None) -> Tuple[List[str], List[Tuple], Optional[str]]:
+        """A classroom's attendance records for a day, newest first, as (columns, rows, next_cursor)."""
+        columns = ['id', 'student_id', 'classroom_id', 'session_id', 'timestamp', 'status',
+                   'ai_headcount', 'qr_scan_count', 'created_at']
+        with current_app.app_context():
+            if day is None:
+                day = datetime.now(pytz.timezone('Asia/Kolkata')).date()
+            
+            # Archived days come back as dicts from the hot table and the term file
+            if attendance_archive.is_archived(day):
+                rows = [tuple(record[column] for column in columns)
+                        for record in attendance_archive.records_between(classroom_id, day, day)]
+                if after:
+                    rows = [row for row in rows if (row[4], row[0]) < (after[0], after[1])]
+                if limit is not None:
+                    rows = rows[:limit + 1]
+            else:
+                day_start = datetime.combine(day, time.min)
+                query = select(*(getattr(AttendanceRecord, column) for column in columns)).where(
+                    AttendanceRecord.classroom_id == classroom_id,
+                    AttendanceRecord.timestamp >= day_start,
+                    AttendanceRecord.timestamp < day_start + timedelta(days=1)
+                )
+                if after:
+                    after_timestamp = datetime.fromisoformat(after[0])
+                    query = query.where(or_(
+                        AttendanceRecord.timestamp < after_timestamp,
+                        and_(AttendanceRecord.timestamp == after_timestamp, AttendanceRecord.id < after[1])
+                    ))
+                query = query.order_by(AttendanceRecord.timestamp.desc(), AttendanceRecord.id.desc())
+                if limit is not None:
+                    query = query.limit(limit + 1)
+                
+                rows = [
+                    (record_id, student_id, room_id, session_id, timestamp.isoformat(), status,
+                     ai_headcount, qr_scan_count, created_at.isoformat() if created_at else None)
+                    for record_id, student_id, room_id, session_id, timestamp, status,
+                        ai_headcount, qr_scan_count, created_at in db.session.execute(query)
+                ]
+            
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor([rows[-1][4], rows[-1][0]])
+            return columns, rows, next_cursor
+    
+    @use_read_replica()
+    def get_enrolled_students_with_status(self, classroom_id: str, day: Optional[date] = None) -> List[Dict]:
+        """
+        Get a classroom's roster with today's attendance status, sorted by name.
+        One query: enrollments LEFT JOIN students LEFT JOIN the day's attendance.
+        """
+        with current_app.app_context():
+            if day is None:
+                day = datetime.now(pytz.timezone('Asia/Kolkata')).date()
+            day_start = datetime.combine(day, time.min)
+            day_end = day_start + timedelta(days=1)
+            
+            attended = db.session.query(
+                AttendanceRecord.student_id
+            ).filter(
+                AttendanceRecord.classroom_id == classroom_id,
+                AttendanceRecord.timestamp >= day_start,
+                AttendanceRecord.timestamp < day_end
+            ).distinct().subquery()
+            
+            # Enrollments without a student row still show up, named by their id
+            name = db.func.coalesce(Student.name, enrollment_table.c.student_id)
+            rows = db.session.query(
+                enrollment_table.c.student_id,
+                name,
+                attended.c.student_id.isnot(None)
+            ).outerjoin(
+                Student, Student.id == enrollment_table.c.student_id
+            ).outerjoin(
+                attended, attended.c.student_id == enrollment_table.c.student_id
+            ).filter(
+                enrollment_table.c.classroom_id == classroom_id
+            ).order_by(name, enrollment_table.c.student_id).all()
+            
+            return [
+                {'id': student_id, 'name': student_name, 'has_attended': bool(has_attended)}
+                for student_id, student_name, has_attended in rows
+            ]
+    
     def add_admin_data(self, classroom_id: str, subject: str, department: str, 
                       classroom: str, start_time: str, end_time: str, 
                       student_ids: List[str]) -> bool:
@@ -282,6 +705,7 @@ class AttendanceManager:
             
             return True
     
+    @use_read_replica()
     def get_admin_data(self, classroom_id: Optional[str] = None) -> Dict:
         """Get admin data. If classroom_id is None, returns all admin data."""
         with current_app.app_context():
@@ -304,6 +728,7 @@ class AttendanceManager:
             else:
                 return self.get_all_admin_data()
     
+    @use_read_replica()
     def get_all_admin_data(self) -> Dict:
         """Get all admin data."""
         with current_app.app_context():
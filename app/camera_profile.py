@@ -0,0 +1,133 @@
+"""
+Per-classroom camera profiles for headcount.
+A fixed classroom camera sees the seating area in the same part of every frame.
+The profile stores that area as a polygon (in fractions of the frame width and
+height, so it holds for any upload resolution) together with the expected face
+size range and a detector scale factor. Detection runs only on the polygon's
+bounding box, and faces whose centre falls outside the polygon are dropped.
+"""
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+
+class CameraProfile:
+    """Seating ROI and detector tuning for one classroom camera."""
+
+    def __init__(self, roi: Optional[List[List[float]]] = None,
+                 min_face_size: Optional[int] = None,
+                 max_face_size: Optional[int] = None,
+                 scale_factor: Optional[float] = None):
+        self.roi = roi
+        self.min_face_size = min_face_size
+        self.max_face_size = max_face_size
+        self.scale_factor = scale_factor
+
+    @classmethod
+    def from_classroom(cls, classroom) -> Optional['CameraProfile']:
+        """Build the profile stored on a Classroom row, or None if it has none."""
+        if classroom is None:
+            return None
+        profile = cls(
+            roi=json.loads(classroom.camera_roi) if classroom.camera_roi else None,
+            min_face_size=classroom.camera_min_face_size,
+            max_face_size=classroom.camera_max_face_size,
+            scale_factor=classroom.camera_scale_factor
+        )
+        return None if profile.is_empty() else profile
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'CameraProfile':
+        """Validate an API payload. Raises ValueError with a user-facing message."""
+        roi = data.get('roi')
+        if roi is not None:
+            if not isinstance(roi, list) or len(roi) < 3:
+                raise ValueError('roi must be a list of at least 3 [x, y] points')
+            try:
+                roi = [[float(x), float(y)] for x, y in roi]
+            except (TypeError, ValueError):
+                raise ValueError('roi points must be [x, y] number pairs')
+            if any(not (0.0 <= v <= 1.0) for point in roi for v in point):
+                raise ValueError('roi coordinates must be fractions of the frame between 0 and 1')
+
+        def _optional_int(key):
+            value = data.get(key)
+            if value is None:
+                return None
+            if not isinstance(value, int) or value <= 0:
+                raise ValueError(f'{key} must be a positive integer (pixels)')
+            return value
+
+        min_face_size = _optional_int('min_face_size')
+        max_face_size = _optional_int('max_face_size')
+        if min_face_size and max_face_size and min_face_size > max_face_size:
+            raise ValueError('min_face_size must not exceed max_face_size')
+
+        scale_factor = data.get('scale_factor')
+        if scale_factor is not None:
+            if not isinstance(scale_factor, (int, float)) or not (1.0 < scale_factor <= 2.0):
+                raise ValueError('scale_factor must be greater than 1.0 and at most 2.0')
+            scale_factor = float(scale_factor)
+
+        return cls(roi, min_face_size, max_face_size, scale_factor)
+
+    def apply_to(self, classroom):
+        """Store this profile on a Classroom row (the caller commits)."""
+        classroom.camera_roi = json.dumps(self.roi) if self.roi else None
+        classroom.camera_min_face_size = self.min_face_size
+        classroom.camera_max_face_size = self.max_face_size
+        classroom.camera_scale_factor = self.scale_factor
+
+    def is_empty(self) -> bool:
+        return not self.roi and not self.min_face_size and not self.max_face_size and not self.scale_factor
+
+    def to_dict(self) -> Dict:
+        return {
+            'roi': self.roi,
+            'min_face_size': self.min_face_size,
+            'max_face_size': self.max_face_size,
+            'scale_factor': self.scale_factor
+        }
+
+    def detector_overrides(self) -> Dict:
+        """Overrides for the detector's own parameters (sizes in original-image pixels)."""
+        overrides = {}
+        if self.min_face_size:
+            overrides['minSize'] = (self.min_face_size, self.min_face_size)
+        if self.max_face_size:
+            overrides['maxSize'] = (self.max_face_size, self.max_face_size)
+        if self.scale_factor:
+            overrides['scaleFactor'] = self.scale_factor
+        return overrides
+
+    def polygon(self, width: int, height: int) -> Optional[np.ndarray]:
+        """ROI polygon in pixel coordinates of a width x height image."""
+        if not self.roi:
+            return None
+        return np.array([[x * width, y * height] for x, y in self.roi], dtype=np.float32)
+
+    def roi_box(self, width: int, height: int) -> Tuple[int, int, int, int]:
+        """Bounding box (x0, y0, x1, y1) of the ROI, clipped to the image (the whole image if no ROI)."""
+        polygon = self.polygon(width, height)
+        if polygon is None:
+            return 0, 0, width, height
+        x0, y0 = np.floor(polygon.min(axis=0)).astype(int)
+        x1, y1 = np.ceil(polygon.max(axis=0)).astype(int)
+        return max(0, x0), max(0, y0), min(width, x1), min(height, y1)
+
+    @staticmethod
+    def contains(polygon: Optional[np.ndarray], x: float, y: float) -> bool:
+        """Whether a point lies inside (or on) the polygon; True when there is no polygon."""
+        if polygon is None:
+            return True
+        return cv2.pointPolygonTest(polygon, (float(x), float(y)), False) >= 0
+
+
+def load_camera_profile(classroom_id: Optional[str]) -> Optional[CameraProfile]:
+    """The camera profile stored for a classroom, or None."""
+    if not classroom_id:
+        return None
+    from app.models import db, Classroom
+    return CameraProfile.from_classroom(db.session.get(Classroom, classroom_id))
@@ -0,0 +1,137 @@
+"""
+Denormalized enrollment and attendance counters.
+The enrollment and attendance write paths bump these inside their own
+transactions so the dashboard stats read one row instead of counting rosters
+and attendance records. repair_counters() recomputes them from the source tables.
+"""
+from datetime import date, datetime, time
+from typing import Dict, Optional
+
+from sqlalchemy import and_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, AttendanceRecord, ClassroomCounter, ClassroomDayCounter, enrollment_table
+
+# Dialects with INSERT ... ON CONFLICT; others use update-then-insert
+ON_CONFLICT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def _upsert(table, values: Dict, counter_column: str, delta: int, index_elements):
+    """INSERT ... ON CONFLICT DO UPDATE SET counter = counter + delta, on the session's connection."""
+    insert = ON_CONFLICT_INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(table).values(**values, **{counter_column: delta})
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={counter_column: getattr(table.c, counter_column) + delta}
+        )
+        db.session.execute(stmt)
+        return
+
+    increment = update(table).where(
+        and_(*(table.c[name] == values[name] for name in index_elements))
+    ).values({counter_column: table.c[counter_column] + delta})
+    if db.session.execute(increment).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(**values, **{counter_column: delta}))
+    except IntegrityError:
+        # Another transaction inserted the row first
+        db.session.execute(increment)
+
+
+def increment_enrolled(classroom_id: str, delta: int = 1):
+    """Adjust a classroom's enrolled count. Runs in the caller's transaction; the caller commits."""
+    _upsert(ClassroomCounter.__table__, {'classroom_id': classroom_id},
+            'enrolled_count', delta, ['classroom_id'])
+
+
+def increment_present(classroom_id: str, day: date, delta: int = 1):
+    """Adjust a classroom's present count for a day. Runs in the caller's transaction; the caller commits."""
+    _upsert(ClassroomDayCounter.__table__, {'classroom_id': classroom_id, 'day': day},
+            'present_count', delta, ['classroom_id', 'day'])
+
+
+def get_classroom_counts(classroom_id: str, day: date) -> Dict[str, int]:
+    """Read enrolled and present counts for a classroom and day in one query."""
+    present = db.session.query(ClassroomDayCounter.present_count).filter(
+        ClassroomDayCounter.classroom_id == classroom_id,
+        ClassroomDayCounter.day == day
+    ).scalar_subquery()
+
+    row = db.session.query(
+        db.session.query(ClassroomCounter.enrolled_count).filter(
+            ClassroomCounter.classroom_id == classroom_id
+        ).scalar_subquery(),
+        present
+    ).one()
+
+    return {
+        'total_enrolled': row[0] or 0,
+        'scanned_count': row[1] or 0
+    }
+
+
+def repair_counters(keep_before: Optional[date] = None) -> Dict[str, int]:
+    """
+    Recompute every counter from enrollments and attendance_records in one transaction.
+    Day counters before keep_before are left as they are (their records have been archived).
+    """
+    try:
+        db.session.query(ClassroomCounter).delete()
+        day_counters = db.session.query(ClassroomDayCounter)
+        if keep_before is not None:
+            day_counters = day_counters.filter(ClassroomDayCounter.day >= keep_before)
+        day_counters.delete()
+
+        enrolled_rows = db.session.query(
+            enrollment_table.c.classroom_id,
+            db.func.count(enrollment_table.c.student_id)
+        ).group_by(enrollment_table.c.classroom_id).all()
+        db.session.add_all([
+            ClassroomCounter(classroom_id=classroom_id, enrolled_count=count)
+            for classroom_id, count in enrolled_rows
+        ])
+
+        day_expr = db.func.date(AttendanceRecord.timestamp)
+        present_query = db.session.query(
+            AttendanceRecord.classroom_id,
+            day_expr,
+            db.func.count(db.func.distinct(AttendanceRecord.student_id))
+        )
+        if keep_before is not None:
+            present_query = present_query.filter(AttendanceRecord.timestamp >= datetime.combine(keep_before, time.min))
+        present_rows = present_query.group_by(AttendanceRecord.classroom_id, day_expr).all()
+        db.session.add_all([
+            ClassroomDayCounter(
+                classroom_id=classroom_id,
+                day=day if isinstance(day, date) else date.fromisoformat(day),
+                present_count=count
+            )
+            for classroom_id, day, count in present_rows
+        ])
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    print(f"[COUNTERS] Repaired {len(enrolled_rows)} classroom and {len(present_rows)} classroom-day counter(s)")
+    return {'classrooms': len(enrolled_rows), 'classroom_days': len(present_rows)}
+
+
+def init_counters(app):
+    """Build counters on first run against a database that already has enrollments or attendance."""
+    if db.session.query(ClassroomCounter.classroom_id).first() is not None:
+        return
+    has_data = (
+        db.session.query(enrollment_table.c.classroom_id).first() is not None
+        or db.session.query(AttendanceRecord.id).first() is not None
+    )
+    if has_data:
+        repair_counters()
@@ -0,0 +1,153 @@
+"""
+Content-hash cache for headcount results.
+Re-uploads of the same photo (and dashboard retries) skip decoding and detection:
+results are keyed by a hash of the uploaded bytes plus the detector parameters.
+A bounded in-process LRU sits in front of an optional SQLite file that is shared
+by all workers on a host.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.metrics import metrics
+
+
+def make_cache_key(data: bytes, params: Dict) -> str:
+    """Hash the upload bytes together with the detector parameters that produced the result."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class SQLiteResultStore:
+    """Results table in its own SQLite file, trimmed to the most recently used max_entries."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS headcount_results ('
+            ' key TEXT PRIMARY KEY,'
+            ' result TEXT NOT NULL,'
+            ' last_used REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_headcount_results_last_used ON headcount_results (last_used)')
+
+    def get(self, key: str) -> Optional[Dict]:
+        conn = self._connection()
+        row = conn.execute('SELECT result FROM headcount_results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE headcount_results SET last_used = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, result: Dict):
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO headcount_results (key, result, last_used) VALUES (?, ?, ?)',
+            (key, json.dumps(result, separators=(',', ':')), time.time())
+        )
+        conn.execute(
+            'DELETE FROM headcount_results WHERE key IN ('
+            ' SELECT key FROM headcount_results ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM headcount_results')
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM headcount_results').fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """One autocommit connection per thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=20, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+
+class HeadcountResultCache:
+    """Bounded LRU of headcount results, optionally backed by a shared SQLite file."""
+
+    def __init__(self, max_entries: int = 128):
+        self.enabled = True
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self.store: Optional[SQLiteResultStore] = None
+
+    def init_app(self, app):
+        """Configure size and backend from app config ('disk', 'memory' or 'off')."""
+        mode = app.config.get('HEADCOUNT_CACHE', 'disk')
+        self.max_entries = app.config.get('HEADCOUNT_CACHE_SIZE', 128)
+        self.enabled = mode != 'off'
+        self.store = None
+        self.clear()
+
+        if mode == 'disk':
+            path = app.config.get('HEADCOUNT_CACHE_PATH') or os.path.join(app.instance_path, 'headcount_cache.db')
+            self.store = SQLiteResultStore(path, app.config.get('HEADCOUNT_CACHE_DISK_SIZE', 1024))
+            print(f"[HEADCOUNT_CACHE] Sharing results via {path}")
+        elif mode not in ('memory', 'off'):
+            raise ValueError(f"Unknown HEADCOUNT_CACHE mode: {mode}")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached {'count', 'detections'} for key, or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+        if result is None and self.store is not None:
+            result = self.store.get(key)
+            if result is not None:
+                self._remember(key, result)
+
+        metrics.incr('headcount_cache_hits' if result is not None else 'headcount_cache_misses')
+        return result
+
+    def put(self, key: str, count: int, detections: list):
+        """Remember a detection result for key."""
+        if not self.enabled:
+            return
+        result = {'count': count, 'detections': detections}
+        self._remember(key, result)
+        if self.store is not None:
+            self.store.put(key, result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _remember(self, key: str, result: Dict):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Global instance
+headcount_cache = HeadcountResultCache()
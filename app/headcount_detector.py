@@ -1,71 +1,144 @@
 """
-Face detector for headcount.
-This module uses Haar Cascade classifier to detect and count faces/heads in images.
+Face detectors for headcount.
+Detection backends share one interface (detect_people -> (count, detections)):
+- haar: OpenCV Haar cascade (the original detector)
+- lbp:  LBP cascade, several times cheaper on CPU at some cost in recall
+- dnn:  OpenCV DNN face detector (YuNet via cv2.FaceDetectorYN) from a local model file
+The backend is chosen per deployment (HEADCOUNT_DETECTOR) and can be overridden per
+classroom (Classroom.detector_backend). pip builds of OpenCV do not ship the LBP cascade
+or the YuNet model; both default to files in models/ (see models/README.md).
 """
 
 import cv2
 import numpy as np
-from typing import Tuple, Optional
+from typing import Callable, Dict, Tuple, Optional
 import os
+import threading
+
+from app.camera_profile import CameraProfile
+
+# Default directory for model files OpenCV does not ship, and their file names there
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+MODEL_FILES = {
+    'lbp': 'lbpcascade_frontalface_improved.xml',
+    'dnn': 'face_detection_yunet_2023mar.onnx',
+}
+
+
+def default_model_path(backend: str, models_dir: Optional[str] = None) -> Optional[str]:
+    """The default model file of a backend (None for haar, which uses OpenCV's bundled data)."""
+    if backend not in MODEL_FILES:
+        return None
+    return os.path.join(models_dir or MODELS_DIR, MODEL_FILES[backend])
 
 
 class HeadcountDetector:
     """
-    Uses Haar Cascade classifier to detect and count heads/faces in images.
+    Base class for detection backends: validates input and defines the result format.
+    Subclasses implement _detect(image, scale) and describe themselves in self.params, which
+    also keys the headcount result cache.
     """
 
+    name = 'base'
+    # Whether _detect needs color input (ingest may otherwise decode straight to grayscale)
+    needs_color = False
+
     def __init__(self):
-        """
-        Initialize the Haar Cascade face detector.
-        """
-        # Load the Haar Cascade classifier for frontal faces
-        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        print(f"[DEBUG] Haar Cascade XML file path: {cascade_path}")
-        
-        # Verify cascade file exists
-        if not os.path.exists(cascade_path):
-            raise FileNotFoundError(
-                f"Haar Cascade XML file not found at: {cascade_path}\n"
-                f"Please ensure OpenCV is properly installed."
-            )
-        
-        self.face_cascade = cv2.CascadeClassifier(cascade_path)
-        
-        # Verify cascade loaded successfully
-        if self.face_cascade.empty():
-            raise ValueError(
-                f"Failed to load Haar Cascade classifier from: {cascade_path}\n"
-                f"The XML file may be corrupted or invalid."
-            )
+        self.params: Dict = {'detector': self.name}
 
-    def detect_people(self, image: np.ndarray) -> Tuple[int, list]:
+    def detect_people(self, image: np.ndarray, scale: float = 1.0,
+                      profile: Optional[CameraProfile] = None) -> Tuple[int, list]:
         """
-        Detect faces/heads in an image using Haar Cascade.
+        Detect faces/heads in an image.
 
         Args:
-            image: Input image as numpy array (BGR format from OpenCV)
+            image: Input image as numpy array (BGR, BGRA or grayscale)
+            scale: How much the image was downscaled from the original; size limits are
+                   adapted to it and detections are returned in original coordinates
+            profile: Optional classroom camera profile: detection runs only on the seating
+                     ROI with the profile's face-size range and scale factor
 
         Returns:
             Tuple of (count, detections)
-        
+
         Raises:
             ValueError: If image is invalid or cannot be processed
         """
         # Validate input image
         if image is None:
             raise ValueError("Input image is None")
-        
+
         if not isinstance(image, np.ndarray):
             raise ValueError(f"Input must be a numpy array, got {type(image)}")
-        
+
         if image.size == 0:
             raise ValueError("Input image is empty")
-        
+
         if len(image.shape) < 2:
             raise ValueError(f"Invalid image shape: {image.shape}")
-        
-        # Convert to grayscale for face detection
-        # Handle different image formats safely
+
+        overrides = profile.detector_overrides() if profile else {}
+        polygon = None
+        offset_x = offset_y = 0
+        if profile is not None and profile.roi:
+            height, width = image.shape[:2]
+            polygon = profile.polygon(width, height)
+            x0, y0, x1, y1 = profile.roi_box(width, height)
+            if x1 <= x0 or y1 <= y0:
+                return 0, []
+            # Slicing gives a view, so only the ROI's bounding box is scanned and nothing is copied
+            image = image[y0:y1, x0:x1]
+            offset_x, offset_y = x0, y0
+
+        boxes = self._detect(image, scale, overrides)
+
+        # Store detections
+        detections = []
+        for (x, y, w, h) in boxes:
+            x, y = x + offset_x, y + offset_y
+            # The bounding box includes corners outside the seating polygon
+            if not CameraProfile.contains(polygon, x + w / 2, y + h / 2):
+                continue
+            detections.append({
+                'x': int(round(x * scale)),
+                'y': int(round(y * scale)),
+                'width': int(round(w * scale)),
+                'height': int(round(h * scale))
+            })
+
+        return len(detections), detections
+
+    def count_people(self,
+                     image_path: Optional[str] = None,
+                     image_array: Optional[np.ndarray] = None) -> int:
+        """
+        Count people in an image.
+        """
+
+        if image_path:
+            image = cv2.imread(image_path)
+            if image is None:
+                raise ValueError(f"Could not read image from {image_path}")
+
+        elif image_array is not None:
+            image = image_array
+
+        else:
+            raise ValueError("Either image_path or image_array must be provided")
+
+        count, _ = self.detect_people(image)
+        return count
+
+    def _detect(self, image: np.ndarray, scale: float, overrides: Dict):
+        """
+        Return an iterable of (x, y, w, h) boxes in the coordinates of `image`.
+        `overrides` may replace scaleFactor, minSize and maxSize (original-image pixels).
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _to_gray(image: np.ndarray) -> np.ndarray:
+        """Convert to grayscale, handling the channel layouts OpenCV may decode to."""
         if len(image.shape) == 2:
             # Image is already grayscale
             gray_image = image
@@ -77,71 +150,225 @@ class HeadcountDetector:
                 # BGR format (standard OpenCV)
                 gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
             elif image.shape[2] == 4:
-                # BGRA format, convert to BGR first
+                # BGRA format
                 gray_image = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
             else:
                 raise ValueError(f"Unsupported number of channels: {image.shape[2]}")
         else:
             raise ValueError(f"Unsupported image dimensions: {image.shape}")
-        
+
         # Verify grayscale conversion succeeded
         if gray_image is None or gray_image.size == 0:
             raise ValueError("Failed to convert image to grayscale")
-        
-        # Detect faces in the image
+        return gray_image
+
+    @staticmethod
+    def _to_bgr(image: np.ndarray) -> np.ndarray:
+        """Convert to 3-channel BGR for detectors that need color input."""
+        if len(image.shape) == 2 or image.shape[2] == 1:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        if image.shape[2] == 4:
+            return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        if image.shape[2] == 3:
+            return image
+        raise ValueError(f"Unsupported number of channels: {image.shape[2]}")
+
+
+class CascadeDetector(HeadcountDetector):
+    """Cascade classifier backend (Haar or LBP features)."""
+
+    def __init__(self, cascade_path: str, scale_factor: float = 1.1,
+                 min_neighbors: int = 10, min_size: Tuple[int, int] = (50, 50)):
+        super().__init__()
+        print(f"[DEBUG] {self.name} cascade XML file path: {cascade_path}")
+
+        # Verify cascade file exists
+        if not os.path.exists(cascade_path):
+            raise FileNotFoundError(
+                f"Cascade XML file not found at: {cascade_path}\n"
+                f"Please ensure OpenCV is properly installed or configure the cascade path."
+            )
+
+        self.face_cascade = cv2.CascadeClassifier(cascade_path)
+
+        # Verify cascade loaded successfully
+        if self.face_cascade.empty():
+            raise ValueError(
+                f"Failed to load cascade classifier from: {cascade_path}\n"
+                f"The XML file may be corrupted or invalid."
+            )
+
+        # detectMultiScale parameters (also part of the headcount result cache key)
+        self.params.update({
+            'cascade': os.path.basename(cascade_path),
+            'scaleFactor': scale_factor,
+            'minNeighbors': min_neighbors,
+            'minSize': min_size
+        })
+
+    def _detect(self, image: np.ndarray, scale: float, overrides: Dict):
+        def _scaled(size):
+            return tuple(max(1, int(round(side / scale))) for side in size)
+
+        options = {
+            'scaleFactor': overrides.get('scaleFactor', self.params['scaleFactor']),
+            'minNeighbors': self.params['minNeighbors'],
+            'minSize': _scaled(overrides.get('minSize', self.params['minSize']))
+        }
+        if 'maxSize' in overrides:
+            options['maxSize'] = _scaled(overrides['maxSize'])
         # detectMultiScale returns a tuple of arrays, or empty tuple if no faces found
-        faces = self.face_cascade.detectMultiScale(
-            gray_image,
-            scaleFactor=1.1,
-            minNeighbors=10,
-            minSize=(50, 50)
-        )
+        return self.face_cascade.detectMultiScale(self._to_gray(image), **options)
 
-        # Handle empty detections (detectMultiScale returns empty tuple or empty array)
-        if len(faces) == 0:
-            return 0, []
 
-        # Store detections
-        detections = []
-        for (x, y, w, h) in faces:
-            detections.append({
-                'x': int(x),
-                'y': int(y),
-                'width': int(w),
-                'height': int(h)
-            })
+class HaarCascadeDetector(CascadeDetector):
+    """Haar cascade for frontal faces (the original headcount detector)."""
 
-        return len(detections), detections
+    name = 'haar'
 
-    def count_people(self,
-                     image_path: Optional[str] = None,
-                     image_array: Optional[np.ndarray] = None) -> int:
+    def __init__(self, cascade_path: Optional[str] = None):
+        super().__init__(cascade_path or cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+
+class LBPCascadeDetector(CascadeDetector):
+    """LBP cascade: integer features, several times faster than Haar on CPU."""
+
+    name = 'lbp'
+
+    def __init__(self, cascade_path: Optional[str] = None):
+        # pip builds of OpenCV only ship Haar cascades, so the LBP cascade is a file in models/
+        super().__init__(cascade_path or default_model_path('lbp'), scale_factor=1.1, min_neighbors=6)
+
+
+class DNNFaceDetector(HeadcountDetector):
+    """OpenCV DNN face detector (YuNet ONNX model through cv2.FaceDetectorYN)."""
+
+    name = 'dnn'
+    needs_color = True
+
+    def __init__(self, model_path: Optional[str] = None, score_threshold: float = 0.6,
+                 nms_threshold: float = 0.3, min_size: int = 20):
+        super().__init__()
+        model_path = model_path or default_model_path('dnn')
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"DNN face model not found at: {model_path}")
+        if not hasattr(cv2, 'FaceDetectorYN'):
+            raise ValueError("This OpenCV build has no FaceDetectorYN (OpenCV 4.5.4+ required)")
+
+        self.detector = cv2.FaceDetectorYN.create(model_path, '', (320, 320), score_threshold, nms_threshold)
+        # setInputSize mutates the detector, so concurrent requests take turns
+        self._lock = threading.Lock()
+        self.params.update({
+            'model': os.path.basename(model_path),
+            'scoreThreshold': score_threshold,
+            'nmsThreshold': nms_threshold,
+            'minSize': min_size
+        })
+
+    def _detect(self, image: np.ndarray, scale: float, overrides: Dict):
+        # The detector needs contiguous pixels; an ROI view is copied here (ROI only)
+        bgr_image = np.ascontiguousarray(self._to_bgr(image))
+        height, width = bgr_image.shape[:2]
+        with self._lock:
+            self.detector.setInputSize((width, height))
+            _, faces = self.detector.detect(bgr_image)
+        if faces is None:
+            return []
+        min_size = overrides.get('minSize', (self.params['minSize'],))[0] / scale
+        max_size = overrides['maxSize'][0] / scale if 'maxSize' in overrides else float('inf')
+        # Each row is x, y, w, h, five landmarks and a score
+        return [face[:4] for face in faces
+                if min_size <= face[2] <= max_size and min_size <= face[3] <= max_size]
+
+
+BACKENDS = {
+    'haar': HaarCascadeDetector,
+    'lbp': LBPCascadeDetector,
+    'dnn': DNNFaceDetector,
+}
+
+
+class DetectorRegistry:
+    """Builds detector backends from config and picks one per deployment or classroom."""
+
+    def __init__(self):
+        self.default_backend = 'haar'
+        self.paths: Dict[str, Optional[str]] = {}
+        self._instances: Dict[str, Optional[HeadcountDetector]] = {}
+        self._factories: Dict[str, Callable[[], HeadcountDetector]] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
         """
-        Count people in an image.
+        Read backend choice and model paths from app config and load the default backend.
+        Startup fails if an explicitly configured HEADCOUNT_DETECTOR cannot be loaded; the
+        implicit default only warns, and other unavailable backends are reported.
         """
+        self.default_backend = app.config.get('HEADCOUNT_DETECTOR', 'haar')
+        if self.default_backend not in BACKENDS:
+            raise ValueError(f"Unknown HEADCOUNT_DETECTOR backend: {self.default_backend}")
+        models_dir = app.config.get('HEADCOUNT_MODELS_DIR')
+        self.paths = {
+            'haar': app.config.get('HEADCOUNT_HAAR_CASCADE'),
+            'lbp': app.config.get('HEADCOUNT_LBP_CASCADE') or default_model_path('lbp', models_dir),
+            'dnn': app.config.get('HEADCOUNT_DNN_MODEL') or default_model_path('dnn', models_dir),
+        }
+        with self._lock:
+            self._instances.clear()
+            self._factories.clear()
 
-        if image_path:
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Could not read image from {image_path}")
+        try:
+            detector = self.factory()()
+        except (FileNotFoundError, ValueError) as e:
+            reason = str(e).splitlines()[0]
+            if app.config.get('HEADCOUNT_DETECTOR_REQUIRED'):
+                raise RuntimeError(f"HEADCOUNT_DETECTOR={self.default_backend} cannot be loaded: {reason} "
+                                   f"(see models/README.md)") from e
+            print(f"[HEADCOUNT] WARNING: default detector '{self.default_backend}' cannot be loaded, "
+                  f"/headcount will fail: {reason}")
+            detector = None
+        with self._lock:
+            self._instances[self.default_backend] = detector
 
-        elif image_array is not None:
-            image = image_array
+        for backend, path in self.paths.items():
+            if backend != self.default_backend and path and not os.path.exists(path):
+                print(f"[HEADCOUNT] '{backend}' backend unavailable: {path} not found (see models/README.md)")
 
-        else:
-            raise ValueError("Either image_path or image_array must be provided")
+    def get(self, backend: Optional[str] = None) -> Optional[HeadcountDetector]:
+        """Shared detector for a backend (default if None); None if it cannot be loaded."""
+        backend = backend or self.default_backend
+        with self._lock:
+            if backend not in self._instances:
+                try:
+                    self._instances[backend] = self.factory(backend)()
+                except (FileNotFoundError, ValueError) as e:
+                    import sys
+                    print(f"ERROR: Failed to initialize {backend} headcount detector: {e}", file=sys.stderr)
+                    self._instances[backend] = None
+            return self._instances[backend]
 
-        count, _ = self.detect_people(image)
-        return count
+    def factory(self, backend: Optional[str] = None) -> Callable[[], HeadcountDetector]:
+        """A stable constructor for a backend, for callers that need one detector per thread."""
+        backend = backend or self.default_backend
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown detector backend: {backend}")
+        if backend not in self._factories:
+            detector_class = BACKENDS[backend]
+            path = self.paths.get(backend)
+            self._factories[backend] = lambda: detector_class(path)
+        return self._factories[backend]
+
+    def backend_for_classroom(self, classroom_id: Optional[str]) -> str:
+        """The classroom's configured backend, or the deployment default."""
+        if classroom_id:
+            from app.models import db, Classroom
+            backend = db.session.query(Classroom.detector_backend).filter(
+                Classroom.id == classroom_id
+            ).scalar()
+            if backend in BACKENDS:
+                return backend
+        return self.default_backend
 
 
 # Global instance
-# Initialize with error handling
-try:
-    headcount_detector = HeadcountDetector()
-except (FileNotFoundError, ValueError) as e:
-    import sys
-    print(f"ERROR: Failed to initialize HeadcountDetector: {e}", file=sys.stderr)
-    print("The AI headcount feature will not be available.", file=sys.stderr)
-    # Create a dummy detector that will raise errors when used
-    headcount_detector = None
+headcount_detectors = DetectorRegistry()
@@ -0,0 +1,141 @@
+"""
+Multi-frame headcount.
+A single still undercounts whenever someone looks down, so /headcount also
+accepts a short clip or a burst of frames. Frames are sampled at a stride and
+decoded one at a time (a clip is streamed from disk, never loaded whole), run
+through the detector on a small thread pool, and reduced to one robust count.
+"""
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+
+CLIP_EXTENSIONS = {'mp4', 'avi', 'mjpeg', 'mjpg', 'mov', 'mkv', 'webm'}
+AGGREGATES = ('median', 'max_consensus')
+
+
+def iter_clip_frames(path: str, stride: int, max_frames: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (frame_index, frame) for every stride-th frame of a video file, up to max_frames."""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError('Could not open video clip')
+    try:
+        index = 0
+        sampled = 0
+        while sampled < max_frames:
+            # grab() advances without converting the frame; only sampled frames are retrieved
+            if not capture.grab():
+                break
+            if index % stride == 0:
+                ok, frame = capture.retrieve()
+                if ok and frame is not None:
+                    yield index, frame
+                    sampled += 1
+            index += 1
+    finally:
+        capture.release()
+
+
+def iter_image_frames(files: Iterable, stride: int, max_frames: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (frame_index, image) for every stride-th uploaded still, decoding one file at a time."""
+    sampled = 0
+    for index, file in enumerate(files):
+        if sampled >= max_frames:
+            break
+        if index % stride != 0:
+            continue
+        image = cv2.imdecode(np.frombuffer(file.read(), np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f'Could not decode frame {index}')
+        yield index, image
+        sampled += 1
+
+
+def aggregate_counts(counts: List[int], method: str = 'median', consensus: int = 2) -> int:
+    """
+    Reduce per-frame counts to one headcount.
+    median: the median count, rounded.
+    max_consensus: the highest count reached by at least `consensus` frames, so one
+    frame with a false positive cannot set the result on its own.
+    """
+    if not counts:
+        return 0
+    if method == 'median':
+        return int(round(statistics.median(counts)))
+    if method == 'max_consensus':
+        ranked = sorted(counts, reverse=True)
+        return ranked[min(consensus, len(ranked)) - 1]
+    raise ValueError(f"Unknown aggregate: {method}")
+
+
+class FrameHeadcounter:
+    """Runs detection over sampled frames on a thread pool with one detector per worker thread."""
+
+    def __init__(self):
+        self.workers = 2
+        self.stride = 5
+        self.max_frames = 60
+        self.aggregate = 'median'
+        self._executor = None
+        self._local = threading.local()
+
+    def init_app(self, app):
+        """Configure sampling and pool size from app config."""
+        self.shutdown()
+        self.workers = max(1, app.config.get('HEADCOUNT_WORKERS', 2))
+        self.stride = max(1, app.config.get('HEADCOUNT_FRAME_STRIDE', 5))
+        self.max_frames = max(1, app.config.get('HEADCOUNT_MAX_FRAMES', 60))
+        self.aggregate = app.config.get('HEADCOUNT_AGGREGATE', 'median')
+        if self.aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown HEADCOUNT_AGGREGATE: {self.aggregate}")
+
+    def count_frames(self, frames: Iterable[Tuple[int, np.ndarray]],
+                     detector_factory: Callable, profile=None) -> List[Dict]:
+        """
+        Detect on each frame (within the camera profile's ROI, if given) and
+        return [{'frame', 'count', 'detections'}] in frame order.
+        At most two frames per worker are decoded and waiting at any time.
+        """
+        executor = self._get_executor()
+        in_flight = []
+        results = []
+        for index, frame in frames:
+            in_flight.append((index, executor.submit(self._detect, frame, detector_factory, profile)))
+            if len(in_flight) >= self.workers * 2:
+                results.append(self._collect(*in_flight.pop(0)))
+        for index, future in in_flight:
+            results.append(self._collect(index, future))
+        return results
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._local = threading.local()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='headcount')
+        return self._executor
+
+    def _detect(self, frame: np.ndarray, detector_factory: Callable, profile) -> Tuple[int, list]:
+        # Cascade classifiers are not safe to share across threads, so each worker builds its own
+        detectors = getattr(self._local, 'detectors', None)
+        if detectors is None:
+            detectors = self._local.detectors = {}
+        detector = detectors.get(detector_factory)
+        if detector is None:
+            detector = detectors[detector_factory] = detector_factory()
+        return detector.detect_people(frame, profile=profile)
+
+    @staticmethod
+    def _collect(index: int, future) -> Dict:
+        count, detections = future.result()
+        return {'frame': index, 'count': count, 'detections': detections}
+
+
+# Global instance
+frame_headcounter = FrameHeadcounter()
@@ -0,0 +1,158 @@
+"""
+Headcount run history.
+Every /headcount result is queued here and written to headcount_runs by a
+background thread, so the response never waits on the insert. The trend query
+summarises a classroom's AI-versus-scan discrepancy per day over a date range.
+"""
+import atexit
+import json
+import queue
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+
+import pytz
+
+
+class HeadcountRunRecorder:
+    """Asynchronous writer for headcount runs."""
+
+    def __init__(self):
+        self.enabled = True
+        self._app = None
+        self._queue: 'queue.Queue[Optional[Dict]]' = queue.Queue()
+        self._batch_size = 100
+        self._thread = None
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        """Configure from app config and start the writer thread."""
+        self.shutdown()
+        self.enabled = bool(app.config.get('HEADCOUNT_HISTORY_ENABLED', True))
+        if not self.enabled:
+            return
+
+        self._app = app
+        self._thread = threading.Thread(target=self._run, name='headcount-run-writer', daemon=True)
+        self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def record(self, classroom_id: str, detected_count: int, scanned_count: int,
+               detector_params: Optional[Dict] = None, duration_ms: Optional[float] = None,
+               cached: bool = False, run_at: Optional[datetime] = None):
+        """Queue a run for writing. Never blocks on the database."""
+        if not self.enabled:
+            return
+        if run_at is None:
+            run_at = datetime.now(pytz.timezone('Asia/Kolkata'))
+        self._queue.put({
+            'classroom_id': classroom_id,
+            # Stored as naive local time, like attendance timestamps
+            'run_at': run_at.replace(tzinfo=None),
+            'detected_count': detected_count,
+            'scanned_count': scanned_count,
+            'detector_params': json.dumps(detector_params, sort_keys=True) if detector_params else None,
+            'duration_ms': duration_ms,
+            'cached': cached,
+        })
+
+    def flush(self):
+        """Block until every queued run has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def shutdown(self):
+        """Write what is queued and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            batch = [entry]
+            # Drain whatever else is already waiting into the same transaction
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            runs = [e for e in batch if e is not None]
+            try:
+                if runs:
+                    self._write(runs)
+            except Exception as e:
+                print(f"[HEADCOUNT_RUNS] Dropped {len(runs)} run(s): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, runs: List[Dict]):
+        from app.models import db, HeadcountRun
+        from app.db_engine import run_with_lock_retry
+
+        def _insert():
+            db.session.add_all([HeadcountRun(**run) for run in runs])
+            db.session.commit()
+
+        with self._app.app_context():
+            run_with_lock_retry(_insert)
+
+
+def get_discrepancy_trend(classroom_id: str, start: date, end: date) -> List[Dict]:
+    """
+    Per-day summary of a classroom's headcount runs between start and end (inclusive):
+    number of runs, average detected and scanned counts, and the largest and smallest
+    detected-minus-scanned difference.
+    """
+    from app.models import db, HeadcountRun
+
+    day = db.func.date(HeadcountRun.run_at)
+    difference = HeadcountRun.detected_count - HeadcountRun.scanned_count
+    rows = db.session.query(
+        day,
+        db.func.count(HeadcountRun.id),
+        db.func.avg(HeadcountRun.detected_count),
+        db.func.avg(HeadcountRun.scanned_count),
+        db.func.max(difference),
+        db.func.min(difference),
+    ).filter(
+        HeadcountRun.classroom_id == classroom_id,
+        HeadcountRun.run_at >= datetime.combine(start, time.min),
+        HeadcountRun.run_at < datetime.combine(end + timedelta(days=1), time.min)
+    ).group_by(day).order_by(day).all()
+
+    return [
+        {
+            'date': str(run_day),
+            'runs': runs,
+            'avg_detected': round(avg_detected, 2),
+            'avg_scanned': round(avg_scanned, 2),
+            'max_difference': max_difference,
+            'min_difference': min_difference,
+        }
+        for run_day, runs, avg_detected, avg_scanned, max_difference, min_difference in rows
+    ]
+
+
+def get_runs(classroom_id: str, start: date, end: date, limit: int = 100) -> List[Dict]:
+    """A classroom's runs between start and end (inclusive), newest first."""
+    from app.models import HeadcountRun
+
+    runs = HeadcountRun.query.filter(
+        HeadcountRun.classroom_id == classroom_id,
+        HeadcountRun.run_at >= datetime.combine(start, time.min),
+        HeadcountRun.run_at < datetime.combine(end + timedelta(days=1), time.min)
+    ).order_by(HeadcountRun.run_at.desc()).limit(limit).all()
+    return [run.to_dict() for run in runs]
+
+
+# Global instance
+headcount_runs = HeadcountRunRecorder()
@@ -0,0 +1,170 @@
+"""
+Bounded-memory image ingest for /headcount.
+Uploads are read into a per-thread preallocated buffer (no intermediate bytes
+copies), the image dimensions are read from the header alone, and the image is
+decoded straight to grayscale at a reduced scale (IMREAD_REDUCED_GRAYSCALE_2/4/8)
+so the decoded frame is no larger than the detector's working size.
+"""
+import struct
+import threading
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Decode flags by reduction factor
+_GRAY_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+_COLOR_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# JPEG start-of-frame markers (SOF0-SOF15 except DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers without a length field
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds the configured image size limit."""
+
+
+def read_image_size(data) -> Optional[Tuple[int, int]]:
+    """Return (width, height) from a JPEG, PNG, GIF, BMP or WebP header, or None if unknown."""
+    head = bytes(data[:32])
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and len(head) >= 24:
+        return struct.unpack('>II', head[16:24])
+    if head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+        return struct.unpack('<HH', head[6:10])
+    if head.startswith(b'BM') and len(head) >= 26:
+        width, height = struct.unpack('<ii', head[18:26])
+        return width, abs(height)
+    if head.startswith(b'RIFF') and head[8:12] == b'WEBP' and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            b0, b1, b2, b3 = head[21:25]
+            return 1 + (((b1 & 0x3F) << 8) | b0), 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+        if chunk == b'VP8X':
+            return 1 + int.from_bytes(head[24:27], 'little'), 1 + int.from_bytes(head[27:30], 'little')
+        return None
+    if head.startswith(b'\xff\xd8'):
+        return _read_jpeg_size(data)
+    return None
+
+
+def _read_jpeg_size(data) -> Optional[Tuple[int, int]]:
+    """Walk JPEG segment headers (skipping their payloads) up to the start-of-frame marker."""
+    i = 2
+    size = len(data)
+    while i + 4 <= size:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1  # Fill byte
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            i += 2
+            continue
+        length = (data[i + 2] << 8) | data[i + 3]
+        if marker in _JPEG_SOF_MARKERS:
+            if i + 9 > size:
+                return None
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        i += 2 + length
+    return None
+
+
+def choose_reduction(width: int, height: int, max_side: int) -> int:
+    """Smallest of 1, 2, 4, 8 that brings the long side to max_side or below (8 if none does)."""
+    long_side = max(width, height)
+    for factor in (1, 2, 4):
+        if long_side / factor <= max_side:
+            return factor
+    return 8
+
+
+class ImageIngest:
+    """Reads uploads into reusable buffers and decodes them at the detector's working size."""
+
+    def __init__(self):
+        self.max_bytes = 10 * 1024 * 1024
+        self.max_side = 1280
+        self._local = threading.local()
+
+    def init_app(self, app):
+        """Configure limits from app config."""
+        self.max_bytes = app.config.get('HEADCOUNT_MAX_IMAGE_BYTES', 10 * 1024 * 1024)
+        self.max_side = app.config.get('HEADCOUNT_WORKING_SIZE', 1280)
+        self._local = threading.local()
+
+    def read_upload(self, stream) -> memoryview:
+        """
+        Read a whole upload stream into this thread's buffer and return a view of it.
+        The view is only valid until the next read_upload on the same thread.
+        Raises UploadTooLarge past max_bytes.
+        """
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or len(buffer) != self.max_bytes + 1:
+            # One spare byte detects uploads that are larger than the limit
+            buffer = self._local.buffer = bytearray(self.max_bytes + 1)
+        view = memoryview(buffer)
+
+        total = 0
+        readinto = getattr(stream, 'readinto', None)
+        while total < len(buffer):
+            if readinto is not None:
+                read = readinto(view[total:])
+            else:
+                chunk = stream.read(len(buffer) - total)
+                read = len(chunk) if chunk else 0
+                view[total:total + read] = chunk or b''
+            if not read:
+                break
+            total += read
+
+        if total > self.max_bytes:
+            raise UploadTooLarge(f'File too large. Maximum size is {self.max_bytes // (1024 * 1024)}MB.')
+        return view[:total]
+
+    def decode_for_detection(self, data, color: bool = False) -> Tuple[Optional[np.ndarray], float]:
+        """
+        Decode an image no larger than max_side on its long side.
+        Returns (image, scale) where scale maps decoded coordinates back to the original;
+        image is None if the bytes cannot be decoded.
+        """
+        size = read_image_size(data)
+        factor = choose_reduction(*size, self.max_side) if size else 1
+        flags = _COLOR_FLAGS if color else _GRAY_FLAGS
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), flags[factor])
+        if image is None or image.size == 0:
+            return None, 1.0
+
+        if size is not None:
+            # Long side over long side: imdecode applies EXIF orientation, so a rotated
+            # JPEG comes out transposed relative to its header dimensions
+            return image, max(size) / max(image.shape[:2])
+
+        # Unknown header: decoded at full size, so shrink before detection if needed
+        long_side = max(image.shape[:2])
+        if long_side <= self.max_side:
+            return image, 1.0
+        ratio = self.max_side / long_side
+        image = cv2.resize(image, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
+        return image, 1 / ratio
+
+
+# Global instance
+image_ingest = ImageIngest()
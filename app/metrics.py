@@ -0,0 +1,47 @@
+"""
+Lightweight in-process metrics registry.
+Counters and gauges are per worker process; /api/metrics reports the values of
+the worker that served the request.
+"""
+import os
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class Metrics:
+    """Thread-safe counters and gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, object] = {}
+
+    def incr(self, name: str, value: int = 1):
+        """Increment a counter."""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value):
+        """Set a gauge to a value (numbers or small config values)."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def snapshot(self) -> Dict:
+        """Return a copy of all metrics."""
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges)
+            }
+
+    def reset(self):
+        """Clear all counters and gauges."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+
+# Global instance
+metrics = Metrics()
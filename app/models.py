@@ -1,12 +1,14 @@
 """
 Database models for the attendance system using Flask-SQLAlchemy.
 """
+import json
 from datetime import datetime, date
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import ForeignKey, Table, Column, Integer, String, DateTime, Date, Time, CheckConstraint
+from sqlalchemy import ForeignKey, Table, Column, Integer, String, Text, Float, Boolean, DateTime, Date, Time, LargeBinary, CheckConstraint, Index
 from sqlalchemy.orm import relationship, validates
+from app.read_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class User(db.Model):
@@ -18,6 +20,7 @@ class User(db.Model):
     password_hash = Column(String(255), nullable=False)
     role = Column(String(20), nullable=False, default='Student')
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Legacy OTP columns; OTPs now live in app.otp_store and these are no longer written
     otp = Column(String(6), nullable=True)
     otp_expiry = Column(DateTime, nullable=True)
 
@@ -49,7 +52,9 @@ enrollment_table = Table(
     db.Model.metadata,
     Column('student_id', String(50), ForeignKey('students.id'), primary_key=True),
     Column('classroom_id', String(50), ForeignKey('classrooms.id'), primary_key=True),
-    Column('enrolled_at', DateTime, default=datetime.utcnow)
+    Column('enrolled_at', DateTime, default=datetime.utcnow),
+    # Roster lookups go by classroom; the primary key leads with student_id
+    Index('ix_enrollments_classroom_student', 'classroom_id', 'student_id')
 )
 
 
@@ -69,6 +74,11 @@ class Student(db.Model):
     attendance_records = relationship('AttendanceRecord', back_populates='student', cascade='all, delete-orphan')
     user = relationship('User', back_populates='student')
     
+    __table_args__ = (
+        # Keyset pagination sorts students by (name, id)
+        Index('ix_students_name_id', 'name', 'id'),
+    )
+    
     def to_dict(self):
         """Convert student to dictionary."""
         # Prefer linked user email if local email is not set
@@ -97,11 +107,19 @@ class Classroom(db.Model):
     time_window_end = Column(Time, nullable=False, default='18:00')
     subject = Column(String(200), nullable=True)
     department = Column(String(200), nullable=True)
+    detector_backend = Column(String(20), nullable=True)  # Headcount detector override (haar | lbp | dnn)
+    # Camera profile: seating ROI polygon (JSON [[x, y], ...] as fractions of the frame),
+    # expected face size range in pixels and detector scale factor
+    camera_roi = Column(Text, nullable=True)
+    camera_min_face_size = Column(Integer, nullable=True)
+    camera_max_face_size = Column(Integer, nullable=True)
+    camera_scale_factor = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     students = relationship('Student', secondary=enrollment_table, back_populates='enrollments')
     attendance_records = relationship('AttendanceRecord', back_populates='classroom', cascade='all, delete-orphan')
+    sessions = relationship('ClassSession', back_populates='classroom', cascade='all, delete-orphan')
     
     def to_dict(self):
         """Convert classroom to dictionary."""
@@ -112,6 +130,13 @@ class Classroom(db.Model):
             'time_window_end': self.time_window_end.strftime('%H:%M') if self.time_window_end else None,
             'subject': self.subject,
             'department': self.department,
+            'detector_backend': self.detector_backend,
+            'camera_profile': {
+                'roi': json.loads(self.camera_roi) if self.camera_roi else None,
+                'min_face_size': self.camera_min_face_size,
+                'max_face_size': self.camera_max_face_size,
+                'scale_factor': self.camera_scale_factor
+            },
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
@@ -119,6 +144,50 @@ class Classroom(db.Model):
         return f'<Classroom {self.id}: {self.name}>'
 
 
+class ClassSession(db.Model):
+    """
+    One weekly timetable slot of a classroom, optionally limited to a term.
+    A classroom with sessions is only open during them; one without any falls
+    back to its daily time window.
+    """
+    __tablename__ = 'sessions'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    classroom_id = Column(String(50), ForeignKey('classrooms.id'), nullable=False)
+    day_of_week = Column(Integer, nullable=False)  # 0 = Monday ... 6 = Sunday
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    term_start = Column(Date, nullable=True)  # First day the session runs (inclusive)
+    term_end = Column(Date, nullable=True)  # Last day the session runs (inclusive)
+    subject = Column(String(200), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    classroom = relationship('Classroom', back_populates='sessions')
+    
+    __table_args__ = (
+        CheckConstraint('day_of_week BETWEEN 0 AND 6', name='check_session_day_of_week'),
+        CheckConstraint('start_time < end_time', name='check_session_times'),
+        Index('ix_sessions_classroom_day', 'classroom_id', 'day_of_week'),
+    )
+    
+    def to_dict(self):
+        """Convert session to dictionary."""
+        return {
+            'id': self.id,
+            'classroom_id': self.classroom_id,
+            'day_of_week': self.day_of_week,
+            'start_time': self.start_time.strftime('%H:%M') if self.start_time else None,
+            'end_time': self.end_time.strftime('%H:%M') if self.end_time else None,
+            'term_start': self.term_start.isoformat() if self.term_start else None,
+            'term_end': self.term_end.isoformat() if self.term_end else None,
+            'subject': self.subject
+        }
+    
+    def __repr__(self):
+        return f'<ClassSession {self.id}: {self.classroom_id} day {self.day_of_week} {self.start_time}-{self.end_time}>'
+
+
 class AttendanceRecord(db.Model):
     """Attendance record model."""
     __tablename__ = 'attendance_records'
@@ -126,6 +195,7 @@ class AttendanceRecord(db.Model):
     id = Column(Integer, primary_key=True, autoincrement=True)
     student_id = Column(String(50), ForeignKey('students.id'), nullable=False)
     classroom_id = Column(String(50), ForeignKey('classrooms.id'), nullable=False)
+    session_id = Column(Integer, ForeignKey('sessions.id'), nullable=True)  # Timetable session, if any
     timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
     status = Column(String(20), nullable=False, default='present')
     ai_headcount = Column(Integer, nullable=True)  # AI detected headcount for verification
@@ -136,12 +206,21 @@ class AttendanceRecord(db.Model):
     student = relationship('Student', back_populates='attendance_records')
     classroom = relationship('Classroom', back_populates='attendance_records')
     
+    __table_args__ = (
+        # Per-classroom, per-day listings are range scans over timestamp
+        Index('ix_attendance_classroom_timestamp', 'classroom_id', 'timestamp', 'id'),
+        Index('ix_attendance_session_timestamp', 'session_id', 'timestamp'),
+        # Recent-scan polling: a classroom's records after a since_id cursor
+        Index('ix_attendance_classroom_id', 'classroom_id', 'id'),
+    )
+    
     def to_dict(self):
         """Convert attendance record to dictionary."""
         return {
             'id': self.id,
             'student_id': self.student_id,
             'classroom_id': self.classroom_id,
+            'session_id': self.session_id,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
             'status': self.status,
             'ai_headcount': self.ai_headcount,
@@ -151,3 +230,120 @@ class AttendanceRecord(db.Model):
     
     def __repr__(self):
         return f'<AttendanceRecord {self.id}: {self.student_id} in {self.classroom_id} at {self.timestamp}>'
+
+
+class ClassroomCounter(db.Model):
+    """Denormalized per-classroom enrollment count, maintained by the enrollment write path."""
+    __tablename__ = 'classroom_counters'
+    
+    classroom_id = Column(String(50), ForeignKey('classrooms.id'), primary_key=True)
+    enrolled_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ClassroomCounter {self.classroom_id}: {self.enrolled_count} enrolled>'
+
+
+class ClassroomDayCounter(db.Model):
+    """Denormalized per-classroom, per-day present count, maintained by the attendance write path."""
+    __tablename__ = 'classroom_day_counters'
+    
+    classroom_id = Column(String(50), ForeignKey('classrooms.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    present_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ClassroomDayCounter {self.classroom_id} {self.day}: {self.present_count} present>'
+
+
+class ClassroomMember(db.Model):
+    """
+    A student's dense bit position in a classroom's attendance bitmaps, assigned on first
+    enrollment (or first attendance) and never reused, so older bitmaps stay valid.
+    """
+    __tablename__ = 'classroom_members'
+    
+    classroom_id = Column(String(50), ForeignKey('classrooms.id'), primary_key=True)
+    student_id = Column(String(50), primary_key=True)
+    bit = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        Index('ux_classroom_members_classroom_bit', 'classroom_id', 'bit', unique=True),
+    )
+    
+    def __repr__(self):
+        return f'<ClassroomMember {self.student_id} in {self.classroom_id}: bit {self.bit}>'
+
+
+class AttendanceBitmap(db.Model):
+    """
+    Who attended a classroom on a day, as a little-endian bitset over ClassroomMember.bit
+    (numpy.packbits(..., bitorder='little')), maintained by the attendance write path.
+    """
+    __tablename__ = 'attendance_bitmaps'
+    
+    classroom_id = Column(String(50), ForeignKey('classrooms.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    bits = Column(LargeBinary, nullable=False, default=b'')
+    
+    def __repr__(self):
+        return f'<AttendanceBitmap {self.classroom_id} {self.day}: {len(self.bits or b"")} byte(s)>'
+
+
+class RosterChange(db.Model):
+    """
+    One enrollment change, numbered by a global, strictly increasing roster version.
+    Scanners cache a classroom's roster and fetch only the changes after their version.
+    """
+    __tablename__ = 'roster_changes'
+    
+    version = Column(Integer, primary_key=True, autoincrement=True)
+    classroom_id = Column(String(50), ForeignKey('classrooms.id'), nullable=False)
+    student_id = Column(String(50), nullable=False)
+    op = Column(String(10), nullable=False)  # add | remove
+    changed_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Deltas are range scans over one classroom's versions
+        Index('ix_roster_changes_classroom_version', 'classroom_id', 'version'),
+        # AUTOINCREMENT: versions are never reused, even after the newest change is deleted
+        {'sqlite_autoincrement': True},
+    )
+    
+    def __repr__(self):
+        return f'<RosterChange {self.version}: {self.op} {self.student_id} in {self.classroom_id}>'
+
+
+class HeadcountRun(db.Model):
+    """One /headcount detection run, kept for auditing AI count against QR scans."""
+    __tablename__ = 'headcount_runs'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    classroom_id = Column(String(50), ForeignKey('classrooms.id'), nullable=False)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    detected_count = Column(Integer, nullable=False)
+    scanned_count = Column(Integer, nullable=False)
+    detector_params = Column(Text, nullable=True)  # JSON of the detector parameters used
+    duration_ms = Column(Float, nullable=True)
+    cached = Column(Boolean, nullable=False, default=False)
+    
+    __table_args__ = (
+        # Discrepancy trends are range scans over one classroom's runs
+        Index('ix_headcount_runs_classroom_run_at', 'classroom_id', 'run_at'),
+    )
+    
+    def to_dict(self):
+        """Convert headcount run to dictionary."""
+        return {
+            'id': self.id,
+            'classroom_id': self.classroom_id,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'detected_count': self.detected_count,
+            'scanned_count': self.scanned_count,
+            'difference': self.detected_count - self.scanned_count,
+            'detector_params': json.loads(self.detector_params) if self.detector_params else None,
+            'duration_ms': self.duration_ms,
+            'cached': self.cached
+        }
+    
+    def __repr__(self):
+        return f'<HeadcountRun {self.id}: {self.classroom_id} {self.detected_count}/{self.scanned_count}>'
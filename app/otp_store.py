@@ -0,0 +1,190 @@
+"""
+TTL-based OTP store.
+Keeps one-time login codes out of the users table so the login path does not
+write to the main database. The default backend is an in-memory map (one per
+worker process); the SQLite-file backend is shared by all workers on a host.
+"""
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Verification results
+OTP_OK = 'ok'
+OTP_INVALID = 'invalid'
+OTP_EXPIRED = 'expired'
+OTP_LOCKED = 'locked'
+
+
+class MemoryOTPBackend:
+    """In-process map of email -> (otp, expires_at, attempts)."""
+
+    def __init__(self, sweep_interval: float = 60.0):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[str, float, int]] = {}
+        self._sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+
+    def put(self, email: str, otp: str, expires_at: float):
+        with self._lock:
+            self._entries[email] = (otp, expires_at, 0)
+            self._maybe_sweep(time.time())
+
+    def check(self, email: str, otp: str, now: float, max_attempts: int) -> str:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return OTP_INVALID
+            stored_otp, expires_at, attempts = entry
+            if now > expires_at:
+                del self._entries[email]
+                return OTP_EXPIRED
+            if attempts >= max_attempts:
+                del self._entries[email]
+                return OTP_LOCKED
+            if not secrets.compare_digest(stored_otp, otp):
+                self._entries[email] = (stored_otp, expires_at, attempts + 1)
+                return OTP_INVALID
+            del self._entries[email]
+            return OTP_OK
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        with self._lock:
+            return self._purge(now if now is not None else time.time())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _maybe_sweep(self, now: float):
+        if now - self._last_sweep >= self._sweep_interval:
+            self._purge(now)
+
+    def _purge(self, now: float) -> int:
+        expired = [email for email, (_, expires_at, _) in self._entries.items() if now > expires_at]
+        for email in expired:
+            del self._entries[email]
+        self._last_sweep = now
+        return len(expired)
+
+
+class SQLiteOTPBackend:
+    """OTP table in its own SQLite file, so login traffic never contends with scan writes."""
+
+    def __init__(self, path: str, sweep_interval: float = 60.0):
+        self.path = path
+        self._sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS otps ('
+            ' email TEXT PRIMARY KEY,'
+            ' otp TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_otps_expires_at ON otps (expires_at)')
+
+    def put(self, email: str, otp: str, expires_at: float):
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO otps (email, otp, expires_at, attempts) VALUES (?, ?, ?, 0)',
+            (email, otp, expires_at)
+        )
+        now = time.time()
+        if now - self._last_sweep >= self._sweep_interval:
+            self.purge_expired(now)
+
+    def check(self, email: str, otp: str, now: float, max_attempts: int) -> str:
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front so concurrent attempts are counted exactly
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT otp, expires_at, attempts FROM otps WHERE email = ?', (email,)).fetchone()
+            if row is None:
+                result = OTP_INVALID
+            else:
+                stored_otp, expires_at, attempts = row
+                if now > expires_at:
+                    result = OTP_EXPIRED
+                elif attempts >= max_attempts:
+                    result = OTP_LOCKED
+                elif not secrets.compare_digest(stored_otp, otp):
+                    result = OTP_INVALID
+                else:
+                    result = OTP_OK
+
+                if result == OTP_INVALID:
+                    conn.execute('UPDATE otps SET attempts = attempts + 1 WHERE email = ?', (email,))
+                else:
+                    conn.execute('DELETE FROM otps WHERE email = ?', (email,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return result
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        now = now if now is not None else time.time()
+        cursor = self._connection().execute('DELETE FROM otps WHERE expires_at < ?', (now,))
+        self._last_sweep = now
+        return cursor.rowcount
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM otps').fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """One autocommit connection per thread."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=20, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+
+class OTPStore:
+    """Issues and verifies OTPs against the configured backend."""
+
+    def __init__(self):
+        self.backend = MemoryOTPBackend()
+        self.ttl_seconds = 300
+        self.max_attempts = 5
+
+    def init_app(self, app):
+        """Select the backend from app config."""
+        self.ttl_seconds = app.config.get('OTP_TTL_SECONDS', 300)
+        self.max_attempts = app.config.get('OTP_MAX_ATTEMPTS', 5)
+
+        backend = app.config.get('OTP_STORE', 'memory')
+        if backend == 'sqlite':
+            path = app.config.get('OTP_STORE_PATH') or os.path.join(app.instance_path, 'otp_store.db')
+            self.backend = SQLiteOTPBackend(path)
+            print(f"[OTP_STORE] Using SQLite OTP store at {path}")
+        elif backend == 'memory':
+            self.backend = MemoryOTPBackend()
+        else:
+            raise ValueError(f"Unknown OTP_STORE backend: {backend}")
+
+    def issue(self, email: str) -> str:
+        """Generate and store a new 6-digit OTP for email, replacing any previous one."""
+        otp = str(secrets.randbelow(900000) + 100000)
+        self.backend.put(email.lower(), otp, time.time() + self.ttl_seconds)
+        return otp
+
+    def verify(self, email: str, otp: str) -> str:
+        """
+        Check an OTP. Returns one of OTP_OK, OTP_INVALID, OTP_EXPIRED, OTP_LOCKED.
+        A successful, expired or locked-out check consumes the entry.
+        """
+        return self.backend.check(email.lower(), str(otp), time.time(), self.max_attempts)
+
+
+# Global instance
+otp_store = OTPStore()
@@ -0,0 +1,71 @@
+"""
+Keyset (cursor) pagination helpers for list APIs.
+Cursors are opaque URL-safe tokens encoding the sort key of the last row of a
+page, so pages stay stable when rows are inserted between requests.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values: List) -> str:
+    """Encode the sort key of the last row of a page."""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: Optional[str], size: int,
+                  converters: Optional[Sequence[Callable]] = None) -> Optional[List]:
+    """
+    Decode a cursor produced by encode_cursor, passing each key part through its converter.
+    Raises ValueError if the token is malformed, has the wrong number of key parts, or a
+    part does not convert.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    if converters:
+        try:
+            values = [convert(value) for convert, value in zip(converters, values)]
+        except (ValueError, TypeError) as e:
+            raise ValueError('Invalid cursor') from e
+    return values
+
+
+def iso_timestamp(value: str) -> str:
+    """Cursor converter for an ISO timestamp key part (normalized)."""
+    return datetime.fromisoformat(value).isoformat()
+
+
+def parse_limit(value: Optional[str], default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Parse a ?limit= value, clamped to 1..MAX_PAGE_SIZE. Raises ValueError if not an integer."""
+    if value is None or value == '':
+        return default
+    limit = int(value)
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_page_args(args, cursor_size: int,
+                    converters: Optional[Sequence[Callable]] = None) -> Tuple[Optional[List], int]:
+    """(after, limit) from ?after=&limit=. Raises ValueError for a bad cursor or limit."""
+    return decode_cursor(args.get('after'), cursor_size, converters), parse_limit(args.get('limit'))
+
+
+def wants_legacy_list(args) -> bool:
+    """True when the client asked for the old unpaginated response (?legacy=1)."""
+    return args.get('legacy', '').lower() in ('1', 'true', 'yes')
+
+
+def wants_columnar(args) -> bool:
+    """True when the client asked for the compact {'columns': [...], 'rows': [[...]]} shape (?format=columnar)."""
+    return args.get('format', '').lower() == 'columnar'
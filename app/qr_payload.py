@@ -0,0 +1,117 @@
+"""
+Signed student QR payloads.
+A signed code reads "SA1.<student_id>.<issued_at>.<mac>", where mac is a
+truncated HMAC-SHA256 of the student id and issue time under a key derived
+from QR_SECRET_KEY (or SECRET_KEY). /scan_qr verifies it in memory, so malformed or forged
+codes are rejected before any database work. Plain student-id codes are still
+accepted until the configured migration cutoff.
+"""
+import base64
+import hashlib
+import hmac
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytz
+
+from app.metrics import metrics
+
+SIGNED_PREFIX = 'SA1.'
+MAC_BYTES = 10
+# Same limit as students.id; no whitespace or control characters
+_PLAIN_ID = re.compile(r'^[^\s\x00-\x1f\x7f]{1,50}$')
+_DIGITS = re.compile(r'^[0-9]{1,12}$')
+# Signed codes issued this far in the future are treated as forged
+_CLOCK_SKEW_SECONDS = 300
+
+
+class InvalidQRPayload(ValueError):
+    """The scanned QR text is not a valid student code."""
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+class QRPayloadCodec:
+    """Encodes and verifies student QR payloads."""
+
+    def __init__(self):
+        self.sign_new_codes = False
+        self.plain_accepted_until: Optional[float] = None
+        self.min_issued_at = 0
+        self._key = b''
+
+    def init_app(self, app):
+        """Configure signing from app config."""
+        self.sign_new_codes = bool(app.config.get('QR_SIGNED'))
+        self.plain_accepted_until = None
+        cutoff = app.config.get('QR_PLAIN_ACCEPTED_UNTIL')
+        if cutoff:
+            # Plain codes stay valid through the end of the cutoff day (local time)
+            day = datetime.strptime(cutoff, '%Y-%m-%d') + timedelta(days=1)
+            self.plain_accepted_until = pytz.timezone('Asia/Kolkata').localize(day).timestamp()
+        self.min_issued_at = app.config.get('QR_MIN_ISSUED_AT', 0)
+        secret = app.config.get('QR_SECRET_KEY')
+        if not secret:
+            # The built-in SECRET_KEY is in the source, so anyone could mint codes with it
+            if self.sign_new_codes:
+                raise RuntimeError("QR_SIGNED is on but neither QR_SECRET_KEY nor SECRET_KEY is set")
+            secret = app.config['SECRET_KEY']
+        # A purpose-specific key, so QR MACs cannot be replayed as other signatures
+        self._key = hmac.new(secret.encode('utf-8'), b'student-qr', hashlib.sha256).digest()
+
+    def encode(self, student_id: str, issued_at: Optional[int] = None) -> str:
+        """The text to put in a student's QR code (signed if QR_SIGNED is on)."""
+        if not self.sign_new_codes:
+            return student_id
+        if issued_at is None:
+            issued_at = int(time.time())
+        return f'{SIGNED_PREFIX}{student_id}.{issued_at}.{self._mac(student_id, issued_at)}'
+
+    def decode(self, payload: str, now: Optional[float] = None) -> str:
+        """
+        Return the student id from scanned QR text. Pure CPU, no database access.
+        Raises InvalidQRPayload for malformed, forged, revoked or (after the cutoff) plain codes.
+        """
+        if not isinstance(payload, str):
+            raise self._reject('malformed', 'Invalid QR code')
+        if now is None:
+            now = time.time()
+
+        if not payload.startswith(SIGNED_PREFIX):
+            if self.plain_accepted_until is not None and now > self.plain_accepted_until:
+                raise self._reject('unsigned', 'This QR code is no longer accepted, please get a new one')
+            if not _PLAIN_ID.match(payload):
+                raise self._reject('malformed', 'Invalid QR code')
+            return payload
+
+        # The student id may itself contain dots, so split from the right
+        parts = payload[len(SIGNED_PREFIX):].rsplit('.', 2)
+        if (len(parts) != 3 or not _PLAIN_ID.match(parts[0]) or not _DIGITS.match(parts[1])
+                or not parts[2].isascii()):
+            raise self._reject('malformed', 'Invalid QR code')
+        student_id, issued, mac = parts[0], int(parts[1]), parts[2]
+
+        if not hmac.compare_digest(mac, self._mac(student_id, issued)):
+            raise self._reject('forged', 'Invalid QR code')
+        if issued < self.min_issued_at:
+            raise self._reject('revoked', 'This QR code has been replaced, please get a new one')
+        if issued > now + _CLOCK_SKEW_SECONDS:
+            raise self._reject('forged', 'Invalid QR code')
+        return student_id
+
+    def _mac(self, student_id: str, issued_at: int) -> str:
+        message = f'{student_id}.{issued_at}'.encode('utf-8')
+        return _b64(hmac.new(self._key, message, hashlib.sha256).digest()[:MAC_BYTES])
+
+    @staticmethod
+    def _reject(reason: str, message: str) -> InvalidQRPayload:
+        metrics.incr(f'qr_rejected_{reason}')
+        return InvalidQRPayload(message)
+
+
+# Global instance
+qr_codec = QRPayloadCodec()
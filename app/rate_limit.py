@@ -0,0 +1,127 @@
+"""
+Scan rate limiting.
+A token bucket per scanner session caps how fast one scanner can submit scans,
+and a short debounce window per student drops repeat submissions of the same QR.
+Both run in memory so over-limit requests never reach the database.
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.metrics import metrics
+
+
+class TokenBucketLimiter:
+    """Token bucket per key: refills at `rate` tokens/second up to `burst` tokens."""
+
+    def __init__(self, rate: float = 5.0, burst: int = 10, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, last_refill)
+
+    def allow(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """
+        Take one token for key.
+        Returns (allowed, retry_after_seconds).
+        """
+        if now is None:
+            now = time.monotonic()
+
+        with self._lock:
+            tokens, last = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+
+            if tokens >= 1.0:
+                self._buckets[key] = (tokens - 1.0, now)
+                allowed, retry_after = True, 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed, retry_after = False, (1.0 - tokens) / self.rate if self.rate > 0 else 1.0
+
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+
+        return allowed, retry_after
+
+    def _prune(self, now: float):
+        """Drop buckets that have refilled completely; they behave the same as new ones. Caller holds the lock."""
+        full_after = self.burst / self.rate if self.rate > 0 else 0
+        self._buckets = {
+            key: (tokens, last) for key, (tokens, last) in self._buckets.items()
+            if now - last < full_after
+        }
+
+
+class DebounceWindow:
+    """Rejects a key seen again within `window` seconds of its last accepted occurrence."""
+
+    def __init__(self, window: float = 2.0, max_keys: int = 50000):
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._last_seen: Dict[str, float] = {}
+
+    def allow(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Returns (allowed, retry_after_seconds)."""
+        if self.window <= 0:
+            return True, 0.0
+        if now is None:
+            now = time.monotonic()
+
+        with self._lock:
+            last = self._last_seen.get(key)
+            if last is not None and now - last < self.window:
+                return False, self.window - (now - last)
+
+            self._last_seen[key] = now
+            if len(self._last_seen) > self.max_keys:
+                self._last_seen = {k: t for k, t in self._last_seen.items() if now - t < self.window}
+        return True, 0.0
+
+
+class ScanRateLimiter:
+    """Combines the per-scanner token bucket and per-student debounce for /scan_qr."""
+
+    def __init__(self):
+        self.enabled = True
+        self.scanner_limiter = TokenBucketLimiter()
+        self.student_debounce = DebounceWindow()
+
+    def init_app(self, app):
+        """Configure limits from app config and publish them as gauges."""
+        self.enabled = app.config.get('SCAN_RATE_LIMIT_ENABLED', True)
+        self.scanner_limiter = TokenBucketLimiter(
+            rate=app.config.get('SCAN_RATE_LIMIT_PER_SECOND', 5.0),
+            burst=app.config.get('SCAN_RATE_LIMIT_BURST', 10)
+        )
+        self.student_debounce = DebounceWindow(window=app.config.get('SCAN_DEBOUNCE_SECONDS', 2.0))
+
+        metrics.set_gauge('scan_rate_limit.enabled', self.enabled)
+        metrics.set_gauge('scan_rate_limit.per_second', self.scanner_limiter.rate)
+        metrics.set_gauge('scan_rate_limit.burst', self.scanner_limiter.burst)
+        metrics.set_gauge('scan_rate_limit.debounce_seconds', self.student_debounce.window)
+
+    def check_scanner(self, scanner_key: str) -> Tuple[bool, float]:
+        """Apply the token bucket for a scanner session."""
+        metrics.incr('scan_requests')
+        if not self.enabled:
+            return True, 0.0
+        allowed, retry_after = self.scanner_limiter.allow(scanner_key)
+        if not allowed:
+            metrics.incr('scan_rate_limited')
+        return allowed, retry_after
+
+    def check_student(self, student_id: str) -> Tuple[bool, float]:
+        """Apply the debounce window for a student id."""
+        if not self.enabled:
+            return True, 0.0
+        allowed, retry_after = self.student_debounce.allow(student_id)
+        if not allowed:
+            metrics.incr('scan_debounced')
+        return allowed, retry_after
+
+
+# Global instance
+scan_rate_limiter = ScanRateLimiter()
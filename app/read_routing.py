@@ -0,0 +1,201 @@
+"""
+Read/write engine routing.
+When a read engine is configured (DATABASE_READ_URL, or READ_SNAPSHOT_SECONDS for
+a periodically refreshed copy of the primary SQLite file), SELECTs issued inside
+@use_read_replica functions go to the read engine; everything else, and any
+statement in a transaction that has already written, goes to the primary.
+Endpoints that must show a client its own recent writes opt in with
+read_your_writes=True and read from the primary for READ_YOUR_WRITES_SECONDS
+after that client's last write.
+"""
+import fcntl
+import functools
+import os
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from flask import current_app, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+# app.extensions key of the read engine
+READ_ENGINE = 'read_engine'
+
+# 'read' or 'primary' once the outermost @use_read_replica call has decided, else None
+_route: ContextVar[Optional[str]] = ContextVar('db_read_route', default=None)
+
+
+def _mark_write(db_session):
+    db_session.info['wrote'] = True
+    # Stamped on the client's (cookie) session, not g: app code pushes nested app contexts
+    if has_request_context() and READ_ENGINE in current_app.extensions:
+        flask_session['db_write_at'] = time.time()
+
+
+class RoutingSession(FlaskSession):
+    """db.session class that sends reads to the read engine inside @use_read_replica functions."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and clause is not None:
+            if getattr(clause, 'is_dml', False):
+                _mark_write(self)
+            elif _route.get() == 'read' and getattr(clause, 'is_select', False) and not self.info.get('wrote'):
+                read_engine = current_app.extensions.get(READ_ENGINE)
+                if read_engine is not None:
+                    return read_engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(db_session, flush_context):
+    _mark_write(db_session)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+@event.listens_for(RoutingSession, 'after_rollback')
+def _after_transaction(db_session):
+    db_session.info.pop('wrote', None)
+
+
+def _wrote_recently() -> bool:
+    if not has_request_context():
+        return False
+    last_write = flask_session.get('db_write_at')
+    return last_write is not None and time.time() - last_write < current_app.config.get('READ_YOUR_WRITES_SECONDS', 5)
+
+
+def use_read_replica(read_your_writes: bool = False) -> Callable:
+    """
+    Route the SELECTs of the decorated function to the read engine. The outermost decorated
+    call decides, so an endpoint's read_your_writes=True also covers the methods it calls.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _route.get() is not None:
+                return func(*args, **kwargs)
+            token = _route.set('primary' if read_your_writes and _wrote_recently() else 'read')
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _route.reset(token)
+        return wrapper
+    return decorator
+
+
+def init_read_engine(app):
+    """
+    Create the read engine from config. It is kept out of SQLALCHEMY_BINDS so create_all/drop_all
+    never touch the replica, and it refuses writes (PRAGMA query_only) on SQLite.
+    """
+    url = app.config.get('DATABASE_READ_URL')
+    if not url and app.config.get('READ_SNAPSHOT_SECONDS'):
+        primary = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        if primary.get_backend_name() != 'sqlite' or primary.database in (None, '', ':memory:'):
+            print("[READ_ROUTING] Snapshots need a file-based SQLite primary, reading from the primary")
+            return
+        path = app.config.get('READ_SNAPSHOT_PATH') or os.path.join(app.instance_path, 'read_snapshot.db')
+        app.config['READ_SNAPSHOT_PATH'] = path
+        url = f'sqlite:///{path}'
+    if not url:
+        return
+
+    engine = create_engine(url)
+    if app.config.get('SQLITE_ENGINE_PROFILE', 'tuned') == 'tuned':
+        from app.db_engine import TUNED_SQLITE_PRAGMAS, configure_sqlite_engine
+        # The replica's journal mode belongs to whoever writes it
+        pragmas = {name: value for name, value in TUNED_SQLITE_PRAGMAS.items()
+                   if name not in ('journal_mode', 'synchronous')}
+        pragmas['query_only'] = 'ON'
+        configure_sqlite_engine(engine, pragmas)
+    app.extensions[READ_ENGINE] = engine
+    print(f"[READ_ROUTING] Read engine: {url}")
+
+
+class ReadSnapshot:
+    """Keeps the read bind's SQLite file a recent copy of the primary, refreshed in the background."""
+
+    def __init__(self):
+        self.path = None
+        self.interval = 0
+        self._app = None
+        self._primary_path = None
+        self._inode = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        """Take a first snapshot and start the refresher. Run after schema setup and seeding."""
+        self.shutdown()
+        self.interval = app.config.get('READ_SNAPSHOT_SECONDS', 0)
+        if not self.interval or app.config.get('DATABASE_READ_URL') or READ_ENGINE not in app.extensions:
+            return
+
+        self._app = app
+        self._primary_path = make_url(app.config['SQLALCHEMY_DATABASE_URI']).database
+        self._inode = None
+        self.path = app.config['READ_SNAPSHOT_PATH']
+        # Always copy at startup: the file may predate a schema change, or be an empty file
+        # created by an early connect to the read engine
+        self.refresh(force=True)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='read-snapshot', daemon=True)
+        self._thread.start()
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Copy the primary into the snapshot file if it is older than the interval (or force).
+        Workers share the file: the lock makes sure only one of them copies it per interval.
+        Returns True if this worker now reads a new snapshot.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + '.lock', 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            stale = (not os.path.exists(self.path)
+                     or time.time() - os.path.getmtime(self.path) >= self.interval)
+            if force or stale:
+                tmp_path = f'{self.path}.tmp-{os.getpid()}'
+                source = sqlite3.connect(self._primary_path)
+                target = sqlite3.connect(tmp_path)
+                try:
+                    source.backup(target)
+                    # A WAL snapshot would leave -wal/-shm files behind that do not match the next copy
+                    target.execute('PRAGMA journal_mode=DELETE')
+                except Exception:
+                    target.close()
+                    os.remove(tmp_path)
+                    raise
+                finally:
+                    target.close()
+                    source.close()
+                os.replace(tmp_path, self.path)
+
+        inode = os.stat(self.path).st_ino
+        if inode == self._inode:
+            return False
+        self._inode = inode
+        # Pooled connections still read the replaced file; drop them
+        self._app.extensions[READ_ENGINE].dispose()
+        return True
+
+    def shutdown(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[READ_ROUTING] Snapshot refresh failed: {e}")
+
+
+# Global instance
+read_snapshot = ReadSnapshot()
@@ -0,0 +1,61 @@
+"""
+Versioned classroom rosters for scanner caching.
+The enrollment write paths append a RosterChange in their own transaction, so
+every roster has a monotonic version. A scanner downloads the full roster once
+and afterwards asks only for the changes since its version, compacted to the
+final add/remove per student.
+"""
+from typing import Dict, Optional
+
+from app.models import db, RosterChange, enrollment_table
+
+
+def record_roster_change(classroom_id: str, student_id: str, op: str):
+    """Append an enrollment change. Runs in the caller's transaction; the caller commits."""
+    if op not in ('add', 'remove'):
+        raise ValueError(f"Unknown roster op: {op}")
+    db.session.add(RosterChange(classroom_id=classroom_id, student_id=student_id, op=op))
+
+
+def get_roster_version(classroom_id: str) -> int:
+    """The version of a classroom's roster (0 if it has never changed since versioning began)."""
+    return db.session.query(db.func.max(RosterChange.version)).filter(
+        RosterChange.classroom_id == classroom_id
+    ).scalar() or 0
+
+
+def get_roster(classroom_id: str, since: Optional[int] = None) -> Dict:
+    """
+    A classroom's roster, or the changes to it after version `since`.
+    Returns {'version', 'full': True, 'student_ids'} for a full roster and
+    {'version', 'full': False, 'added', 'removed'} for a delta.
+    """
+    # A version from the future means the scanner's cache predates a database reset
+    if since and since <= get_roster_version(classroom_id):
+        changes = db.session.query(RosterChange.version, RosterChange.student_id, RosterChange.op).filter(
+            RosterChange.classroom_id == classroom_id,
+            RosterChange.version > since
+        ).order_by(RosterChange.version).all()
+
+        # Only each student's last change matters to a cached roster
+        final_ops = {}
+        for _, student_id, op in changes:
+            final_ops[student_id] = op
+        return {
+            'version': changes[-1].version if changes else since,
+            'full': False,
+            'added': sorted(sid for sid, op in final_ops.items() if op == 'add'),
+            'removed': sorted(sid for sid, op in final_ops.items() if op == 'remove')
+        }
+
+    # Read the version first: a change committed in between shows up again in the next delta,
+    # which is harmless because applying a delta is idempotent
+    version = get_roster_version(classroom_id)
+    rows = db.session.query(enrollment_table.c.student_id).filter(
+        enrollment_table.c.classroom_id == classroom_id
+    ).order_by(enrollment_table.c.student_id).all()
+    return {
+        'version': version,
+        'full': True,
+        'student_ids': [student_id for (student_id,) in rows]
+    }
@@ -1,20 +1,184 @@
 """
 Flask routes for the attendance system.
 """
-from flask import request, jsonify, render_template, send_file, session, redirect, url_for
-from datetime import datetime
+from flask import request, jsonify, render_template, send_file, session, redirect, url_for, g
+from datetime import datetime, timedelta
 import cv2
 import numpy as np
 import pytz
 
 import os
 import io
+import time
+import tempfile
+import uuid
 import qrcode
 from app.attendance_manager import attendance_manager
-from app.headcount_detector import headcount_detector
-from app.models import db, User, Student, AttendanceRecord
-import random
-from datetime import timedelta
+from app.scan_dedupe import scan_dedupe
+from app.rate_limit import scan_rate_limiter
+from app.metrics import metrics
+from app.otp_store import otp_store, OTP_OK, OTP_EXPIRED, OTP_LOCKED
+from app.pagination import iso_timestamp, parse_limit, parse_page_args, wants_columnar, wants_legacy_list
+from app.student_search import student_search, DEFAULT_SEARCH_LIMIT
+from app.headcount_detector import headcount_detectors, BACKENDS as DETECTOR_BACKENDS
+from app.headcount_cache import headcount_cache, make_cache_key
+from app.headcount_runs import headcount_runs, get_discrepancy_trend, get_runs
+from app.image_ingest import image_ingest, UploadTooLarge
+from app.camera_profile import CameraProfile, load_camera_profile
+from app.timetable import parse_session_payload
+from app.scanner_tokens import scanner_tokens
+from app.qr_payload import qr_codec, InvalidQRPayload
+from app.roster import get_roster
+from app.scan_events import scan_events, parse_cursor
+from app.archive import attendance_archive
+from app.attendance_bitmap import absent_students, attendance_streaks, present_students
+from app.read_routing import use_read_replica
+from app.headcount_frames import (frame_headcounter, iter_clip_frames, iter_image_frames,
+                                  aggregate_counts, AGGREGATES, CLIP_EXTENSIONS)
+from app.models import db, User, Student, Classroom, ClassSession
+
+
+def _too_many_scans(message, retry_after):
+    """Build a 429 scan rejection with a Retry-After header."""
+    response = jsonify({
+        'status': 'rejected',
+        'message': message
+    })
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response, 429
+
+
+def _columnar_body(columns, rows, next_cursor=None, paginated=True, **fields):
+    """A ?format=columnar response body: column names once, then one array per row."""
+    body = dict(fields, columns=columns, rows=rows)
+    if paginated:
+        body['next_cursor'] = next_cursor
+        body['has_more'] = next_cursor is not None
+    return body
+
+
+# Endpoints whose outcomes go to the scan event journal, and the source recorded for each
+_SCAN_EVENT_SOURCES = {'scan_qr': 'qr', 'manual_checkin': 'manual'}
+
+
+def _open_scanner_session(classroom_id, session_id=None):
+    """
+    Issue a scanner token for a classroom and optional timetable session.
+    Returns (binding, None) or (None, (error_body, status)).
+    """
+    if db.session.get(Classroom, classroom_id) is None:
+        return None, ({'error': 'Classroom not found'}, 404)
+    if session_id not in (None, ''):
+        try:
+            session_id = int(session_id)
+        except (TypeError, ValueError):
+            return None, ({'error': 'session_id must be an integer'}, 400)
+        timetable_session = db.session.get(ClassSession, session_id)
+        if timetable_session is None or timetable_session.classroom_id != classroom_id:
+            return None, ({'error': 'Session not found for this classroom'}, 404)
+    else:
+        session_id = None
+    
+    print(f"[SCANNER] Opened scanner for classroom '{classroom_id}' (session {session_id})")
+    return {
+        'classroom_id': classroom_id,
+        'session_id': session_id,
+        'scanner_token': scanner_tokens.issue(classroom_id, session_id),
+        'expires_in': scanner_tokens.max_age
+    }, None
+
+
+def _multi_frame_headcount():
+    """
+    /headcount for a short clip ('video') or a burst of stills ('frames').
+    Optional form fields: stride (sample every n-th frame), aggregate (median | max_consensus).
+    """
+    classroom_id = request.form.get('classroom_id')
+    if not classroom_id:
+        return jsonify({'error': 'classroom_id is required', 'headcount': 0}), 400
+
+    detector_backend = headcount_detectors.backend_for_classroom(classroom_id)
+    headcount_detector = headcount_detectors.get(detector_backend)
+    camera_profile = load_camera_profile(classroom_id)
+    if headcount_detector is None:
+        return jsonify({
+            'error': 'AI headcount detector is not available. Please check server configuration.',
+            'headcount': 0
+        }), 503
+
+    try:
+        stride = max(1, int(request.form.get('stride', frame_headcounter.stride)))
+    except ValueError:
+        return jsonify({'error': 'stride must be an integer', 'headcount': 0}), 400
+    aggregate = request.form.get('aggregate', frame_headcounter.aggregate)
+    if aggregate not in AGGREGATES:
+        return jsonify({'error': f"aggregate must be one of: {', '.join(AGGREGATES)}", 'headcount': 0}), 400
+
+    started = time.perf_counter()
+    clip_path = None
+    try:
+        if 'video' in request.files:
+            clip = request.files['video']
+            extension = clip.filename.rsplit('.', 1)[1].lower() if '.' in clip.filename else ''
+            if extension not in CLIP_EXTENSIONS:
+                return jsonify({
+                    'error': f"Invalid clip type. Allowed: {', '.join(sorted(CLIP_EXTENSIONS))}",
+                    'headcount': 0
+                }), 400
+            # The decoder needs a path; save() copies the upload in chunks
+            fd, clip_path = tempfile.mkstemp(suffix=f'.{extension}')
+            os.close(fd)
+            clip.save(clip_path)
+            frames = iter_clip_frames(clip_path, stride, frame_headcounter.max_frames)
+        else:
+            frames = iter_image_frames(request.files.getlist('frames'), stride, frame_headcounter.max_frames)
+
+        results = frame_headcounter.count_frames(frames, headcount_detectors.factory(detector_backend),
+                                                 profile=camera_profile)
+    except ValueError as ve:
+        return jsonify({'error': f'Frame processing error: {str(ve)}', 'headcount': 0}), 400
+    finally:
+        if clip_path:
+            os.remove(clip_path)
+
+    if not results:
+        return jsonify({'error': 'No frames could be read from the upload', 'headcount': 0}), 400
+
+    counts = [r['count'] for r in results]
+    detected_count = aggregate_counts(counts, aggregate)
+    # Boxes from the first frame that agrees with the aggregate (or the nearest one)
+    representative = min(results, key=lambda r: abs(r['count'] - detected_count))
+
+    try:
+        scanned_count = attendance_manager.get_classroom_stats(classroom_id)['scanned_count']
+    except Exception as attendance_error:
+        scanned_count = 0
+        print(f"Error getting attendance count: {attendance_error}")
+
+    comparison = {
+        'detected_count': detected_count,
+        'scanned_count': scanned_count,
+        'difference': detected_count - scanned_count,
+        'status': 'match' if detected_count == scanned_count else 'mismatch'
+    }
+
+    headcount_runs.record(
+        classroom_id, detected_count, scanned_count,
+        detector_params={**headcount_detector.params, 'stride': stride,
+                         'aggregate': aggregate, 'frames': len(results),
+                         'cameraProfile': camera_profile.to_dict() if camera_profile else None},
+        duration_ms=round((time.perf_counter() - started) * 1000, 2)
+    )
+
+    return jsonify({
+        'headcount': detected_count,
+        'comparison': comparison,
+        'aggregate': aggregate,
+        'frames_sampled': len(results),
+        'frame_counts': [{'frame': r['frame'], 'count': r['count']} for r in results],
+        'detections': representative['detections'],
+        'detections_frame': representative['frame']
+    }), 200
 
 
 def register_routes(app):
@@ -37,6 +201,27 @@ def register_routes(app):
             
             return redirect(url_for('login'))
     
+    @app.after_request
+    def journal_scan_decision(response):
+        """Append the outcome of each scan and manual check-in to the scan event journal (queued, no I/O)."""
+        source = _SCAN_EVENT_SOURCES.get(request.endpoint)
+        if source and scan_events.enabled:
+            body = response.get_json(silent=True) or {}
+            accepted = response.status_code == 200
+            scanned_at = g.get('scan_timestamp')
+            scan_events.append(
+                'accepted' if accepted else 'rejected',
+                None if accepted else (body.get('message') or body.get('error')),
+                student_id=g.get('scan_student_id'),
+                classroom_id=g.get('scan_classroom_id'),
+                session_id=g.get('scan_session_id'),
+                # The attendance record's time (the capture time of an offline scan), naive local
+                scanned_at=scanned_at.replace(tzinfo=None).isoformat() if scanned_at else None,
+                source=source,
+                http_status=response.status_code
+            )
+        return response
+    
     @app.route('/')
     def home_page():
         """Serve the home page (redirects to login)."""
@@ -70,13 +255,24 @@ def register_routes(app):
     
     @app.route('/student/scanner')
     def student_scanner():
-        """Serve the QR scanner page."""
+        """
+        Serve the QR scanner page.
+        With ?classroom_id= (and optionally &session_id=) the page is bound to that classroom
+        and sends a signed scanner token with each scan.
+        """
         # Scanner Protection: Teacher only
         if session.get('role') != 'Teacher':
             # Redirect to student profile if logged in but wrong role
             return redirect(url_for('student_profile'))
-            
-        return render_template('scanner.html')
+        
+        classroom_id = request.args.get('classroom_id')
+        if not classroom_id:
+            return render_template('scanner.html')
+        
+        binding, error = _open_scanner_session(classroom_id, request.args.get('session_id'))
+        if error:
+            return render_template('scanner.html', scanner_error=error[0]['error']), error[1]
+        return render_template('scanner.html', scanner=binding)
 
     @app.route('/login/reset')
     def login_reset():
@@ -127,20 +323,9 @@ def register_routes(app):
                  if is_api: return jsonify({'error': error_msg}), 403
                  return render_template('login.html', error=error_msg)
 
-            # Generate OTP
-            otp = str(random.randint(100000, 999999))
-            otp_expiry = datetime.utcnow() + timedelta(minutes=5)
-
-            # Check/Create user
-            user = User.query.filter_by(email=email).first()
-            if not user:
-                # Create new user
-                user = User(email=email, password_hash='OTP_AUTH', role='Student')
-                db.session.add(user)
-            
-            user.otp = otp
-            user.otp_expiry = otp_expiry
-            db.session.commit()
+            # Generate OTP and keep it in the OTP store (no write to the users table;
+            # the user row is created on successful verification)
+            otp = otp_store.issue(email)
 
             # PRINT OTP TO TERMINAL as requested
             print(f"\n[LOGIN] OTP for {email}: {otp}\n")
@@ -179,42 +364,34 @@ def register_routes(app):
                 if is_api: return jsonify({'error': error_msg}), 400
                 return render_template('login.html', error=error_msg)
 
-            # Check if user exists (should exist from login step, but safe to check)
-            user = User.query.filter_by(email=email).first()
+            # Check the OTP against the OTP store (consumed on success, attempts counted on failure)
+            otp_result = otp_store.verify(email, otp)
+            if otp_result != OTP_OK:
+                if otp_result == OTP_EXPIRED:
+                    error_msg = 'OTP has expired'
+                elif otp_result == OTP_LOCKED:
+                    error_msg = 'Too many attempts. Please request a new OTP'
+                else:
+                    error_msg = 'Invalid OTP'
+                if is_api: return jsonify({'error': error_msg}), 401
+                return render_template('login.html', error=error_msg)
+
+            # OTP valid - get or create the user
+            user = User.query.filter_by(email=email.lower()).first()
 
             if not user:
-                # Auto-create user if they don't exist (handle case where /verify is hit directly or weird state)
+                # First successful login for this email: this is the first write to the users table
                 print(f"[VERIFY] User {email} not found. Creating new user...")
                 try:
                     user = User(email=email, password_hash='OTP_AUTH', role='Student')
                     db.session.add(user)
                     db.session.commit()
                     # Refresh user instance
-                    user = User.query.filter_by(email=email).first()
+                    user = User.query.filter_by(email=email.lower()).first()
                 except Exception as e:
                     db.session.rollback()
                     print(f"[VERIFY] Error creating user: {e}")
                     return jsonify({'error': 'Failed to create user'}), 500
-
-            if user.otp != otp:
-                error_msg = 'Invalid OTP'
-                if is_api: return jsonify({'error': error_msg}), 401
-                return render_template('login.html', error=error_msg)
-            
-            if user.otp_expiry and datetime.utcnow() > user.otp_expiry:
-                error_msg = 'OTP has expired'
-                if is_api: return jsonify({'error': error_msg}), 401
-                return render_template('login.html', error=error_msg)
-
-            # OTP Valid - clear it
-            try:
-                user.otp = None
-                user.otp_expiry = None
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                print(f"[VERIFY] Error clearing OTP: {e}")
-                return jsonify({'error': 'Database error'}), 500
             
             # --- Auto-generate Student Profile if missing ---
             if user.role == 'Student' and user.student is None:
@@ -396,8 +573,12 @@ def register_routes(app):
             return jsonify({'error': str(e)}), 500
     
     @app.route('/api/admin/data', methods=['GET'])
+    @use_read_replica(read_your_writes=True)
     def get_admin_data():
-        """Get all admin data."""
+        """
+        Get all admin data, one page at a time (legacy=1 for the old dict keyed by classroom_id).
+        format=columnar returns {'columns', 'rows'} (all classrooms with legacy=1).
+        """
         try:
             classroom_id = request.args.get('classroom_id')
             
@@ -406,9 +587,27 @@ def register_routes(app):
                 if not data:
                     return jsonify({'error': 'Classroom not found'}), 404
                 return jsonify(data), 200
-            else:
+            
+            legacy = wants_legacy_list(request.args)
+            try:
+                after, limit = (None, None) if legacy else parse_page_args(request.args, 1)
+            except ValueError as ve:
+                return jsonify({'error': str(ve)}), 400
+            
+            if wants_columnar(request.args):
+                columns, rows, next_cursor = attendance_manager.get_admin_data_rows(after, limit)
+                return jsonify(_columnar_body(columns, rows, next_cursor, paginated=not legacy)), 200
+            elif legacy:
+                # Unpaginated dict keyed by classroom_id (backward compatible)
                 data = attendance_manager.get_all_admin_data()
                 return jsonify(data), 200
+            else:
+                classrooms, next_cursor = attendance_manager.get_admin_data_page(after, limit)
+                return jsonify({
+                    'classrooms': classrooms,
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
+                }), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -416,9 +615,16 @@ def register_routes(app):
     def generate_student_qr(student_id):
         """
         Generate a QR code for a student.
-        The QR code contains only the student_id as a string.
-        This is the permanent QR code for each student.
+        The QR code contains the student_id, signed with its issue time when QR_SIGNED is on.
+        This is the permanent QR code for each student. Teachers and admins can print any
+        student's code; a student only their own.
         """
+        role = session.get('role')
+        if role not in ['Teacher', 'Admin']:
+            user = db.session.get(User, session['user_id']) if role == 'Student' and session.get('user_id') else None
+            if user is None or user.student is None or user.student.id != student_id:
+                return jsonify({'error': 'Unauthorized'}), 403
+        
         try:
             # Verify student exists
             if student_id not in attendance_manager.students:
@@ -432,8 +638,8 @@ def register_routes(app):
                 border=4,
             )
             
-            # The QR code data is just the student_id string
-            qr.add_data(student_id)
+            # The QR code data is the student_id string (or its signed payload)
+            qr.add_data(qr_codec.encode(student_id))
             qr.make(fit=True)
             
             # Create image from QR code
@@ -456,9 +662,32 @@ def register_routes(app):
             return jsonify({'error': f'Error generating student QR code: {str(e)}'}), 500
     
     @app.route('/api/students', methods=['GET'])
+    @use_read_replica(read_your_writes=True)
     def get_students():
-        """Get list of all students."""
+        """
+        Get students sorted by name, one page at a time.
+        Query params: after (cursor from the previous page), limit (default 100, max 500).
+        Pass legacy=1 for the old unpaginated list, format=columnar for {'columns', 'rows'}.
+        """
         try:
+            legacy = wants_legacy_list(request.args)
+            try:
+                after, limit = (None, None) if legacy else parse_page_args(request.args, 2)
+            except ValueError as ve:
+                return jsonify({'error': str(ve), 'students': []}), 400
+            
+            if wants_columnar(request.args):
+                columns, rows, next_cursor = attendance_manager.get_student_rows(after, limit)
+                return jsonify(_columnar_body(columns, rows, next_cursor, paginated=not legacy)), 200
+            
+            if not legacy:
+                student_list, next_cursor = attendance_manager.get_students_page(after, limit)
+                return jsonify({
+                    'students': student_list,
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
+                }), 200
+            
             students = attendance_manager.students
             # Convert to list format for frontend
             student_list = [
@@ -475,6 +704,27 @@ def register_routes(app):
         except Exception as e:
             return jsonify({'error': str(e), 'students': []}), 500
     
+    @app.route('/api/students/search', methods=['GET'])
+    def search_students():
+        """
+        Search students by name, id or email prefix.
+        Query params: q (required), limit (default 10, max 50), classroom_id (optional roster filter).
+        """
+        try:
+            query = request.args.get('q', '').strip()
+            if not query:
+                return jsonify({'error': 'Missing q', 'students': []}), 400
+            
+            try:
+                limit = int(request.args.get('limit', DEFAULT_SEARCH_LIMIT))
+            except ValueError:
+                return jsonify({'error': 'limit must be an integer', 'students': []}), 400
+            
+            results = student_search.search(query, limit, request.args.get('classroom_id'))
+            return jsonify({'query': query, 'students': results}), 200
+        except Exception as e:
+            return jsonify({'error': str(e), 'students': []}), 500
+    
     @app.route('/dashboard')
     def dashboard():
         """Serve the teacher dashboard page."""
@@ -488,20 +738,20 @@ def register_routes(app):
     def get_current_class():
         """Get the currently active class based on time window."""
         try:
-            current_time = datetime.now(pytz.timezone('Asia/Kolkata'))
-            all_admin_data = attendance_manager.get_all_admin_data()
+            # Find active class (timetable session or daily time window)
+            active_session = attendance_manager.get_active_session()
             
-            # Find active class (within time window)
-            for classroom_id, class_data in all_admin_data.items():
-                if attendance_manager.is_within_time_window(classroom_id, current_time):
-                    return jsonify({
-                        'classroom_id': classroom_id,
-                        'subject': class_data.get('subject'),
-                        'department': class_data.get('department'),
-                        'classroom': class_data.get('classroom'),
-                        'start_time': class_data.get('start_time'),
-                        'end_time': class_data.get('end_time')
-                    }), 200
+            if active_session is not None:
+                class_data = attendance_manager.get_admin_data(active_session.classroom_id)
+                return jsonify({
+                    'classroom_id': active_session.classroom_id,
+                    'session_id': active_session.session_id,
+                    'subject': active_session.subject or class_data.get('subject'),
+                    'department': class_data.get('department'),
+                    'classroom': class_data.get('classroom'),
+                    'start_time': active_session.start.strftime('%H:%M'),
+                    'end_time': active_session.end.strftime('%H:%M')
+                }), 200
             
             # No active class found
             return jsonify({
@@ -521,13 +771,10 @@ def register_routes(app):
             if not classroom_id:
                 return jsonify({'error': 'Missing classroom_id'}), 400
             
-            # Get scanned count
-            scanned_count = attendance_manager.get_attendance_count(classroom_id)
-            
-            # Get total enrolled
-            total_enrolled = 0
-            if classroom_id in attendance_manager.enrollments:
-                total_enrolled = len(attendance_manager.enrollments[classroom_id])
+            # Enrolled and scanned counts come from the per-classroom counters
+            stats = attendance_manager.get_classroom_stats(classroom_id)
+            scanned_count = stats['scanned_count']
+            total_enrolled = stats['total_enrolled']
             
             return jsonify({
                 'classroom_id': classroom_id,
@@ -539,25 +786,33 @@ def register_routes(app):
             return jsonify({'error': str(e)}), 500
     
     @app.route('/api/dashboard/recent-scans', methods=['GET'])
+    @use_read_replica(read_your_writes=True)
     def get_recent_scans():
-        """Get recent attendance scans for a classroom."""
+        """
+        Get today's most recent attendance scans for a classroom, newest first.
+        Query params: classroom_id, limit (default 10), since_id (last_id from the previous
+        poll: only newer scans are returned).
+        """
         try:
             classroom_id = request.args.get('classroom_id')
-            limit = int(request.args.get('limit', 10))
             
             if not classroom_id:
                 return jsonify({'error': 'Missing classroom_id'}), 400
             
-            # Get today's attendance records
-            records = attendance_manager.get_attendance_list(classroom_id)
+            try:
+                limit = parse_limit(request.args.get('limit'), default=10)
+                since_id = int(request.args['since_id']) if request.args.get('since_id') else None
+            except ValueError:
+                return jsonify({'error': 'Invalid since_id or limit'}), 400
             
-            # Sort by timestamp (most recent first) and limit
-            records.sort(key=lambda x: x['timestamp'], reverse=True)
-            recent_records = records[:limit]
+            day = datetime.now(pytz.timezone('Asia/Kolkata')).date()
+            scans, last_id = attendance_manager.get_recent_scans(classroom_id, since_id, limit, day)
             
             return jsonify({
                 'classroom_id': classroom_id,
-                'scans': recent_records
+                'day': day.isoformat(),
+                'scans': scans,
+                'last_id': last_id
             }), 200
             
         except Exception as e:
@@ -573,13 +828,10 @@ def register_routes(app):
             if not classroom_id:
                 return jsonify({'error': 'Missing classroom_id'}), 400
             
-            # Get scanned count
-            scanned_count = attendance_manager.get_attendance_count(classroom_id)
-            
-            # Get total enrolled
-            total_enrolled = 0
-            if classroom_id in attendance_manager.enrollments:
-                total_enrolled = len(attendance_manager.enrollments[classroom_id])
+            # Enrolled and scanned counts come from the per-classroom counters
+            stats = attendance_manager.get_classroom_stats(classroom_id)
+            scanned_count = stats['scanned_count']
+            total_enrolled = stats['total_enrolled']
             
             return jsonify({
                 'classroom_id': classroom_id,
@@ -600,8 +852,11 @@ def register_routes(app):
         to count the number of people in a classroom image.
         
         Method: POST
-        Input: multipart/form-data with 'image' file (classroom photo)
-        Returns: JSON with headcount number
+        Input: multipart/form-data with 'image' file (classroom photo), a raw image body
+               (application/octet-stream, ?classroom_id=...), or a short
+               'video' clip (mp4, avi, mjpeg, ...) or several 'frames' images; multi-frame
+               uploads also accept 'stride' and 'aggregate' (median | max_consensus)
+        Returns: JSON with headcount number (plus per-frame counts for multi-frame uploads)
         
         Example Request:
             POST /headcount
@@ -614,149 +869,167 @@ def register_routes(app):
             }
         """
         try:
-            # Step 1: Check if image file is present in the request
-            # Flask stores uploaded files in request.files dictionary
-            if 'image' not in request.files:
-                return jsonify({
-                    'error': 'No image file provided',
-                    'headcount': 0
-                }), 400
+            # Multi-frame input: a short clip or a burst of stills, reduced to one count
+            if 'video' in request.files or 'frames' in request.files:
+                return _multi_frame_headcount()
             
-            # Step 1b: Get classroom_id from request form data
-            classroom_id = request.form.get('classroom_id')
-            if not classroom_id:
-                return jsonify({
-                    'error': 'classroom_id is required',
-                    'headcount': 0
-                }), 400
-            
-            # Step 2: Get the uploaded file
-            file = request.files['image']
-            
-            # Step 3: Check if a file was actually selected (not empty)
-            if file.filename == '':
-                return jsonify({
-                    'error': 'No file selected',
-                    'headcount': 0
-                }), 400
+            # Raw body (Content-Type: application/octet-stream, classroom_id in the query string)
+            # skips multipart parsing entirely
+            raw_body = request.mimetype == 'application/octet-stream'
             
-            # Step 4: Validate file extension
-            # Only allow common image formats
-            allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
-            file_extension = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
+            if raw_body:
+                classroom_id = request.args.get('classroom_id')
+                if not classroom_id:
+                    return jsonify({
+                        'error': 'classroom_id is required',
+                        'headcount': 0
+                    }), 400
+                upload_stream = request.stream
+            else:
+                # Step 1: Check if image file is present in the request
+                # Flask stores uploaded files in request.files dictionary
+                if 'image' not in request.files:
+                    return jsonify({
+                        'error': 'No image file provided',
+                        'headcount': 0
+                    }), 400
+                
+                # Step 1b: Get classroom_id from request form data
+                classroom_id = request.form.get('classroom_id')
+                if not classroom_id:
+                    return jsonify({
+                        'error': 'classroom_id is required',
+                        'headcount': 0
+                    }), 400
+                
+                # Step 2: Get the uploaded file
+                file = request.files['image']
+                
+                # Step 3: Check if a file was actually selected (not empty)
+                if file.filename == '':
+                    return jsonify({
+                        'error': 'No file selected',
+                        'headcount': 0
+                    }), 400
+                
+                # Step 4: Validate file extension
+                # Only allow common image formats
+                allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
+                file_extension = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
+                
+                if file_extension not in allowed_extensions:
+                    return jsonify({
+                        'error': 'Invalid file type. Allowed: png, jpg, jpeg, gif, bmp, webp',
+                        'headcount': 0
+                    }), 400
+                upload_stream = file.stream
             
-            if file_extension not in allowed_extensions:
+            # Step 5: Read the upload into this worker's preallocated buffer (no bytes copies)
+            try:
+                file_bytes = image_ingest.read_upload(upload_stream)
+            except UploadTooLarge as too_large:
                 return jsonify({
-                    'error': 'Invalid file type. Allowed: png, jpg, jpeg, gif, bmp, webp',
+                    'error': str(too_large),
                     'headcount': 0
                 }), 400
             
-            # Step 5: Read and decode the image file
-            # Check file size before reading (max 10MB for images)
-            file.seek(0, 2)  # Seek to end
-            file_size = file.tell()
-            file.seek(0)  # Reset to beginning
-            
-            if file_size == 0:
+            if len(file_bytes) == 0:
                 return jsonify({
                     'error': 'Uploaded file is empty',
                     'headcount': 0
                 }), 400
             
-            if file_size > 10 * 1024 * 1024:  # 10MB limit
-                return jsonify({
-                    'error': 'File too large. Maximum size is 10MB.',
-                    'headcount': 0
-                }), 400
-            
-            # Read the file bytes into memory
-            file_bytes = file.read()
-            
-            # Double-check file is not empty after reading
-            if not file_bytes or len(file_bytes) == 0:
-                return jsonify({
-                    'error': 'Failed to read file data',
-                    'headcount': 0
-                }), 400
-            
-            # Convert file bytes to numpy array
-            # np.frombuffer creates an array from raw bytes
-            nparr = np.frombuffer(file_bytes, np.uint8)
-            
-            # Decode the image using OpenCV
-            # cv2.imdecode converts the byte array into an image (BGR format)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            # Step 6: Check if image was decoded successfully
-            if image is None:
-                return jsonify({
-                    'error': 'Could not decode image. Please ensure it is a valid image file.',
-                    'headcount': 0
-                }), 400
-            
-            # Validate image dimensions
-            if image.size == 0 or len(image.shape) < 2:
-                return jsonify({
-                    'error': 'Invalid image format or dimensions',
-                    'headcount': 0
-                }), 400
-            
-            # Step 7: Detect and count heads in the image using Haar Cascade
-            # Check if detector is available
+            # Step 6: Pick the classroom's detector backend and check it is available
+            headcount_detector = headcount_detectors.get(headcount_detectors.backend_for_classroom(classroom_id))
             if headcount_detector is None:
                 return jsonify({
                     'error': 'AI headcount detector is not available. Please check server configuration.',
                     'headcount': 0
                 }), 503
             
-            # The detect_people method will:
-            #   - Convert image to grayscale
-            #   - Use Haar Cascade to detect faces/heads
-            #   - Return count and detection details
-            try:
-                detected_count, detections = headcount_detector.detect_people(image)
-            except ValueError as ve:
-                # Handle image processing errors
-                return jsonify({
-                    'error': f'Image processing error: {str(ve)}',
-                    'headcount': 0
-                }), 400
-            except Exception as detection_error:
-                # Handle other detection errors
-                return jsonify({
-                    'error': f'Face detection error: {str(detection_error)}',
-                    'headcount': 0
-                }), 500
+            # The classroom's camera profile narrows detection to the seating area
+            camera_profile = load_camera_profile(classroom_id)
+            
+            # Step 7: Reuse the result of an identical earlier upload (same bytes, same detector
+            # parameters, same working size and camera profile)
+            started = time.perf_counter()
+            cache_key = make_cache_key(file_bytes, {
+                **headcount_detector.params,
+                'workingSize': image_ingest.max_side,
+                'cameraProfile': camera_profile.to_dict() if camera_profile else None
+            })
+            cached = headcount_cache.get(cache_key)
+            
+            if cached is not None:
+                detected_count, detections = cached['count'], cached['detections']
+            else:
+                # Decode at a reduced scale chosen from the header dimensions, straight to
+                # grayscale unless the backend needs color
+                image, scale = image_ingest.decode_for_detection(file_bytes, color=headcount_detector.needs_color)
+                
+                # Check if image was decoded successfully
+                if image is None:
+                    return jsonify({
+                        'error': 'Could not decode image. Please ensure it is a valid image file.',
+                        'headcount': 0
+                    }), 400
+                
+                # Detect and count heads in the image with the selected backend
+                # The detect_people method will:
+                #   - Validate the image
+                #   - Run the backend (Haar/LBP cascade or DNN) to detect faces/heads
+                #   - Return count and detection details
+                try:
+                    detected_count, detections = headcount_detector.detect_people(image, scale, camera_profile)
+                except ValueError as ve:
+                    # Handle image processing errors
+                    return jsonify({
+                        'error': f'Image processing error: {str(ve)}',
+                        'headcount': 0
+                    }), 400
+                except Exception as detection_error:
+                    # Handle other detection errors
+                    return jsonify({
+                        'error': f'Face detection error: {str(detection_error)}',
+                        'headcount': 0
+                    }), 500
+                
+                # Draw debug boxes on image and save debug image
+                # Create a color copy of the decoded image for drawing (don't modify original)
+                debug_image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image.copy()
+                
+                # Draw green boxes around detected faces (detections are in original coordinates)
+                for detection in detections:
+                    x = int(detection['x'] / scale)
+                    y = int(detection['y'] / scale)
+                    w = int(detection['width'] / scale)
+                    h = int(detection['height'] / scale)
+                    # Draw green rectangle (BGR format: (0, 255, 0) = green)
+                    cv2.rectangle(debug_image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                
+                # Outline the seating ROI in blue
+                if camera_profile is not None and camera_profile.roi:
+                    roi_polygon = camera_profile.polygon(debug_image.shape[1], debug_image.shape[0])
+                    cv2.polylines(debug_image, [roi_polygon.astype(np.int32)], True, (255, 0, 0), 2)
+                
+                # Ensure the debug uploads directory exists
+                debug_dir = os.path.join('app', 'static', 'uploads')
+                os.makedirs(debug_dir, exist_ok=True)
+                
+                # Save the annotated debug image
+                debug_image_path = os.path.join(debug_dir, 'debug_active.jpg')
+                cv2.imwrite(debug_image_path, debug_image)
+                
+                headcount_cache.put(cache_key, detected_count, detections)
             
-            # Step 8: Get scanned attendance count for this classroom
+            # Step 8: Get scanned attendance count for this classroom (always fresh)
             try:
-                scanned_count = attendance_manager.get_attendance_count(classroom_id)
+                scanned_count = attendance_manager.get_classroom_stats(classroom_id)['scanned_count']
             except Exception as attendance_error:
                 scanned_count = 0
                 print(f"Error getting attendance count: {attendance_error}")
             
-            # Step 9: Draw debug boxes on image and save debug image
-            # Create a copy of the image for drawing (don't modify original)
-            debug_image = image.copy()
-            
-            # Draw green boxes around detected faces
-            for detection in detections:
-                x = detection['x']
-                y = detection['y']
-                w = detection['width']
-                h = detection['height']
-                # Draw green rectangle (BGR format: (0, 255, 0) = green)
-                cv2.rectangle(debug_image, (x, y), (x + w, y + h), (0, 255, 0), 2)
-            
-            # Ensure the debug uploads directory exists
-            debug_dir = os.path.join('app', 'static', 'uploads')
-            os.makedirs(debug_dir, exist_ok=True)
-            
-            # Save the annotated debug image
-            debug_image_path = os.path.join(debug_dir, 'debug_active.jpg')
-            cv2.imwrite(debug_image_path, debug_image)
-            
-            # Step 10: Compare detected students with scanned students
+            # Step 9: Compare detected students with scanned students
             comparison = {
                 'detected_count': detected_count,
                 'scanned_count': scanned_count,
@@ -764,11 +1037,20 @@ def register_routes(app):
                 'status': 'match' if detected_count == scanned_count else 'mismatch'
             }
             
-            # Step 11: Return the headcount comparison in JSON format
+            # Keep the run for discrepancy audits (written in the background)
+            headcount_runs.record(
+                classroom_id, detected_count, scanned_count,
+                detector_params=headcount_detector.params,
+                duration_ms=round((time.perf_counter() - started) * 1000, 2),
+                cached=cached is not None
+            )
+            
+            # Step 10: Return the headcount comparison in JSON format
             return jsonify({
                 'headcount': detected_count,
                 'comparison': comparison,
-                'detections': detections
+                'detections': detections,
+                'cached': cached is not None
             }), 200
             
         except Exception as e:
@@ -782,6 +1064,45 @@ def register_routes(app):
                 'headcount': 0
             }), 500
     
+    @app.route('/api/headcount/history', methods=['GET'])
+    @use_read_replica()
+    def headcount_history():
+        """
+        AI-versus-scan discrepancy for a classroom over a date range.
+        Query params: classroom_id, from / to (YYYY-MM-DD, default the last 30 days),
+        runs=1 to include the individual runs (newest first, up to limit).
+        """
+        if session.get('role') not in ['Teacher', 'Admin']:
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        classroom_id = request.args.get('classroom_id')
+        if not classroom_id:
+            return jsonify({'error': 'Missing classroom_id'}), 400
+
+        try:
+            today = datetime.now(pytz.timezone('Asia/Kolkata')).date()
+            end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else today
+            start = (datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from')
+                     else end - timedelta(days=29))
+            limit = parse_limit(request.args.get('limit'))
+        except ValueError:
+            return jsonify({'error': 'Invalid date range or limit'}), 400
+        if start > end:
+            return jsonify({'error': 'from must not be after to'}), 400
+
+        try:
+            response = {
+                'classroom_id': classroom_id,
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'days': get_discrepancy_trend(classroom_id, start, end)
+            }
+            if request.args.get('runs', '').lower() in ('1', 'true', 'yes'):
+                response['runs'] = get_runs(classroom_id, start, end, limit)
+            return jsonify(response), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
     @app.route('/scan_qr', methods=['POST'])
     def scan_qr():
         """
@@ -790,7 +1111,10 @@ def register_routes(app):
         
         Input JSON:
         {
-            "student_id": "string"
+            "student_id": "string",       (scanned QR text: plain id or signed payload)
+            "scanner_token": "string",    (optional, from a bound scanner session)
+            "captured_at": number         (optional, bound scanners only: epoch ms when a scan
+                                           queued offline was captured)
         }
         
         Returns:
@@ -800,7 +1124,23 @@ def register_routes(app):
         }
         """
         try:
-            data = request.get_json()
+            data = request.get_json(silent=True)
+            scanner_token = (data or {}).get('scanner_token') or request.headers.get('X-Scanner-Token')
+            
+            # Per-scanner token bucket, checked before any database work: keyed by the bound scanner
+            # (one teacher can run scanners in several rooms), else by the browser session
+            bound_key = scanner_tokens.scanner_key(scanner_token) if scanner_token else None
+            if bound_key:
+                scanner_key = f"scanner:{bound_key}"
+            elif session:
+                scanner_key = f"session:{session.setdefault('scan_client_id', uuid.uuid4().hex)}"
+            else:
+                scanner_key = f"addr:{request.remote_addr}"
+            allowed, retry_after = scan_rate_limiter.check_scanner(scanner_key)
+            if not allowed:
+                print(f"[SCAN_QR] RATE LIMITED: scanner '{scanner_key}'")
+                return _too_many_scans('Too many scans from this scanner, slow down', retry_after)
+            
             
             # Validate input
             if not data:
@@ -823,6 +1163,87 @@ def register_routes(app):
                     'message': 'Missing student_id'
                 }), 400
             
+            # Verify the scanned payload (signature or plain-id format) before any database work
+            try:
+                student_id = qr_codec.decode(student_id)
+            except InvalidQRPayload as e:
+                print(f"[SCAN_QR] DENIED: {e}")
+                return jsonify({
+                    'status': 'rejected',
+                    'message': str(e)
+                }), 400
+            g.scan_student_id = student_id
+            
+            # Per-student debounce: drops the same QR decoded repeatedly while it is held up
+            allowed, retry_after = scan_rate_limiter.check_student(student_id)
+            if not allowed:
+                print(f"[SCAN_QR] DEBOUNCED: student '{student_id}'")
+                return _too_many_scans('Duplicate scan ignored, please wait', retry_after)
+            
+            # Automatically detect active classroom based on current time
+            scanned_at = None
+            if scanner_token:
+                # A scan queued offline is judged at its capture time, not its arrival
+                captured_at = data.get('captured_at')
+                if captured_at is not None:
+                    if isinstance(captured_at, bool) or not isinstance(captured_at, (int, float)):
+                        return jsonify({
+                            'status': 'rejected',
+                            'message': 'Invalid captured_at'
+                        }), 400
+                    captured_at = captured_at / 1000
+                
+                # Bound scanner: route straight to its classroom, but only while it is in session
+                binding = scanner_tokens.verify(scanner_token, captured_at)
+                if binding is None:
+                    print(f"[SCAN_QR] DENIED: Invalid or expired scanner token")
+                    return jsonify({
+                        'status': 'rejected',
+                        'message': 'Scanner session expired, please reopen the scanner'
+                    }), 401
+                
+                if captured_at is not None:
+                    scanned_at = datetime.fromtimestamp(captured_at, pytz.timezone('Asia/Kolkata'))
+                    active_session = attendance_manager.get_bound_session(
+                        binding['classroom_id'], binding['session_id'], scanned_at)
+                    if active_session is None:
+                        # Captured just after the bell
+                        active_session = attendance_manager.get_bound_session(
+                            binding['classroom_id'], binding['session_id'],
+                            scanned_at - timedelta(seconds=scanner_tokens.capture_grace))
+                else:
+                    active_session = attendance_manager.get_bound_session(binding['classroom_id'], binding['session_id'])
+                if active_session is None:
+                    print(f"[SCAN_QR] DENIED: Bound classroom '{binding['classroom_id']}' is not in session")
+                    return jsonify({
+                        'status': 'rejected',
+                        'message': 'This class is not in session right now'
+                    }), 403
+            else:
+                print(f"[SCAN_QR] Automatically detecting active classroom...")
+                active_session = attendance_manager.get_active_session()
+                
+                if active_session is None:
+                    print(f"[SCAN_QR] DENIED: No active class found at this time")
+                    return jsonify({
+                        'status': 'rejected',
+                        'message': 'No active class found at this time'
+                    }), 404
+            
+            active_classroom_id = active_session.classroom_id
+            session_id = active_session.session_id
+            g.scan_classroom_id, g.scan_session_id = active_classroom_id, session_id
+            print(f"[SCAN_QR] Active classroom detected: '{active_classroom_id}' (session {session_id})")
+            
+            # Reject repeat scans from the in-memory set before any student/roster lookups
+            scan_day = scanned_at.date() if scanned_at is not None else None
+            if scan_dedupe.contains(student_id, active_classroom_id, scan_day, session_id=session_id):
+                print(f"[SCAN_QR] DENIED: Attendance already marked for today (in-memory)")
+                return jsonify({
+                    'status': 'rejected',
+                    'message': 'Attendance already marked for today'
+                }), 409
+            
             # Check if student exists (queries database)
             all_students = attendance_manager.students
             print(f"[SCAN_QR] Available students in database: {list(all_students.keys())}")
@@ -838,19 +1259,6 @@ def register_routes(app):
             
             print(f"[SCAN_QR] Student '{student_id}' found in database")
             
-            # Automatically detect active classroom based on current time
-            print(f"[SCAN_QR] Automatically detecting active classroom...")
-            active_classroom_id = attendance_manager.get_active_classroom()
-            
-            if not active_classroom_id:
-                print(f"[SCAN_QR] DENIED: No active class found at this time")
-                return jsonify({
-                    'status': 'rejected',
-                    'message': 'No active class found at this time'
-                }), 404
-            
-            print(f"[SCAN_QR] Active classroom detected: '{active_classroom_id}'")
-            
             # Check if student is enrolled in the active classroom
             print(f"[SCAN_QR] Checking enrollment for student '{student_id}' in classroom '{active_classroom_id}'...")
             is_enrolled = attendance_manager.is_student_enrolled(student_id, active_classroom_id)
@@ -868,7 +1276,11 @@ def register_routes(app):
             
             # Mark attendance
             print(f"[SCAN_QR] Attempting to mark attendance for student '{student_id}' in classroom '{active_classroom_id}'...")
-            success = attendance_manager.mark_attendance(student_id, active_classroom_id)
+            # Pinned here so the journal records the same time as the attendance record
+            scanned_at = scanned_at or datetime.now(pytz.timezone('Asia/Kolkata'))
+            g.scan_timestamp = scanned_at
+            success = attendance_manager.mark_attendance(student_id, active_classroom_id, timestamp=scanned_at,
+                                                         session_id=session_id)
             
             if not success:
                 print(f"[SCAN_QR] DENIED: Attendance already marked for today")
@@ -900,6 +1312,37 @@ def register_routes(app):
             }), 500
     
 
+    @app.route('/api/metrics', methods=['GET'])
+    def get_metrics():
+        """Get in-process counters and configured limits for this worker."""
+        if session.get('role') not in ['Teacher', 'Admin']:
+            return jsonify({'error': 'Unauthorized'}), 403
+        return jsonify(metrics.snapshot()), 200
+
+    @app.route('/api/scan-events', methods=['GET'])
+    def get_scan_events():
+        """
+        Tail the scan event journal.
+        Query params: cursor (from a previous response; 'start' for the oldest event,
+        omitted for only events written from now on), limit.
+        Returns {'events': [...], 'cursor': ...}; poll again with the returned cursor.
+        """
+        if session.get('role') not in ['Teacher', 'Admin']:
+            return jsonify({'error': 'Unauthorized'}), 403
+        if not scan_events.enabled:
+            return jsonify({'error': 'Scan event journal is disabled'}), 404
+        
+        cursor = request.args.get('cursor') or None
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            if cursor == 'start':
+                cursor = scan_events.start_cursor()
+            elif cursor:
+                parse_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor or limit'}), 400
+        return jsonify(scan_events.tail(cursor, limit)), 200
+
     @app.route('/manual_checkin/<student_id>', methods=['POST'])
     def manual_checkin(student_id):
         """
@@ -910,15 +1353,18 @@ def register_routes(app):
             # Check if user is authorized (Teacher/Admin)
             if 'role' not in session or session['role'] not in ['Teacher', 'Admin']:
                 return jsonify({'error': 'Unauthorized'}), 403
+            g.scan_student_id = student_id
 
             # Automatically detect active classroom
-            active_classroom_id = attendance_manager.get_active_classroom()
+            active_session = attendance_manager.get_active_session()
             
-            if not active_classroom_id:
+            if active_session is None:
                 return jsonify({
                     'status': 'error',
                     'message': 'No active class found at this time'
                 }), 404
+            active_classroom_id = active_session.classroom_id
+            g.scan_classroom_id, g.scan_session_id = active_classroom_id, active_session.session_id
             
             # Check if student exists
             if student_id not in attendance_manager.students:
@@ -936,7 +1382,9 @@ def register_routes(app):
                 }), 403
             
             # Mark attendance
-            success = attendance_manager.mark_attendance(student_id, active_classroom_id)
+            g.scan_timestamp = datetime.now(pytz.timezone('Asia/Kolkata'))
+            success = attendance_manager.mark_attendance(student_id, active_classroom_id, timestamp=g.scan_timestamp,
+                                                         session_id=active_session.session_id)
             
             if not success:
                 return jsonify({
@@ -959,67 +1407,171 @@ def register_routes(app):
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/dashboard/enrolled-students', methods=['GET'])
+    @use_read_replica(read_your_writes=True)
     def get_enrolled_students():
-        """Get list of enrolled students for the active class with attendance status."""
+        """
+        Get enrolled students with today's attendance status.
+        Query params: classroom_id (optional; defaults to the classroom active right now).
+        """
         try:
-            # Get active classroom
-            active_classroom_id = attendance_manager.get_active_classroom()
+            classroom_id = request.args.get('classroom_id') or attendance_manager.get_active_classroom()
             
-            if not active_classroom_id:
+            if not classroom_id:
                 return jsonify({
                     'classroom_id': None,
                     'students': []
                 }), 200
             
-            # Get enrolled students
-            enrollment_ids = attendance_manager.enrollments.get(active_classroom_id, [])
-            students_data = []
-            
-            # Get today's attendance to mark status
-            today = datetime.now(pytz.timezone('Asia/Kolkata')).date()
-            attendance_records = AttendanceRecord.query.filter_by(
-                classroom_id=active_classroom_id
-            ).filter(
-                db.func.date(AttendanceRecord.timestamp) == today
-            ).all()
-            
-            attended_student_ids = {record.student_id for record in attendance_records}
-            
-            for student_id in enrollment_ids:
-                student = attendance_manager.students.get(student_id, {})
-                students_data.append({
-                    'id': student_id,
-                    'name': student.get('name', student_id),
-                    'has_attended': student_id in attended_student_ids
-                })
-            
-            # Sort by name
-            students_data.sort(key=lambda x: x['name'])
+            students_data = attendance_manager.get_enrolled_students_with_status(classroom_id)
             
             return jsonify({
-                'classroom_id': active_classroom_id,
+                'classroom_id': classroom_id,
                 'students': students_data
             }), 200
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/attendance/<classroom_id>', methods=['GET'])
+    @use_read_replica(read_your_writes=True)
     def get_attendance(classroom_id):
-        """Get attendance count and list for a classroom."""
+        """
+        Get today's attendance count and records for a classroom, newest first.
+        Query params: after (cursor), limit (default 100, max 500), legacy=1 for all records at once,
+        format=columnar for {'columns', 'rows'} instead of one object per record.
+        """
         try:
+            legacy = wants_legacy_list(request.args)
+            try:
+                # Cursor is (timestamp, id) of the last record on the previous page
+                after, limit = (None, None) if legacy else parse_page_args(request.args, 2, (iso_timestamp, int))
+            except ValueError as ve:
+                return jsonify({'error': str(ve)}), 400
+            
             count = attendance_manager.get_attendance_count(classroom_id)
-            records = attendance_manager.get_attendance_list(classroom_id)
+            
+            if wants_columnar(request.args):
+                columns, rows, next_cursor = attendance_manager.get_attendance_rows(
+                    classroom_id, after=after, limit=limit
+                )
+                return jsonify(_columnar_body(columns, rows, next_cursor, paginated=not legacy,
+                                              classroom_id=classroom_id, count=count)), 200
+            
+            if legacy:
+                records = attendance_manager.get_attendance_list(classroom_id)
+                return jsonify({
+                    'classroom_id': classroom_id,
+                    'count': count,
+                    'records': records
+                }), 200
+            
+            records, next_cursor = attendance_manager.get_attendance_page(
+                classroom_id, after=after, limit=limit
+            )
             
             return jsonify({
                 'classroom_id': classroom_id,
                 'count': count,
-                'records': records
+                'records': records,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
             }), 200
         except Exception as e:
             return jsonify({
                 'error': str(e)
             }), 500
     
+    @app.route('/api/attendance/<classroom_id>/history', methods=['GET'])
+    @use_read_replica()
+    def get_attendance_history(classroom_id):
+        """
+        A classroom's attendance records over a date range, including archived terms, newest first.
+        Query params: from / to (YYYY-MM-DD, default the last 30 days).
+        """
+        if session.get('role') not in ['Teacher', 'Admin']:
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        try:
+            today = datetime.now(pytz.timezone('Asia/Kolkata')).date()
+            end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else today
+            start = (datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from')
+                     else end - timedelta(days=29))
+        except ValueError:
+            return jsonify({'error': 'Invalid date range'}), 400
+        if start > end:
+            return jsonify({'error': 'from must not be after to'}), 400
+
+        try:
+            records = attendance_archive.records_between(classroom_id, start, end)
+            return jsonify({
+                'classroom_id': classroom_id,
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'count': len(records),
+                'records': records
+            }), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/attendance/<classroom_id>/absent', methods=['GET'])
+    @use_read_replica()
+    def get_absent_students(classroom_id):
+        """
+        Enrolled students without attendance on a day, from the attendance bitmaps.
+        Query params: day (YYYY-MM-DD, default today).
+        """
+        if session.get('role') not in ['Teacher', 'Admin']:
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        try:
+            day = (datetime.strptime(request.args['day'], '%Y-%m-%d').date() if request.args.get('day')
+                   else datetime.now(pytz.timezone('Asia/Kolkata')).date())
+        except ValueError:
+            return jsonify({'error': 'Invalid day'}), 400
+
+        try:
+            absent = absent_students(classroom_id, day)
+            return jsonify({
+                'classroom_id': classroom_id,
+                'day': day.isoformat(),
+                'present_count': len(present_students(classroom_id, day)),
+                'absent_count': len(absent),
+                'absent': absent
+            }), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/attendance/<classroom_id>/streaks', methods=['GET'])
+    @use_read_replica()
+    def get_attendance_streaks(classroom_id):
+        """
+        Per-student days present, full attendance and streaks over the days the class met,
+        from the attendance bitmaps (archived terms included).
+        Query params: from / to (YYYY-MM-DD, default the current term up to today).
+        """
+        if session.get('role') not in ['Teacher', 'Admin']:
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        try:
+            end = (datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to')
+                   else datetime.now(pytz.timezone('Asia/Kolkata')).date())
+            start = (datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from')
+                     else attendance_archive.term_start(end))
+        except ValueError:
+            return jsonify({'error': 'Invalid date range'}), 400
+        if start > end:
+            return jsonify({'error': 'from must not be after to'}), 400
+
+        try:
+            result = attendance_streaks(classroom_id, start, end)
+            return jsonify({
+                'classroom_id': classroom_id,
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                **result
+            }), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     @app.route('/api/student/<student_id>', methods=['GET', 'POST'])
     def student_api(student_id):
         """Get or register a student."""
@@ -1060,12 +1612,19 @@ def register_routes(app):
             name = data.get('name', f'Classroom {classroom_id}')
             time_start = data.get('time_window_start', '08:00')
             time_end = data.get('time_window_end', '18:00')
+            detector_backend = data.get('detector_backend')
+            
+            if detector_backend and detector_backend not in DETECTOR_BACKENDS:
+                return jsonify({
+                    'error': f"detector_backend must be one of: {', '.join(DETECTOR_BACKENDS)}"
+                }), 400
             
             attendance_manager.add_classroom(
                 classroom_id, 
                 name, 
                 time_start, 
-                time_end
+                time_end,
+                detector_backend=detector_backend
             )
             
             return jsonify({
@@ -1078,9 +1637,151 @@ def register_routes(app):
                 'error': str(e)
             }), 500
     
-    @app.route('/api/enroll', methods=['POST'])
+    @app.route('/api/classroom/<classroom_id>/camera-profile', methods=['GET', 'PUT'])
+    def classroom_camera_profile(classroom_id):
+        """
+        Read or replace a classroom's camera profile used by /headcount.
+        PUT body: {"roi": [[x, y], ...] as frame fractions, "min_face_size": px,
+        "max_face_size": px, "scale_factor": float}; omitted fields are cleared.
+        """
+        if session.get('role') not in ['Teacher', 'Admin']:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        classroom = db.session.get(Classroom, classroom_id)
+        if classroom is None:
+            return jsonify({'error': 'Classroom not found'}), 404
+        
+        if request.method == 'GET':
+            profile = CameraProfile.from_classroom(classroom) or CameraProfile()
+            return jsonify({'classroom_id': classroom_id, 'camera_profile': profile.to_dict()})
+        
+        try:
+            profile = CameraProfile.from_json(request.get_json(silent=True) or {})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        try:
+            profile.apply_to(classroom)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+        
+        return jsonify({
+            'status': 'success',
+            'classroom_id': classroom_id,
+            'camera_profile': profile.to_dict()
+        })
+    
+    @app.route('/api/scanner/session', methods=['POST'])
+    def open_scanner_session():
+        """
+        Open a scanner bound to a classroom (and optionally one timetable session).
+        Body: {"classroom_id": str, "session_id": int}. Returns the scanner token that
+        /scan_qr accepts as "scanner_token" (or the X-Scanner-Token header).
+        """
+        if session.get('role') not in ['Teacher', 'Admin']:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        if not data.get('classroom_id'):
+            return jsonify({'error': 'Missing classroom_id'}), 400
+        
+        binding, error = _open_scanner_session(data['classroom_id'], data.get('session_id'))
+        if error:
+            return jsonify(error[0]), error[1]
+        return jsonify(binding), 201
+    
+    @app.route('/api/scanner/roster', methods=['GET'])
+    def scanner_roster():
+        """
+        Enrolled student ids for a scanner's local cache.
+        Query params: classroom_id (or session_id), since (roster version the scanner already has).
+        Without since (or with a version the server no longer knows) the full roster is returned;
+        otherwise only the students added and removed after that version.
+        A bound scanner may authenticate with its X-Scanner-Token instead of a Teacher/Admin login.
+        """
+        classroom_id = request.args.get('classroom_id')
+        session_id = request.args.get('session_id')
+        try:
+            since = int(request.args.get('since') or 0)
+            if session_id:
+                session_id = int(session_id)
+        except ValueError:
+            return jsonify({'error': 'since and session_id must be integers'}), 400
+        
+        if session_id and not classroom_id:
+            timetable_session = db.session.get(ClassSession, session_id)
+            if timetable_session is None:
+                return jsonify({'error': 'Session not found'}), 404
+            classroom_id = timetable_session.classroom_id
+        if not classroom_id:
+            return jsonify({'error': 'Missing classroom_id'}), 400
+        
+        if session.get('role') not in ['Teacher', 'Admin']:
+            binding = scanner_tokens.verify(request.headers.get('X-Scanner-Token', ''))
+            if binding is None or binding['classroom_id'] != classroom_id:
+                return jsonify({'error': 'Unauthorized'}), 403
+        
+        try:
+            roster = get_roster(classroom_id, since)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        return jsonify({'classroom_id': classroom_id, 'session_id': session_id or None, **roster})
+    
+    @app.route('/api/classroom/<classroom_id>/sessions', methods=['GET', 'POST'])
+    def classroom_sessions(classroom_id):
+        """
+        List or add a classroom's weekly timetable sessions.
+        POST body: {"day_of_week": 0-6 (Monday = 0), "start_time": "HH:MM", "end_time": "HH:MM",
+        "term_start": "YYYY-MM-DD", "term_end": "YYYY-MM-DD", "subject": str}; term dates are optional.
+        """
+        if session.get('role') not in ['Teacher', 'Admin']:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        if request.method == 'GET':
+            return jsonify({'classroom_id': classroom_id,
+                            'sessions': attendance_manager.get_sessions(classroom_id)})
+        
+        try:
+            fields = parse_session_payload(request.get_json(silent=True) or {})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        try:
+            created = attendance_manager.add_session(classroom_id, **fields)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        if created is None:
+            return jsonify({'error': 'Classroom not found'}), 404
+        return jsonify({'status': 'success', 'session': created}), 201
+    
+    @app.route('/api/sessions/<int:session_id>', methods=['PUT', 'DELETE'])
+    def timetable_session(session_id):
+        """Replace (same body as POST /api/classroom/<id>/sessions) or delete a timetable session."""
+        if session.get('role') not in ['Teacher', 'Admin']:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        try:
+            if request.method == 'DELETE':
+                if not attendance_manager.delete_session(session_id):
+                    return jsonify({'error': 'Session not found'}), 404
+                return jsonify({'status': 'success'})
+            
+            try:
+                fields = parse_session_payload(request.get_json(silent=True) or {})
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            updated = attendance_manager.update_session(session_id, **fields)
+            if updated is None:
+                return jsonify({'error': 'Session not found'}), 404
+            return jsonify({'status': 'success', 'session': updated})
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/enroll', methods=['POST', 'DELETE'])
     def enroll_student():
-        """Enroll a student in a classroom."""
+        """Enroll a student in a classroom (POST) or remove them from it (DELETE)."""
         try:
             data = request.get_json()
             student_id = data.get('student_id')
@@ -1091,6 +1792,16 @@ def register_routes(app):
                     'error': 'Missing student_id or classroom_id'
                 }), 400
             
+            if request.method == 'DELETE':
+                if attendance_manager.unenroll_student(student_id, classroom_id):
+                    return jsonify({
+                        'status': 'success',
+                        'message': 'Student unenrolled'
+                    }), 200
+                return jsonify({
+                    'error': 'Student is not enrolled in this classroom'
+                }), 404
+            
             success = attendance_manager.enroll_student(student_id, classroom_id)
             
             if success:
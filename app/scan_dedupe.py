@@ -0,0 +1,81 @@
+"""
+In-memory per-day dedupe set for attendance scans.
+Holds (student_id, classroom_id, session_id) keys already marked today so repeat scans
+are rejected without a database query. Warmed from today's records at startup
+and reset when the local date rolls over.
+"""
+import threading
+from datetime import date, datetime
+from typing import Optional
+
+import pytz
+
+
+class ScanDedupeSet:
+    """
+    Set of (student_id, classroom_id, session_id) keys marked present on the current local day.
+    session_id is None for attendance taken in a classroom's daily window.
+    """
+
+    def __init__(self, timezone: str = 'Asia/Kolkata'):
+        self._tz = pytz.timezone(timezone)
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+        self._keys = set()
+
+    def init_app(self, app):
+        """Warm the set from today's attendance records. Must run in an app context."""
+        from app.models import db, AttendanceRecord
+
+        today = self._today()
+        rows = db.session.query(
+            AttendanceRecord.student_id, AttendanceRecord.classroom_id, AttendanceRecord.session_id
+        ).filter(
+            db.func.date(AttendanceRecord.timestamp) == today
+        ).distinct().all()
+
+        with self._lock:
+            self._day = today
+            self._keys = set(rows)
+        print(f"[SCAN_DEDUPE] Warmed with {len(rows)} scan(s) for {today}")
+
+    def contains(self, student_id: str, classroom_id: str, day: Optional[date] = None,
+                 session_id: Optional[int] = None) -> bool:
+        """Check whether the student is already marked in the classroom session on the given day (default today)."""
+        with self._lock:
+            if not self._is_current(day):
+                return False
+            return (student_id, classroom_id, session_id) in self._keys
+
+    def add(self, student_id: str, classroom_id: str, day: Optional[date] = None,
+            session_id: Optional[int] = None):
+        """Record that the student has been marked present. Keys for past or future days are ignored."""
+        with self._lock:
+            if self._is_current(day):
+                self._keys.add((student_id, classroom_id, session_id))
+
+    def clear(self):
+        """Drop all keys."""
+        with self._lock:
+            self._keys = set()
+            self._day = self._today()
+
+    def __len__(self):
+        with self._lock:
+            self._is_current(None)
+            return len(self._keys)
+
+    def _today(self) -> date:
+        return datetime.now(self._tz).date()
+
+    def _is_current(self, day: Optional[date]) -> bool:
+        """Roll the set over at local midnight and check that day is the day it tracks. Caller holds the lock."""
+        today = self._today()
+        if self._day != today:
+            self._day = today
+            self._keys = set()
+        return day is None or day == today
+
+
+# Global instance
+scan_dedupe = ScanDedupeSet()
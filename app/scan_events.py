@@ -0,0 +1,252 @@
+"""
+Append-only scan event journal.
+Every /scan_qr and manual check-in decision, accepted or rejected, is queued
+in memory and written by a background thread to segmented NDJSON files
+(scan-events-000001.ndjson, ...), one write and one fsync per drained batch.
+The scan response never waits on the disk. Workers share the segments under
+an exclusive file lock, readers address events by a "<segment>:<offset>"
+cursor, and replay_scan_events.py rebuilds attendance records and counters
+from accepted events.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import queue
+import re
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pytz
+
+_SEGMENT_RE = re.compile(r'scan-events-(\d{6})\.ndjson$')
+
+
+def _segment_name(index: int) -> str:
+    return f'scan-events-{index:06d}.ndjson'
+
+
+def parse_cursor(cursor: str) -> Tuple[int, int]:
+    """Split a "<segment>:<offset>" cursor. Raises ValueError if it is malformed."""
+    segment, _, offset = cursor.partition(':')
+    segment, offset = int(segment), int(offset or 0)
+    if segment < 1 or offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return segment, offset
+
+
+class ScanEventJournal:
+    """Asynchronous, segmented NDJSON writer and reader for scan decisions."""
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self._segment_bytes = 8 * 1024 * 1024
+        self._fsync = 'batch'
+        self._queue: 'queue.Queue[Optional[Dict]]' = queue.Queue()
+        self._thread = None
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        """Configure from app config and start the writer thread."""
+        self.shutdown()
+        self.enabled = bool(app.config.get('SCAN_EVENTS_ENABLED', True))
+        if not self.enabled:
+            return
+
+        self.directory = app.config.get('SCAN_EVENTS_DIR') or os.path.join(app.instance_path, 'scan_events')
+        self._segment_bytes = app.config.get('SCAN_EVENTS_SEGMENT_BYTES', 8 * 1024 * 1024)
+        self._fsync = app.config.get('SCAN_EVENTS_FSYNC', 'batch')
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._thread = threading.Thread(target=self._run, name='scan-event-writer', daemon=True)
+        self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def append(self, decision: str, reason: Optional[str] = None, **fields):
+        """
+        Queue one scan decision ('accepted' or 'rejected'). Never blocks on I/O.
+        'ts' is when the decision was made. Extra fields (student_id, classroom_id, session_id,
+        scanned_at, source, http_status) are stored as given.
+        """
+        if not self.enabled:
+            return
+        event = {
+            # Naive local time, like attendance timestamps
+            'ts': datetime.now(pytz.timezone('Asia/Kolkata')).replace(tzinfo=None).isoformat(),
+            'decision': decision,
+            'reason': reason,
+        }
+        event.update(fields)
+        self._queue.put(event)
+
+    def flush(self):
+        """Block until every queued event is on disk."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def shutdown(self):
+        """Write what is queued and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    # Reading
+
+    def segments(self) -> List[int]:
+        """Indexes of the existing segments, oldest first."""
+        if not self.directory:
+            return []
+        indexes = []
+        for path in glob.glob(os.path.join(self.directory, 'scan-events-*.ndjson')):
+            match = _SEGMENT_RE.search(path)
+            if match:
+                indexes.append(int(match.group(1)))
+        return sorted(indexes)
+
+    def start_cursor(self) -> str:
+        """Cursor of the oldest event."""
+        segments = self.segments()
+        return f'{segments[0] if segments else 1}:0'
+
+    def end_cursor(self) -> str:
+        """Cursor just past the newest event written so far."""
+        segments = self.segments()
+        if not segments:
+            return '1:0'
+        return f'{segments[-1]}:{os.path.getsize(self._path(segments[-1]))}'
+
+    def read(self, cursor: Optional[str] = None, limit: Optional[int] = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Yield (next_cursor, event) for events after cursor (from the oldest if None), across
+        segments. A partially written final line is left for a later read.
+        """
+        segment, offset = parse_cursor(cursor or self.start_cursor())
+        yielded = 0
+        for index in self.segments():
+            if index < segment:
+                continue
+            start = offset if index == segment else 0
+            with open(self._path(index), 'rb') as journal:
+                journal.seek(start)
+                position = start
+                for line in journal:
+                    if not line.endswith(b'\n'):
+                        return  # Still being written
+                    position += len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        print(f"[SCAN_EVENTS] Skipping corrupt line in {_segment_name(index)}")
+                        continue
+                    yield f'{index}:{position}', event
+                    yielded += 1
+                    if limit is not None and yielded >= limit:
+                        return
+
+    def tail(self, cursor: Optional[str] = None, limit: int = 100) -> Dict:
+        """A page of events after cursor (default: the current end) and the cursor to continue from."""
+        next_cursor = cursor or self.end_cursor()
+        events = []
+        for next_cursor, event in self.read(next_cursor, limit):
+            events.append(event)
+        return {'events': events, 'cursor': next_cursor}
+
+    # Writing
+
+    def _path(self, index: int) -> str:
+        return os.path.join(self.directory, _segment_name(index))
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            batch = [entry]
+            # Drain whatever else is already waiting into the same write and fsync
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            events = [e for e in batch if e is not None]
+            try:
+                if events:
+                    self._write(events)
+            except Exception as e:
+                print(f"[SCAN_EVENTS] Dropped {len(events)} event(s): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, events: List[Dict]):
+        data = ''.join(json.dumps(event, separators=(',', ':')) + '\n' for event in events).encode('utf-8')
+
+        # The lock file serialises appends and rotation across workers. A segment is rotated
+        # once it reaches the size limit, so it can overrun by at most one batch
+        with open(os.path.join(self.directory, 'scan-events.lock'), 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            segments = self.segments()
+            index = segments[-1] if segments else 1
+            path = self._path(index)
+            if os.path.exists(path) and os.path.getsize(path) >= self._segment_bytes:
+                index += 1
+                path = self._path(index)
+
+            with open(path, 'ab') as journal:
+                journal.write(data)
+                journal.flush()
+                if self._fsync != 'never':
+                    os.fsync(journal.fileno())
+
+
+def replay_attendance(journal: ScanEventJournal, cursor: Optional[str] = None,
+                      batch_size: int = 500) -> Tuple[int, str]:
+    """
+    Re-insert the attendance records of accepted scans after cursor (from the oldest if None).
+    Records that already exist are skipped, so replaying twice is harmless; present counters are
+    incremented for the rows actually inserted. Scans in archived terms are skipped, their
+    records live in the archive files. Records get the event's scanned_at (the capture time
+    of an offline scan), or its decision time for events written before scanned_at existed.
+    Needs an app context.
+    Returns (accepted events replayed, cursor to resume from).
+    """
+    from app.archive import attendance_archive
+    from app.scan_queue import commit_scan_entries
+
+    next_cursor = cursor or journal.start_cursor()
+    batch: List[Dict] = []
+    accepted = 0
+    for next_cursor, event in journal.read(cursor):
+        if event.get('decision') != 'accepted' or not event.get('student_id') or not event.get('classroom_id'):
+            continue
+        timestamp = event.get('scanned_at') or event['ts']
+        if attendance_archive.is_archived(datetime.fromisoformat(timestamp).date()):
+            continue
+        batch.append({
+            'student_id': event['student_id'],
+            'classroom_id': event['classroom_id'],
+            'session_id': event.get('session_id'),
+            'timestamp': timestamp
+        })
+        if len(batch) >= batch_size:
+            commit_scan_entries(batch)
+            accepted += len(batch)
+            batch = []
+    if batch:
+        commit_scan_entries(batch)
+        accepted += len(batch)
+    return accepted, next_cursor
+
+
+# Global instance
+scan_events = ScanEventJournal()
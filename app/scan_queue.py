@@ -0,0 +1,292 @@
+"""
+Write-behind queue for accepted attendance scans.
+Accepted scans are appended to a durable NDJSON journal and held in memory;
+a background flusher commits them to the database in batches. Journals left
+behind by a crashed or restarted worker are replayed on startup.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parse an ISO timestamp from the journal, dropping tzinfo like the ORM does on SQLite."""
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+
+def commit_scan_entries(entries: List[Dict]):
+    """Insert a batch in one transaction, skipping keys that already exist in the database."""
+    from app.models import db, AttendanceRecord
+    from app.db_engine import run_with_lock_retry
+    from app.counters import increment_present
+    from app.attendance_bitmap import set_present
+
+    def _write():
+        days = {_parse_timestamp(e['timestamp']).date() for e in entries}
+        existing: set = set()
+        rows = db.session.query(
+            AttendanceRecord.student_id,
+            AttendanceRecord.classroom_id,
+            AttendanceRecord.session_id,
+            db.func.date(AttendanceRecord.timestamp)
+        ).filter(
+            AttendanceRecord.classroom_id.in_({e['classroom_id'] for e in entries}),
+            AttendanceRecord.student_id.in_({e['student_id'] for e in entries}),
+            db.func.date(AttendanceRecord.timestamp).in_([d.isoformat() for d in days])
+        ).all()
+        # (student, classroom, day) with a record in any session: the present counter counts students
+        counted: set = set()
+        for student_id, classroom_id, session_id, day in rows:
+            existing.add((student_id, classroom_id, session_id, str(day)))
+            counted.add((student_id, classroom_id, str(day)))
+
+        seen: set = set()
+        records = []
+        first_of_day = []
+        for e in entries:
+            ts = _parse_timestamp(e['timestamp'])
+            key: Tuple = (e['student_id'], e['classroom_id'], e.get('session_id'), ts.date().isoformat())
+            if key in existing or key in seen:
+                continue
+            seen.add(key)
+            day_key = (e['student_id'], e['classroom_id'], ts.date().isoformat())
+            if day_key not in counted:
+                counted.add(day_key)
+                first_of_day.append((e['classroom_id'], ts.date()))
+            records.append(AttendanceRecord(
+                student_id=e['student_id'],
+                classroom_id=e['classroom_id'],
+                session_id=e.get('session_id'),
+                timestamp=ts,
+                status='present',
+                ai_headcount=e.get('ai_headcount'),
+                qr_scan_count=e.get('qr_scan_count')
+            ))
+        db.session.add_all(records)
+        for classroom_id, day in first_of_day:
+            increment_present(classroom_id, day)
+        for record in records:
+            set_present(record.classroom_id, record.student_id, record.timestamp.date())
+        db.session.commit()
+
+    run_with_lock_retry(_write)
+
+
+class WriteBehindScanQueue:
+    """In-process queue of accepted scans backed by a per-worker append-only journal."""
+
+    def __init__(self):
+        self.enabled = False
+        self._app = None
+        self._lock = threading.Lock()
+        self._pending: List[Dict] = []
+        self._keys = set()
+        self._journal = None
+        self._journal_path = None
+        self._fsync = 'batch'
+        self._flush_interval = 0.25
+        self._batch_size = 500
+        self._stop = threading.Event()
+        self._thread = None
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        """Configure the queue from app config, replay orphaned journals and start the flusher."""
+        self.shutdown()
+        self.enabled = bool(app.config.get('SCAN_WRITE_BEHIND'))
+        if not self.enabled:
+            return
+
+        self._app = app
+        self._flush_interval = app.config.get('SCAN_FLUSH_INTERVAL', 0.25)
+        self._batch_size = app.config.get('SCAN_FLUSH_BATCH_SIZE', 500)
+        self._fsync = app.config.get('SCAN_JOURNAL_FSYNC', 'batch')
+
+        journal_dir = app.config.get('SCAN_JOURNAL_DIR') or os.path.join(app.instance_path, 'scan_journal')
+        os.makedirs(journal_dir, exist_ok=True)
+
+        self.replay_orphaned_journals(journal_dir)
+
+        # Each worker owns one journal and holds an exclusive lock on it for its lifetime,
+        # so other workers can tell live journals from orphaned ones.
+        self._journal_path = os.path.join(journal_dir, f'scans-{os.getpid()}.ndjson')
+        self._journal = self._open_locked_journal(self._journal_path)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='scan-write-behind', daemon=True)
+        self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+        print(f"[SCAN_QUEUE] Write-behind enabled, journal: {self._journal_path}")
+
+    def enqueue(self, student_id: str, classroom_id: str, timestamp: datetime,
+                ai_headcount: Optional[int] = None, qr_scan_count: Optional[int] = None,
+                session_id: Optional[int] = None) -> bool:
+        """
+        Accept a scan: journal it and queue it for the next batch flush.
+        Returns False if the same (student, classroom, session, day) is already queued.
+        """
+        entry = {
+            'student_id': student_id,
+            'classroom_id': classroom_id,
+            'timestamp': timestamp.isoformat(),
+            'ai_headcount': ai_headcount,
+            'qr_scan_count': qr_scan_count,
+            'session_id': session_id,
+        }
+        key = (student_id, classroom_id, session_id, timestamp.date())
+
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._journal.write(json.dumps(entry) + '\n')
+            self._journal.flush()
+            if self._fsync == 'always':
+                os.fsync(self._journal.fileno())
+            self._pending.append(entry)
+            self._keys.add(key)
+        return True
+
+    def flush(self) -> int:
+        """Commit all pending scans in batches. Returns the number of entries flushed."""
+        if not self.enabled or self._app is None:
+            return 0
+
+        with self._lock:
+            batch = list(self._pending)
+            if batch and self._fsync != 'never':
+                os.fsync(self._journal.fileno())
+        if not batch:
+            return 0
+
+        with self._app.app_context():
+            for start in range(0, len(batch), self._batch_size):
+                commit_scan_entries(batch[start:start + self._batch_size])
+
+        with self._lock:
+            del self._pending[:len(batch)]
+            for entry in batch:
+                self._keys.discard((entry['student_id'], entry['classroom_id'], entry.get('session_id'),
+                                    _parse_timestamp(entry['timestamp']).date()))
+            # The flushed entries are in the database; keep only what is still pending, so the
+            # journal (and a restart's replay) stays small under steady scanning
+            if not self._pending:
+                self._journal.truncate(0)
+                self._journal.seek(0)
+            else:
+                self._rewrite_journal(self._pending)
+
+        print(f"[SCAN_QUEUE] Flushed {len(batch)} scan(s)")
+        return len(batch)
+
+    def replay_orphaned_journals(self, journal_dir: str) -> int:
+        """Commit entries from journals whose owning worker is gone, then remove them."""
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(journal_dir, 'scans-*.ndjson'))):
+            with open(path, 'r+', encoding='utf-8') as journal:
+                try:
+                    fcntl.flock(journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # Journal belongs to a live worker
+
+                entries = []
+                for line in journal:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn final write from a crash; everything before it is intact
+                        print(f"[SCAN_QUEUE] Skipping corrupt journal line in {path}")
+
+                if entries:
+                    try:
+                        with self._app.app_context():
+                            for start in range(0, len(entries), self._batch_size):
+                                commit_scan_entries(entries[start:start + self._batch_size])
+                    except Exception as e:
+                        print(f"[SCAN_QUEUE] Replay of {path} failed, keeping journal: {e}")
+                        continue
+                    replayed += len(entries)
+                # The owner may have replaced the journal since we opened it; only remove our file
+                try:
+                    if os.stat(path).st_ino == os.fstat(journal.fileno()).st_ino:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+        if replayed:
+            print(f"[SCAN_QUEUE] Replayed {replayed} un-flushed scan(s) from previous run")
+        return replayed
+
+    def shutdown(self):
+        """Stop the flusher, flush remaining scans and release the journal."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if self._journal is not None:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[SCAN_QUEUE] Final flush failed, journal kept for replay: {e}")
+                self._journal.close()
+                self._journal = None
+                return
+            self._journal.close()
+            self._journal = None
+            if self._journal_path and os.path.exists(self._journal_path) and os.path.getsize(self._journal_path) == 0:
+                os.remove(self._journal_path)
+
+    def _rewrite_journal(self, entries: List[Dict]):
+        """
+        Replace the journal with one holding only `entries`. Caller holds self._lock.
+        The new file is written, synced and locked before it replaces the old one, so a crash
+        leaves either journal intact and other workers never see it unlocked.
+        """
+        tmp_path = self._journal_path + '.tmp'
+        journal = open(tmp_path, 'w', encoding='utf-8')
+        try:
+            fcntl.flock(journal.fileno(), fcntl.LOCK_EX)
+            journal.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+            journal.flush()
+            if self._fsync != 'never':
+                os.fsync(journal.fileno())
+            os.replace(tmp_path, self._journal_path)
+        except Exception:
+            journal.close()
+            raise
+        self._journal.close()
+        self._journal = journal
+
+    @staticmethod
+    def _open_locked_journal(path: str):
+        """Open and lock a journal, retrying if a replaying worker removed it before we locked it."""
+        while True:
+            journal = open(path, 'a', encoding='utf-8')
+            fcntl.flock(journal.fileno(), fcntl.LOCK_EX)
+            try:
+                if os.stat(path).st_ino == os.fstat(journal.fileno()).st_ino:
+                    return journal
+            except FileNotFoundError:
+                pass
+            journal.close()
+
+    def _run(self):
+        while not self._stop.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                # Entries stay pending and journaled; the next cycle retries them
+                print(f"[SCAN_QUEUE] Flush error: {e}")
+
+
+# Global instance
+scan_queue = WriteBehindScanQueue()
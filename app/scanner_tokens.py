@@ -0,0 +1,79 @@
+"""
+Signed scanner tokens.
+A teacher opens a scanner for one classroom (optionally one timetable
+session) and the page sends the resulting token with every scan. /scan_qr
+then routes the scan to that classroom from the token alone instead of
+working out the active classroom from the clock. Scans queued offline by a
+bound scanner are replayed with their capture time, which is checked against
+the token's lifetime instead of the time they arrive.
+"""
+import time
+from typing import Dict, Optional
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+
+class ScannerTokens:
+    """Issues and verifies time-limited scanner-to-classroom bindings signed with QR_SECRET_KEY."""
+
+    def __init__(self):
+        self.max_age = 12 * 60 * 60
+        self.capture_grace = 120
+        self._serializer = None
+
+    def init_app(self, app):
+        """Configure the signing key and token lifetime from app config."""
+        self.max_age = app.config.get('SCANNER_TOKEN_TTL_SECONDS', 12 * 60 * 60)
+        self.capture_grace = app.config.get('SCAN_CAPTURE_GRACE_SECONDS', 120)
+        secret = app.config.get('QR_SECRET_KEY')
+        if not secret:
+            print("[SCANNER] WARNING: scanner tokens are signed with the built-in development key and can be "
+                  "forged; set QR_SECRET_KEY or SECRET_KEY")
+            secret = app.config['SECRET_KEY']
+        self._serializer = URLSafeTimedSerializer(secret, salt='scanner-token')
+
+    def issue(self, classroom_id: str, session_id: Optional[int] = None) -> str:
+        """Sign a binding to a classroom and, optionally, one of its timetable sessions."""
+        return self._serializer.dumps({'c': classroom_id, 's': session_id})
+
+    def verify(self, token: str, captured_at: Optional[float] = None) -> Optional[Dict]:
+        """
+        Return {'classroom_id', 'session_id', 'issued_at'} for a valid, unexpired token, else None.
+        With captured_at (epoch seconds of a scan queued offline) the token must instead have been
+        live at that time, and the scan must arrive within one token lifetime of its capture;
+        both checks allow capture_grace seconds of scanner clock skew.
+        """
+        try:
+            payload, signed_at = self._serializer.loads(token, return_timestamp=True)
+        except BadSignature:
+            return None
+        if not isinstance(payload, dict) or not payload.get('c'):
+            return None
+
+        now = time.time()
+        issued_at = signed_at.timestamp()
+        if captured_at is None:
+            valid = now - issued_at <= self.max_age
+        else:
+            grace = self.capture_grace
+            valid = (issued_at - grace <= captured_at <= issued_at + self.max_age + grace
+                     and now - self.max_age <= captured_at <= now + grace)
+        if not valid:
+            return None
+        return {'classroom_id': payload['c'], 'session_id': payload.get('s'), 'issued_at': issued_at}
+
+    def scanner_key(self, token: str) -> Optional[str]:
+        """
+        A stable id for the scanner holding a genuine token, expired or not ("classroom:session:issued"),
+        else None. Used to key per-scanner limits, so forged tokens cannot mint fresh keys.
+        """
+        try:
+            payload, signed_at = self._serializer.loads(token, return_timestamp=True)
+        except BadSignature:
+            return None
+        if not isinstance(payload, dict) or not payload.get('c'):
+            return None
+        return f"{payload['c']}:{payload.get('s')}:{int(signed_at.timestamp())}"
+
+# Global instance
+scanner_tokens = ScannerTokens()
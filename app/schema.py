@@ -0,0 +1,36 @@
+"""
+Lightweight schema upkeep for existing databases.
+db.create_all() only creates missing tables, so indexes and nullable columns
+added to existing models are applied here (the same approach as the manual
+ALTER TABLE helper in verify_login.py).
+"""
+from sqlalchemy import inspect, text
+
+from app.models import db
+
+
+def ensure_schema():
+    """Add missing nullable columns and indexes to existing tables. Must run in an app context."""
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    print(f"[SCHEMA] Cannot add NOT NULL column {table.name}.{column.name} without a default")
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                print(f"[SCHEMA] Adding column {table.name}.{column.name} ({column_type})")
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
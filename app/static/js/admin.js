@@ -102,14 +102,33 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 5000);
     }
 
-    // Function to load and display admin data
-    async function loadAdminData() {
+    // Page size for the paginated list APIs
+    const PAGE_SIZE = 50;
+
+    // Render a "Load more" button at the end of a list, or remove it on the last page
+    function setLoadMore(listElement, nextCursor, loadFn) {
+        const existing = listElement.querySelector('.load-more');
+        if (existing) existing.remove();
+        if (!nextCursor) return;
+
+        const button = document.createElement('button');
+        button.className = 'btn btn-secondary load-more';
+        button.textContent = 'Load more';
+        button.addEventListener('click', () => loadFn(nextCursor));
+        listElement.appendChild(button);
+    }
+
+    // Function to load and display admin data (one page per call; no cursor starts over)
+    async function loadAdminData(cursor = null) {
         try {
-            const response = await fetch('/api/admin/data');
+            let url = `/api/admin/data?limit=${PAGE_SIZE}`;
+            if (cursor) url += `&after=${encodeURIComponent(cursor)}`;
+            const response = await fetch(url);
             const data = await response.json();
 
             if (response.ok) {
-                displayAdminData(data);
+                displayAdminData(data.classrooms || [], Boolean(cursor));
+                setLoadMore(dataList, data.next_cursor, loadAdminData);
             } else {
                 dataList.innerHTML = '<div class="empty-state">Failed to load data</div>';
             }
@@ -119,14 +138,15 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Function to display admin data
-    function displayAdminData(data) {
-        if (!data || Object.keys(data).length === 0) {
+    function displayAdminData(classrooms, append) {
+        if (!append && (!classrooms || classrooms.length === 0)) {
             dataList.innerHTML = '<div class="empty-state">No classrooms added yet. Add one using the form above.</div>';
             return;
         }
 
         let html = '';
-        for (const [classroomId, info] of Object.entries(data)) {
+        for (const info of classrooms) {
+            const classroomId = info.classroom_id;
             html += `
                 <div class="data-card">
                     <div style="margin-bottom: 15px;">
@@ -161,17 +181,24 @@ document.addEventListener('DOMContentLoaded', function() {
                 </div>
             `;
         }
-        dataList.innerHTML = html;
+        if (append) {
+            dataList.insertAdjacentHTML('beforeend', html);
+        } else {
+            dataList.innerHTML = html;
+        }
     }
 
-    // Function to load and display students
-    async function loadStudents() {
+    // Function to load and display students (one page per call; no cursor starts over)
+    async function loadStudents(cursor = null) {
         try {
-            const response = await fetch('/api/students');
+            let url = `/api/students?limit=${PAGE_SIZE}`;
+            if (cursor) url += `&after=${encodeURIComponent(cursor)}`;
+            const response = await fetch(url);
             const data = await response.json();
 
             if (response.ok) {
-                displayStudents(data.students || []);
+                displayStudents(data.students || [], Boolean(cursor));
+                setLoadMore(document.getElementById('studentsList'), data.next_cursor, loadStudents);
             } else {
                 document.getElementById('studentsList').innerHTML = '<div class="empty-state">Failed to load students</div>';
             }
@@ -181,10 +208,10 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // Function to display students
-    function displayStudents(students) {
+    function displayStudents(students, append) {
         const studentsList = document.getElementById('studentsList');
         
-        if (!students || students.length === 0) {
+        if (!append && (!students || students.length === 0)) {
             studentsList.innerHTML = '<div class="empty-state">No students found. Students are automatically added when classrooms are created.</div>';
             return;
         }
@@ -216,7 +243,11 @@ document.addEventListener('DOMContentLoaded', function() {
                 </div>
             `;
         }
-        studentsList.innerHTML = html;
+        if (append) {
+            studentsList.insertAdjacentHTML('beforeend', html);
+        } else {
+            studentsList.innerHTML = html;
+        }
     }
 
     // Function to generate and display student QR code
@@ -72,6 +72,7 @@ async function loadCurrentClass() {
                         loadEnrolledStudents();
                     } else {
                         currentClassroomId = null;
+                        updateScannerLink(null);
                         classInfoDiv.innerHTML = '<div class="loading">Select a classroom to view details...</div>';
                     }
                 });
@@ -104,8 +105,19 @@ async function loadCurrentClass() {
     }
 }
 
+// Bind the scanner button to the selected classroom
+function updateScannerLink(classroomId) {
+    const scannerLink = document.getElementById('scannerLink');
+    if (scannerLink) {
+        scannerLink.href = classroomId
+            ? `/student/scanner?classroom_id=${encodeURIComponent(classroomId)}`
+            : '/student/scanner';
+    }
+}
+
 // Ensure loadSpecificClassData is defined to show details
 async function loadSpecificClassData(classroomId) {
+    updateScannerLink(classroomId);
     try {
         const response = await fetch(`/api/admin/data?classroom_id=${classroomId}`);
         const data = await response.json();
@@ -163,35 +175,71 @@ async function loadAttendanceStats() {
     }
 }
 
+// Recent scans feed: after the first load, each poll only asks for scans newer than lastScanId
+const RECENT_SCANS_LIMIT = 10;
+let recentScansFeed = { classroomId: null, day: null, lastScanId: null };
+
+function renderScanItem(scan) {
+    const time = new Date(scan.timestamp).toLocaleTimeString();
+    return `
+        <div class="scan-item">
+            <div class="scan-item-info">
+                <div class="scan-item-student">${scan.student_id}</div>
+                <div class="scan-item-time">${time}</div>
+            </div>
+        </div>
+    `;
+}
+
 // Load recent scans
 async function loadRecentScans() {
+    const recentScansDiv = document.getElementById('recentScans');
+
     if (!currentClassroomId) {
-        document.getElementById('recentScans').innerHTML =
-            '<div class="empty-state">No active class</div>';
+        recentScansFeed = { classroomId: null, day: null, lastScanId: null };
+        recentScansDiv.innerHTML = '<div class="empty-state">No active class</div>';
         return;
     }
 
+    // A different classroom starts a fresh feed
+    const classroomId = currentClassroomId;
+    const isDelta = recentScansFeed.classroomId === classroomId && recentScansFeed.lastScanId !== null;
+    let url = `/api/dashboard/recent-scans?classroom_id=${encodeURIComponent(classroomId)}&limit=${RECENT_SCANS_LIMIT}`;
+    if (isDelta) {
+        url += `&since_id=${recentScansFeed.lastScanId}`;
+    }
+
     try {
-        const response = await fetch(`/api/dashboard/recent-scans?classroom_id=${currentClassroomId}`);
+        const response = await fetch(url);
         const data = await response.json();
+        if (!response.ok || classroomId !== currentClassroomId) {
+            return;
+        }
 
-        const recentScansDiv = document.getElementById('recentScans');
-
-        if (response.ok && data.scans && data.scans.length > 0) {
-            recentScansDiv.innerHTML = data.scans.map(scan => {
-                const time = new Date(scan.timestamp).toLocaleTimeString();
-                return `
-                    <div class="scan-item">
-                        <div class="scan-item-info">
-                            <div class="scan-item-student">${scan.student_id}</div>
-                            <div class="scan-item-time">${time}</div>
-                        </div>
-                    </div>
-                `;
-            }).join('');
-        } else {
-            recentScansDiv.innerHTML = '<div class="empty-state">No scans yet</div>';
+        // A new day also starts a fresh feed (yesterday's scans are not today's)
+        if (isDelta && data.day !== recentScansFeed.day) {
+            recentScansFeed = { classroomId: null, day: null, lastScanId: null };
+            return loadRecentScans();
         }
+
+        if (!isDelta) {
+            recentScansDiv.innerHTML = data.scans.length > 0
+                ? data.scans.map(renderScanItem).join('')
+                : '<div class="empty-state">No scans yet</div>';
+        } else if (data.scans.length > 0) {
+            // Prepend only the new scans (newest first) and trim the list back to the limit
+            const emptyState = recentScansDiv.querySelector('.empty-state');
+            if (emptyState) {
+                emptyState.remove();
+            }
+            recentScansDiv.insertAdjacentHTML('afterbegin', data.scans.map(renderScanItem).join(''));
+            const items = recentScansDiv.querySelectorAll('.scan-item');
+            for (let i = RECENT_SCANS_LIMIT; i < items.length; i++) {
+                items[i].remove();
+            }
+        }
+
+        recentScansFeed = { classroomId: classroomId, day: data.day, lastScanId: data.last_id };
     } catch (error) {
         console.error('Error loading recent scans:', error);
     }
@@ -336,7 +384,7 @@ async function loadEnrolledStudents() {
     }
 
     try {
-        const response = await fetch('/api/dashboard/enrolled-students');
+        const response = await fetch(`/api/dashboard/enrolled-students?classroom_id=${encodeURIComponent(currentClassroomId)}`);
         const data = await response.json();
 
         if (response.ok) {
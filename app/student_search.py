@@ -0,0 +1,144 @@
+"""
+Server-side student search.
+Maintains an SQLite FTS5 index over student id, name and email, kept in sync
+through ORM events on Student so every write path (add_student, the verify_otp
+auto-creation, seeding) updates it in the same transaction. Falls back to a
+substring LIKE query on databases without FTS5.
+"""
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, or_, text
+from sqlalchemy.exc import OperationalError
+
+from app.models import db, Student, enrollment_table
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+# Column weights for bm25 ranking: an id hit beats a name hit beats an email hit
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+_TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+class StudentSearchIndex:
+    """FTS5-backed top-k student search."""
+
+    def __init__(self):
+        self.fts_enabled = False
+
+    def init_app(self, app):
+        """Create the FTS table if needed and rebuild it when it is out of step. Must run in an app context."""
+        self.fts_enabled = False
+        if db.engine.dialect.name != 'sqlite':
+            print("[STUDENT_SEARCH] Non-SQLite database, using LIKE search")
+            return
+
+        try:
+            db.session.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5("
+                "student_id, name, email, tokenize='unicode61', prefix='2 3')"
+            ))
+            db.session.commit()
+        except OperationalError as e:
+            db.session.rollback()
+            print(f"[STUDENT_SEARCH] FTS5 unavailable ({e}), using LIKE search")
+            return
+
+        self.fts_enabled = True
+        indexed = db.session.execute(text('SELECT COUNT(*) FROM students_fts')).scalar()
+        total = db.session.query(db.func.count(Student.id)).scalar()
+        if indexed != total:
+            self.rebuild()
+
+    def rebuild(self) -> int:
+        """Rebuild the whole index from the students table (also needed after a VACUUM, which may renumber rowids)."""
+        db.session.execute(text('DELETE FROM students_fts'))
+        db.session.execute(text(
+            "INSERT INTO students_fts (rowid, student_id, name, email) "
+            "SELECT rowid, id, name, COALESCE(email, '') FROM students"
+        ))
+        db.session.commit()
+        count = db.session.execute(text('SELECT COUNT(*) FROM students_fts')).scalar()
+        print(f"[STUDENT_SEARCH] Rebuilt index with {count} student(s)")
+        return count
+
+    def search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT,
+               classroom_id: Optional[str] = None) -> List[Dict]:
+        """
+        Return up to `limit` students matching every term of `query` as a prefix,
+        best match first. Optionally restricted to one classroom's roster.
+        """
+        terms = _TERM_PATTERN.findall(query.lower())
+        if not terms:
+            return []
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+        if self.fts_enabled:
+            return self._search_fts(terms, limit, classroom_id)
+        return self._search_like(terms, limit, classroom_id)
+
+    def _search_fts(self, terms: List[str], limit: int, classroom_id: Optional[str]) -> List[Dict]:
+        # Quote each term so FTS5 operators in user input are treated as text
+        match = ' AND '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+        sql = (
+            f"SELECT f.student_id, f.name, f.email, bm25(students_fts, {weights}) AS rank "
+            "FROM students_fts f "
+        )
+        params = {'match': match, 'limit': limit}
+        if classroom_id:
+            sql += "JOIN enrollments e ON e.student_id = f.student_id AND e.classroom_id = :classroom_id "
+            params['classroom_id'] = classroom_id
+        sql += "WHERE students_fts MATCH :match ORDER BY rank LIMIT :limit"
+
+        rows = db.session.execute(text(sql), params).all()
+        return [
+            {'id': student_id, 'name': name, 'email': email or None, 'score': round(-rank, 4)}
+            for student_id, name, email, rank in rows
+        ]
+
+    def _search_like(self, terms: List[str], limit: int, classroom_id: Optional[str]) -> List[Dict]:
+        query = db.session.query(Student.id, Student.name, Student.email)
+        if classroom_id:
+            query = query.join(enrollment_table, enrollment_table.c.student_id == Student.id).filter(
+                enrollment_table.c.classroom_id == classroom_id
+            )
+        for term in terms:
+            pattern = f'%{term}%'
+            query = query.filter(or_(
+                Student.id.ilike(pattern), Student.name.ilike(pattern), Student.email.ilike(pattern)
+            ))
+        rows = query.order_by(Student.name, Student.id).limit(limit).all()
+        return [{'id': student_id, 'name': name, 'email': email, 'score': None} for student_id, name, email in rows]
+
+
+# Global instance
+student_search = StudentSearchIndex()
+
+
+# FTS rows share the students table's rowid, so updates and deletes are point lookups
+_ROWID_SQL = 'SELECT rowid FROM students WHERE id = :id'
+_INSERT_SQL = ('INSERT INTO students_fts (rowid, student_id, name, email) '
+               'VALUES ((SELECT rowid FROM students WHERE id = :id), :id, :name, :email)')
+
+
+@event.listens_for(Student, 'after_insert')
+def _index_student_insert(mapper, connection, target):
+    if student_search.fts_enabled:
+        connection.execute(text(_INSERT_SQL), {'id': target.id, 'name': target.name, 'email': target.email or ''})
+
+
+@event.listens_for(Student, 'after_update')
+def _index_student_update(mapper, connection, target):
+    if student_search.fts_enabled:
+        connection.execute(text(f'DELETE FROM students_fts WHERE rowid = ({_ROWID_SQL})'), {'id': target.id})
+        connection.execute(text(_INSERT_SQL), {'id': target.id, 'name': target.name, 'email': target.email or ''})
+
+
+@event.listens_for(Student, 'before_delete')
+def _index_student_delete(mapper, connection, target):
+    # Before the row goes away, while its rowid can still be looked up
+    if student_search.fts_enabled:
+        connection.execute(text(f'DELETE FROM students_fts WHERE rowid = ({_ROWID_SQL})'), {'id': target.id})
@@ -0,0 +1,257 @@
+"""
+Compiled weekly timetable.
+Sessions (and the daily time windows of classrooms without sessions) are
+compiled into per-weekday tables of 15-minute buckets, each holding the few
+slots that overlap it. Resolving the session for a (room, time) pair, or the
+active session in any room, is then one bucket lookup plus an exact check of
+its candidates. Committed edits to classrooms or sessions mark their rooms
+dirty and only those rooms are recompiled on the next lookup; a periodic full
+rebuild picks up edits made by other workers.
+"""
+import threading
+import time as _time
+from collections import namedtuple
+from datetime import date, datetime, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAYS_PER_WEEK = 7
+
+# session_id is None for a classroom's daily time window
+SessionSlot = namedtuple('SessionSlot', [
+    'session_id', 'classroom_id', 'start', 'end', 'term_start', 'term_end', 'subject', 'rank'
+])
+
+_EMPTY: Tuple = ()
+
+
+def _bucket(value: time) -> int:
+    return (value.hour * 60 + value.minute) // SLOT_MINUTES
+
+
+def _first_applicable(candidates: Iterable[SessionSlot], day: date, at: time,
+                      session_id: Optional[int] = None) -> Optional[SessionSlot]:
+    """First candidate (by rank) whose times and term cover the moment, optionally only a given session."""
+    for slot in candidates:
+        if session_id is not None and slot.session_id != session_id:
+            continue
+        if not (slot.start <= at <= slot.end):
+            continue
+        if slot.term_start is not None and day < slot.term_start:
+            continue
+        if slot.term_end is not None and day > slot.term_end:
+            continue
+        return slot
+    return None
+
+
+def parse_session_payload(data: Dict) -> Dict:
+    """
+    Validate a session create/update payload.
+    Returns column values for ClassSession; raises ValueError with a user-facing message.
+    """
+    try:
+        day_of_week = int(data.get('day_of_week'))
+    except (TypeError, ValueError):
+        raise ValueError('day_of_week must be an integer from 0 (Monday) to 6 (Sunday)')
+    if not 0 <= day_of_week <= 6:
+        raise ValueError('day_of_week must be an integer from 0 (Monday) to 6 (Sunday)')
+
+    try:
+        start_time = datetime.strptime(data.get('start_time') or '', '%H:%M').time()
+        end_time = datetime.strptime(data.get('end_time') or '', '%H:%M').time()
+    except ValueError:
+        raise ValueError('start_time and end_time must be HH:MM')
+    if start_time >= end_time:
+        raise ValueError('start_time must be before end_time')
+
+    try:
+        term_start = datetime.strptime(data['term_start'], '%Y-%m-%d').date() if data.get('term_start') else None
+        term_end = datetime.strptime(data['term_end'], '%Y-%m-%d').date() if data.get('term_end') else None
+    except (TypeError, ValueError):
+        raise ValueError('term_start and term_end must be YYYY-MM-DD')
+    if term_start and term_end and term_start > term_end:
+        raise ValueError('term_start must not be after term_end')
+
+    return {
+        'day_of_week': day_of_week,
+        'start_time': start_time,
+        'end_time': end_time,
+        'term_start': term_start,
+        'term_end': term_end,
+        'subject': data.get('subject')
+    }
+
+
+class Timetable:
+    """In-memory per-weekday lookup of sessions, recompiled per room on edits."""
+
+    def __init__(self):
+        self.refresh_seconds = 60
+        self._lock = threading.Lock()
+        # classroom_id -> weekday -> bucket -> candidate slots
+        self._rooms: Dict[str, Tuple[Tuple[Tuple[SessionSlot, ...], ...], ...]] = {}
+        # weekday -> bucket -> candidate slots across all rooms
+        self._week: List[List[Tuple[SessionSlot, ...]]] = self._empty_week()
+        self._order: Dict[str, int] = {}
+        self._dirty = set()
+        self._built_at = 0.0
+        self._listening = False
+
+    def init_app(self, app):
+        """Compile the whole timetable and start tracking edits. Must run in an app context."""
+        self.refresh_seconds = app.config.get('TIMETABLE_REFRESH_SECONDS', 60)
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            self._listening = True
+        self.rebuild()
+        print(f"[TIMETABLE] Compiled {len(self._rooms)} classroom(s)")
+
+    def resolve(self, classroom_id: str, at: datetime, session_id: Optional[int] = None) -> Optional[SessionSlot]:
+        """The slot open in a classroom at a moment (only that session's, if session_id is given), or None."""
+        self._ensure_current()
+        week = self._rooms.get(classroom_id)
+        if week is None:
+            return None
+        at_time = at.time()
+        return _first_applicable(week[at.weekday()][_bucket(at_time)], at.date(), at_time, session_id)
+
+    def active(self, at: datetime) -> Optional[SessionSlot]:
+        """
+        The slot open in any classroom at a moment, or None.
+        Timetable sessions win over daily windows, then the most recently started one.
+        """
+        self._ensure_current()
+        at_time = at.time()
+        return _first_applicable(self._week[at.weekday()][_bucket(at_time)], at.date(), at_time)
+
+    def rebuild(self, classroom_ids: Optional[Iterable[str]] = None):
+        """Recompile the given classrooms (all of them if None). Must run in an app context."""
+        from app.models import db, Classroom, ClassSession
+
+        with self._lock:
+            full = classroom_ids is None
+            classroom_query = db.session.query(Classroom.id, Classroom.time_window_start, Classroom.time_window_end)
+            session_query = ClassSession.query
+            if not full:
+                classroom_ids = set(classroom_ids)
+                self._dirty -= classroom_ids
+                classroom_query = classroom_query.filter(Classroom.id.in_(classroom_ids))
+                session_query = session_query.filter(ClassSession.classroom_id.in_(classroom_ids))
+            else:
+                self._dirty.clear()
+                self._order = {}
+
+            windows = classroom_query.all()
+            sessions_by_room: Dict[str, List] = {}
+            for session in session_query.all():
+                sessions_by_room.setdefault(session.classroom_id, []).append(session)
+
+            rooms = {} if full else dict(self._rooms)
+            for room_id in (classroom_ids or ()):
+                rooms.pop(room_id, None)
+            for room_id, window_start, window_end in windows:
+                order = self._order.setdefault(room_id, len(self._order))
+                rooms[room_id] = self._compile_room(room_id, order, window_start, window_end,
+                                                    sessions_by_room.get(room_id, ()))
+
+            self._week = self._merge_week(rooms, None if full else classroom_ids)
+            self._rooms = rooms
+            if full:
+                self._built_at = _time.monotonic()
+
+    def invalidate(self, classroom_id: str):
+        """Mark a classroom for recompilation on the next lookup."""
+        with self._lock:
+            self._dirty.add(classroom_id)
+
+    def _ensure_current(self):
+        if _time.monotonic() - self._built_at > self.refresh_seconds:
+            self.rebuild()
+        elif self._dirty:
+            self.rebuild(set(self._dirty))
+
+    @staticmethod
+    def _empty_week() -> List[List[Tuple]]:
+        return [[_EMPTY] * SLOTS_PER_DAY for _ in range(DAYS_PER_WEEK)]
+
+    @staticmethod
+    def _compile_room(room_id: str, order: int, window_start: Optional[time], window_end: Optional[time],
+                      sessions: Iterable) -> Tuple:
+        """Bucket one classroom's sessions, or its daily window on every weekday if it has none."""
+        slots = []
+        for session in sessions:
+            rank = (0, -(session.start_time.hour * 60 + session.start_time.minute), order)
+            slots.append((session.day_of_week, SessionSlot(
+                session.id, room_id, session.start_time, session.end_time,
+                session.term_start, session.term_end, session.subject, rank
+            )))
+        if not slots and window_start is not None and window_end is not None:
+            rank = (1, -(window_start.hour * 60 + window_start.minute), order)
+            window = SessionSlot(None, room_id, window_start, window_end, None, None, None, rank)
+            slots = [(weekday, window) for weekday in range(DAYS_PER_WEEK)]
+
+        days = [[[] for _ in range(SLOTS_PER_DAY)] for _ in range(DAYS_PER_WEEK)]
+        for weekday, slot in slots:
+            for index in range(_bucket(slot.start), _bucket(slot.end) + 1):
+                days[weekday][index].append(slot)
+        return tuple(
+            tuple(tuple(sorted(bucket, key=lambda s: s.rank)) if bucket else _EMPTY for bucket in day)
+            for day in days
+        )
+
+    def _merge_week(self, rooms: Dict, changed: Optional[set]) -> List[List[Tuple]]:
+        """Rebuild the all-rooms table, touching only the changed rooms' buckets when given."""
+        if changed is None:
+            week = self._empty_week()
+            sources = rooms.values()
+        else:
+            week = [list(day) for day in self._week]
+            for weekday in range(DAYS_PER_WEEK):
+                for index, bucket in enumerate(week[weekday]):
+                    if bucket and any(s.classroom_id in changed for s in bucket):
+                        week[weekday][index] = tuple(s for s in bucket if s.classroom_id not in changed)
+            sources = [rooms[room_id] for room_id in changed if room_id in rooms]
+
+        for room in sources:
+            for weekday in range(DAYS_PER_WEEK):
+                day = week[weekday]
+                for index, bucket in enumerate(room[weekday]):
+                    if bucket:
+                        day[index] = tuple(sorted(day[index] + bucket, key=lambda s: s.rank))
+        return week
+
+    # Edit tracking: rooms touched by a flush become dirty once the transaction commits
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        from app.models import Classroom, ClassSession
+
+        touched = session.info.setdefault('timetable_dirty', set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, Classroom):
+                touched.add(obj.id)
+            elif isinstance(obj, ClassSession):
+                touched.add(obj.classroom_id)
+                # A session moved to another classroom leaves the old one dirty too
+                touched.update(v for v in sa_inspect(obj).attrs.classroom_id.history.deleted if v)
+
+    def _after_commit(self, session):
+        touched = session.info.pop('timetable_dirty', None)
+        if touched:
+            with self._lock:
+                self._dirty.update(touched)
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('timetable_dirty', None)
+
+
+# Global instance
+timetable = Timetable()
@@ -0,0 +1,38 @@
+"""
+Attendance archiving.
+Moves attendance records older than the current term (or --before) out of
+attendance_records into per-term SQLite files in the archive directory, a
+chunk per transaction. Safe to run while the app is serving scans, and safe
+to re-run after an interruption. Schedule it after each term boundary.
+
+Usage:
+    python archive_attendance.py [--before YYYY-MM-DD] [--chunk-size 1000] [--pause 0.05]
+"""
+import argparse
+from datetime import datetime
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--before', help='Archive records before this day (default: the current term start)')
+    parser.add_argument('--chunk-size', type=int, help='Records moved per transaction (default: ARCHIVE_CHUNK_SIZE)')
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between chunks')
+    args = parser.parse_args()
+
+    before = datetime.strptime(args.before, '%Y-%m-%d').date() if args.before else None
+
+    from app import create_app
+    from app.archive import attendance_archive
+
+    app = create_app()
+    with app.app_context():
+        before = before or attendance_archive.current_term_start()
+        print(f"Archiving attendance before {before.isoformat()} into {attendance_archive.directory}")
+        moved = attendance_archive.archive(before, args.chunk_size, args.pause)
+        for term, count in moved.items():
+            print(f"Term starting {term}: {count} record(s)")
+        print(f"Total archived: {sum(moved.values())}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Concurrency benchmark for scan writes.
+Simulates several gunicorn workers marking attendance against one SQLite file while
+dashboard readers poll counts, once with the default SQLite settings and once with the
+tuned engine profile, and reports sustained scan rate and lock errors for each.
+
+Usage:
+    python bench_scan_concurrency.py [--workers 4] [--readers 2] [--duration 5]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+
+def _quiet_app(db_path, profile):
+    """Create an app bound to the benchmark database with console output suppressed."""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}?timeout=20'
+    os.environ['SQLITE_ENGINE_PROFILE'] = profile
+    with contextlib.redirect_stdout(io.StringIO()):
+        from app import create_app
+        return create_app()
+
+
+def _writer(db_path, profile, worker_id, duration, results):
+    from sqlalchemy.exc import OperationalError
+    app = _quiet_app(db_path, profile)
+    from app.attendance_manager import attendance_manager
+
+    scans = 0
+    errors = 0
+    deadline = time.time() + duration
+    with app.app_context(), contextlib.redirect_stdout(io.StringIO()) as sink:
+        while time.time() < deadline:
+            try:
+                attendance_manager.mark_attendance(f'BENCH_{worker_id}_{scans}_{errors}', 'BENCH_ROOM')
+                scans += 1
+            except OperationalError:
+                from app.models import db
+                db.session.rollback()
+                errors += 1
+            sink.seek(0)
+            sink.truncate()
+    results.put(('write', scans, errors))
+
+
+def _reader(db_path, profile, duration, results):
+    from sqlalchemy.exc import OperationalError
+    app = _quiet_app(db_path, profile)
+    from app.attendance_manager import attendance_manager
+
+    reads = 0
+    errors = 0
+    deadline = time.time() + duration
+    with app.app_context():
+        while time.time() < deadline:
+            try:
+                attendance_manager.get_attendance_count('BENCH_ROOM')
+                reads += 1
+            except OperationalError:
+                from app.models import db
+                db.session.rollback()
+                errors += 1
+    results.put(('read', reads, errors))
+
+
+def run_profile(profile, workers, readers, duration):
+    """Run one benchmark round and return aggregated throughput numbers."""
+    tmp_dir = tempfile.mkdtemp(prefix='bench_scan_')
+    db_path = os.path.join(tmp_dir, 'bench.db')
+    try:
+        # Create the schema (and auto-seed) once before workers start racing
+        _quiet_app(db_path, profile)
+
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Queue()
+        procs = [ctx.Process(target=_writer, args=(db_path, profile, i, duration, results)) for i in range(workers)]
+        procs += [ctx.Process(target=_reader, args=(db_path, profile, duration, results)) for _ in range(readers)]
+        for p in procs:
+            p.start()
+
+        totals = {'write': [0, 0], 'read': [0, 0]}
+        for _ in procs:
+            kind, ok, failed = results.get()
+            totals[kind][0] += ok
+            totals[kind][1] += failed
+        for p in procs:
+            p.join()
+
+        return {
+            'profile': profile,
+            'scans_per_sec': totals['write'][0] / duration,
+            'write_lock_errors': totals['write'][1],
+            'reads_per_sec': totals['read'][0] / duration,
+            'read_lock_errors': totals['read'][1],
+        }
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent scan writer processes')
+    parser.add_argument('--readers', type=int, default=2, help='Concurrent dashboard reader processes')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per profile')
+    args = parser.parse_args()
+
+    print(f"Benchmarking {args.workers} writers + {args.readers} readers for {args.duration}s per profile...")
+    print(f"{'profile':<10} {'scans/s':>10} {'write errs':>11} {'reads/s':>10} {'read errs':>10}")
+    for profile in ('default', 'tuned'):
+        r = run_profile(profile, args.workers, args.readers, args.duration)
+        print(f"{r['profile']:<10} {r['scans_per_sec']:>10.1f} {r['write_lock_errors']:>11} "
+              f"{r['reads_per_sec']:>10.1f} {r['read_lock_errors']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Headcount detector comparison.
+Runs each detector backend over the same set of images and reports per-image
+counts and latency, to weigh accuracy against CPU cost before choosing
+HEADCOUNT_DETECTOR or a per-classroom detector_backend.
+
+Usage:
+    python compare_detectors.py IMAGE_OR_DIR [...] [--backends haar,lbp,dnn] [--repeat 3]
+                                [--lbp-cascade PATH] [--dnn-model PATH]
+"""
+import argparse
+import os
+import statistics
+import time
+
+import cv2
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.webp'}
+
+
+def _collect_images(paths):
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    images.append(os.path.join(path, name))
+        else:
+            images.append(path)
+    return images
+
+
+def _load_backend(name, args):
+    from app.headcount_detector import BACKENDS, default_model_path
+    path = {'lbp': args.lbp_cascade, 'dnn': args.dnn_model}.get(name) or default_model_path(name)
+    try:
+        return BACKENDS[name](path)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[{name}] unavailable: {str(e).splitlines()[0]}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='Image files or directories of images')
+    parser.add_argument('--backends', default='haar,lbp,dnn')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per image (the first warm-up run is discarded)')
+    parser.add_argument('--lbp-cascade', help='Path to an LBP cascade XML (default: models/)')
+    parser.add_argument('--dnn-model', help='Path to the YuNet ONNX model (default: models/)')
+    args = parser.parse_args()
+
+    images = []
+    for path in _collect_images(args.paths):
+        image = cv2.imread(path)
+        if image is None:
+            print(f"Skipping unreadable image: {path}")
+            continue
+        images.append((os.path.basename(path), image))
+    if not images:
+        print("No images to compare.")
+        return
+
+    backends = [name.strip() for name in args.backends.split(',') if name.strip()]
+    counts = {}
+    summary = []
+    for name in backends:
+        detector = _load_backend(name, args)
+        if detector is None:
+            continue
+        latencies = []
+        counts[name] = {}
+        for image_name, image in images:
+            detector.detect_people(image)  # warm-up
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                count, _ = detector.detect_people(image)
+                latencies.append((time.perf_counter() - started) * 1000)
+            counts[name][image_name] = count
+        latencies.sort()
+        summary.append((
+            name,
+            statistics.mean(latencies),
+            statistics.median(latencies),
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            sum(counts[name].values())
+        ))
+
+    if not summary:
+        print("No backend could be loaded.")
+        return
+
+    print(f"\n{len(images)} image(s), {args.repeat} timed run(s) each\n")
+    print(f"{'backend':<8} {'mean ms':>9} {'median ms':>10} {'p95 ms':>9} {'faces':>7}")
+    for name, mean, median, p95, faces in summary:
+        print(f"{name:<8} {mean:>9.1f} {median:>10.1f} {p95:>9.1f} {faces:>7}")
+
+    loaded = [row[0] for row in summary]
+    width = max(len(image_name) for image_name, _ in images)
+    print(f"\n{'image':<{width}} " + ' '.join(f"{name:>6}" for name in loaded))
+    for image_name, _ in images:
+        print(f"{image_name:<{width}} " + ' '.join(f"{counts[name][image_name]:>6}" for name in loaded))
+
+
+if __name__ == '__main__':
+    main()
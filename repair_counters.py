@@ -0,0 +1,19 @@
+from app import create_app
+from app.counters import repair_counters
+from app.archive import attendance_archive
+from app.attendance_bitmap import rebuild_bitmaps
+
+app = create_app()
+
+def run_repair():
+    """Recompute the enrolled/present counters and the attendance bitmaps from the source tables."""
+    with app.app_context():
+        # Day counters and bitmaps of archived terms are kept; their records are no longer in the hot table
+        result = repair_counters(keep_before=attendance_archive.oldest_hot_day())
+        print(f"Classroom counters: {result['classrooms']}")
+        print(f"Classroom-day counters: {result['classroom_days']}")
+        result = rebuild_bitmaps(keep_before=attendance_archive.oldest_hot_day())
+        print(f"Attendance bitmaps: {result['bitmaps']} over {result['members']} member(s)")
+
+if __name__ == "__main__":
+    run_repair()
@@ -0,0 +1,48 @@
+"""
+Scan event journal replay.
+Re-inserts the attendance records of accepted scans from the scan event journal
+(records that already exist are skipped, so it is safe to run repeatedly), then
+optionally recomputes the enrolled/present summary counters. Prints the cursor to
+pass as --from-cursor next time to replay only newer events.
+
+Usage:
+    python replay_scan_events.py [--from-cursor SEGMENT:OFFSET] [--journal-dir DIR]
+                                 [--counters | --counters-only]
+"""
+import argparse
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--from-cursor', help='Replay only events after this cursor (default: the oldest event)')
+    parser.add_argument('--journal-dir', help='Journal directory (default: SCAN_EVENTS_DIR or instance/scan_events)')
+    parser.add_argument('--counters', action='store_true', help='Recompute the summary counters after replaying')
+    parser.add_argument('--counters-only', action='store_true', help='Only recompute the summary counters')
+    args = parser.parse_args()
+
+    if args.journal_dir:
+        os.environ['SCAN_EVENTS_DIR'] = args.journal_dir
+
+    from app import create_app
+    from app.archive import attendance_archive
+    from app.counters import repair_counters
+    from app.scan_events import scan_events, replay_attendance
+
+    app = create_app()
+    with app.app_context():
+        if not args.counters_only:
+            if not scan_events.enabled:
+                parser.error('the scan event journal is disabled (SCAN_EVENTS_ENABLED=0)')
+            accepted, cursor = replay_attendance(scan_events, args.from_cursor)
+            print(f"Accepted scans replayed: {accepted}")
+            print(f"Resume cursor: {cursor}")
+
+        if args.counters or args.counters_only:
+            result = repair_counters(keep_before=attendance_archive.oldest_hot_day())
+            print(f"Classroom counters: {result['classrooms']}")
+            print(f"Classroom-day counters: {result['classroom_days']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, time
+from app import create_app
+from app.models import db, Student, Classroom, AttendanceRecord
+from app.attendance_manager import attendance_manager
+from app.archive import attendance_archive
+
+class TestAttendanceArchive(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        os.environ['ARCHIVE_DIR'] = self.dir
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+        with self.app.app_context():
+            db.session.add(Student(id='AR1', name='Archive Student'))
+            db.session.add(Classroom(id='ARCH_ROOM', name='Archive Room',
+                                     time_window_start=time(0, 0), time_window_end=time(23, 59)))
+            # Two past terms (January and July starts) and the current term
+            for day in (date(2024, 3, 4), date(2024, 3, 5), date(2024, 9, 2), date(2025, 2, 3)):
+                db.session.add(AttendanceRecord(student_id='AR1', classroom_id='ARCH_ROOM',
+                                                timestamp=datetime.combine(day, time(9, 30)), status='present'))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+        del os.environ['ARCHIVE_DIR']
+        shutil.rmtree(self.dir)
+
+    def test_term_boundaries(self):
+        self.assertEqual(attendance_archive.term_start(date(2024, 3, 4)), date(2024, 1, 1))
+        self.assertEqual(attendance_archive.term_start(date(2024, 9, 2)), date(2024, 7, 1))
+        self.assertEqual(attendance_archive.next_term_start(date(2024, 7, 1)), date(2025, 1, 1))
+
+    def test_archive_moves_old_terms_in_chunks(self):
+        with self.app.app_context():
+            moved = attendance_archive.archive(date(2025, 1, 1), chunk_size=1)
+            self.assertEqual(moved, {'2024-01-01': 2, '2024-07-01': 1})
+            self.assertEqual(attendance_archive.archived_terms(), [date(2024, 1, 1), date(2024, 7, 1)])
+            self.assertEqual(AttendanceRecord.query.count(), 1)
+            # Nothing left to move
+            self.assertEqual(attendance_archive.archive(date(2025, 1, 1)), {})
+
+    def test_reads_span_hot_table_and_archives(self):
+        with self.app.app_context():
+            attendance_archive.archive(date(2025, 1, 1))
+            records = attendance_archive.records_between('ARCH_ROOM', date(2024, 1, 1), date(2025, 12, 31))
+            self.assertEqual([r['timestamp'][:10] for r in records],
+                             ['2025-02-03', '2024-09-02', '2024-03-05', '2024-03-04'])
+            self.assertEqual(set(records[0]), set(AttendanceRecord.query.first().to_dict()))
+
+            archived_day = attendance_manager.get_attendance_list('ARCH_ROOM', datetime(2024, 3, 5, 12, 0))
+            self.assertEqual([r['timestamp'] for r in archived_day], ['2024-03-05T09:30:00'])
+
+        response = self.client.get('/api/attendance/ARCH_ROOM/history?from=2024-09-01&to=2025-02-28')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['count'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+
+import unittest
+import os
+from datetime import date, datetime, time
+from app import create_app
+from app.attendance_manager import attendance_manager
+from app.attendance_bitmap import (absent_students, attendance_overlap, attendance_streaks,
+                                   load_matrix, present_students, rebuild_bitmaps)
+from app.models import db, Student, Classroom, AttendanceBitmap
+
+class TestAttendanceBitmap(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+        with self.app.app_context():
+            for i in range(10):
+                db.session.add(Student(id=f'B{i:03d}', name=f'Bit {i}'))
+            for room in ('BIT_A', 'BIT_B'):
+                db.session.add(Classroom(id=room, name=room,
+                                         time_window_start=time(0, 0), time_window_end=time(23, 59)))
+            db.session.commit()
+            # More than 8 members, so bitmaps span bytes
+            for i in range(10):
+                attendance_manager.enroll_student(f'B{i:03d}', 'BIT_A')
+            for i in (1, 2, 3):
+                attendance_manager.enroll_student(f'B{i:03d}', 'BIT_B')
+
+            # Three class days: B001 and B009 every day, B002 misses the middle one
+            for day, present in ((date(2025, 2, 3), (1, 2, 9)), (date(2025, 2, 4), (1, 9)),
+                                 (date(2025, 2, 5), (1, 2, 9))):
+                for i in present:
+                    attendance_manager.mark_attendance(f'B{i:03d}', 'BIT_A', timestamp=datetime.combine(day, time(9, 0)))
+            for i in (2, 3):
+                attendance_manager.mark_attendance(f'B{i:03d}', 'BIT_B',
+                                                   timestamp=datetime.combine(date(2025, 2, 5), time(11, 0)))
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def test_present_and_absent(self):
+        with self.app.app_context():
+            day = date(2025, 2, 4)
+            self.assertEqual(present_students('BIT_A', day), ['B001', 'B009'])
+            absent = absent_students('BIT_A', day)
+            self.assertEqual(len(absent), 8)
+            self.assertNotIn('B009', absent)
+
+            # Unenrolled students drop out of the absent list; their bit is kept
+            attendance_manager.unenroll_student('B000', 'BIT_A')
+            self.assertNotIn('B000', absent_students('BIT_A', day))
+            # A day the class did not meet: every enrolled student is absent
+            self.assertEqual(len(absent_students('BIT_A', date(2025, 2, 10))), 9)
+
+    def test_streaks_and_overlap(self):
+        with self.app.app_context():
+            result = attendance_streaks('BIT_A', date(2025, 1, 1), date(2025, 6, 30))
+            self.assertEqual(result['days'], ['2025-02-03', '2025-02-04', '2025-02-05'])
+            self.assertEqual(result['students']['B001'],
+                             {'days_present': 3, 'attended_all': True, 'current_streak': 3, 'longest_streak': 3})
+            self.assertEqual(result['students']['B002'],
+                             {'days_present': 2, 'attended_all': False, 'current_streak': 1, 'longest_streak': 1})
+            self.assertEqual(result['students']['B005']['days_present'], 0)
+
+            self.assertEqual(attendance_overlap(['BIT_A', 'BIT_B'], date(2025, 2, 5)), ['B002'])
+
+        response = self.client.get('/api/attendance/BIT_A/streaks?from=2025-02-01&to=2025-02-28')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['students']['B009']['attended_all'])
+        response = self.client.get('/api/attendance/BIT_A/absent?day=2025-02-04')
+        self.assertEqual(response.get_json()['present_count'], 2)
+        self.assertEqual(self.client.get('/api/attendance/BIT_A/absent?day=nope').status_code, 400)
+
+    def test_rebuild_matches_write_path(self):
+        with self.app.app_context():
+            before = load_matrix('BIT_A', date(2025, 1, 1), date(2025, 6, 30))
+            stored = {(b.classroom_id, b.day): b.bits for b in AttendanceBitmap.query.all()}
+            rebuild_bitmaps()
+            after = load_matrix('BIT_A', date(2025, 1, 1), date(2025, 6, 30))
+            self.assertEqual(before[0], after[0])
+            self.assertEqual(list(before[1]), list(after[1]))
+            self.assertTrue((before[2] == after[2]).all())
+            self.assertEqual({(b.classroom_id, b.day): b.bits for b in AttendanceBitmap.query.all()}, stored)
+
+if __name__ == '__main__':
+    unittest.main()
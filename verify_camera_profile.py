@@ -0,0 +1,99 @@
+
+import unittest
+import os
+from datetime import time
+import numpy as np
+from app import create_app
+from app.models import db, Classroom
+from app.camera_profile import CameraProfile, load_camera_profile
+from app.headcount_detector import HeadcountDetector
+
+class FixedBoxDetector(HeadcountDetector):
+    """Returns fixed boxes (in the coordinates of the image it is given) and records its calls."""
+    name = 'fixed'
+
+    def __init__(self, boxes):
+        super().__init__()
+        self.boxes = boxes
+        self.calls = []
+
+    def _detect(self, image, scale, overrides):
+        self.calls.append((image.shape, overrides))
+        return self.boxes
+
+class TestCameraProfile(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+        with self.app.app_context():
+            db.session.add(Classroom(id='CAM_ROOM', name='Camera Room',
+                                     time_window_start=time(8, 0), time_window_end=time(18, 0)))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            CameraProfile.from_json({'roi': [[0, 0], [1, 1]]})
+        with self.assertRaises(ValueError):
+            CameraProfile.from_json({'roi': [[0, 0], [1.5, 0], [1, 1]]})
+        with self.assertRaises(ValueError):
+            CameraProfile.from_json({'min_face_size': 80, 'max_face_size': 40})
+        with self.assertRaises(ValueError):
+            CameraProfile.from_json({'scale_factor': 1.0})
+        profile = CameraProfile.from_json({'min_face_size': 20, 'scale_factor': 1.05})
+        self.assertEqual(profile.detector_overrides(), {'minSize': (20, 20), 'scaleFactor': 1.05})
+
+    def test_detection_limited_to_roi(self):
+        # Triangle over the left half: (0,0), (0.5,0), (0,1) of a 200x100 image
+        profile = CameraProfile(roi=[[0, 0], [0.5, 0], [0, 1]], min_face_size=10)
+        # Boxes are relative to the 100x100 crop; the second box's centre is outside the triangle
+        detector = FixedBoxDetector([(5, 5, 10, 10), (80, 80, 10, 10)])
+        image = np.zeros((100, 200), dtype=np.uint8)
+
+        count, detections = detector.detect_people(image, 2.0, profile)
+        self.assertEqual(count, 1)
+        self.assertEqual(detections[0], {'x': 10, 'y': 10, 'width': 20, 'height': 20})
+        shape, overrides = detector.calls[0]
+        self.assertEqual(shape, (100, 100))
+        self.assertEqual(overrides, {'minSize': (10, 10)})
+
+        # Without a profile the whole frame is scanned
+        detector.detect_people(image)
+        self.assertEqual(detector.calls[1][0], (100, 200))
+
+    def test_profile_endpoint(self):
+        response = self.client.get('/api/classroom/CAM_ROOM/camera-profile')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.get_json()['camera_profile']['roi'])
+
+        body = {'roi': [[0.1, 0.2], [0.9, 0.2], [0.9, 1], [0.1, 1]], 'max_face_size': 120, 'scale_factor': 1.08}
+        response = self.client.put('/api/classroom/CAM_ROOM/camera-profile', json=body)
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            profile = load_camera_profile('CAM_ROOM')
+            self.assertEqual(profile.roi_box(1000, 500), (100, 100, 900, 500))
+            self.assertEqual(profile.scale_factor, 1.08)
+
+        response = self.client.put('/api/classroom/CAM_ROOM/camera-profile', json={'roi': 'all'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/classroom/NO_ROOM/camera-profile')
+        self.assertEqual(response.status_code, 404)
+
+        with self.client.session_transaction() as sess:
+            sess['role'] = 'Student'
+        response = self.client.get('/api/classroom/CAM_ROOM/camera-profile')
+        self.assertEqual(response.status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+
+import unittest
+import os
+from datetime import datetime, time
+from unittest import mock
+import pytz
+from app import create_app
+from app.attendance_manager import attendance_manager
+from app.counters import ON_CONFLICT_INSERTS, repair_counters
+from app.attendance_bitmap import present_students
+from app.models import db, Student, Classroom, ClassSession, ClassroomCounter, ClassroomDayCounter
+from app.scan_queue import commit_scan_entries
+
+class TestClassroomCounters(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+        with self.app.app_context():
+            for i in range(3):
+                db.session.add(Student(id=f'C{i:03d}', name=f'Counter {i}'))
+            db.session.add(Classroom(id='COUNT_ROOM', name='Count Room',
+                                     time_window_start=time(0, 0), time_window_end=time(23, 59)))
+            db.session.commit()
+            for i in range(3):
+                attendance_manager.enroll_student(f'C{i:03d}', 'COUNT_ROOM')
+            # Re-enrolling must not double count
+            attendance_manager.enroll_student('C000', 'COUNT_ROOM')
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def test_write_paths_keep_counters_in_sync(self):
+        with self.app.app_context():
+            now = datetime.now(pytz.timezone('Asia/Kolkata'))
+            self.assertTrue(attendance_manager.mark_attendance('C000', 'COUNT_ROOM', timestamp=now))
+            self.assertFalse(attendance_manager.mark_attendance('C000', 'COUNT_ROOM', timestamp=now))
+            self.assertTrue(attendance_manager.mark_attendance('C001', 'COUNT_ROOM', timestamp=now))
+
+            stats = attendance_manager.get_classroom_stats('COUNT_ROOM', now.date())
+            self.assertEqual(stats, {'total_enrolled': 3, 'scanned_count': 2})
+
+        response = self.client.get('/api/dashboard/stats?classroom_id=COUNT_ROOM')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['total_enrolled'], 3)
+        self.assertEqual(data['scanned_count'], 2)
+
+        response = self.client.post('/api/dashboard/headcount-check', json={'classroom_id': 'COUNT_ROOM'})
+        self.assertEqual(response.get_json()['missing'], 1)
+
+    def test_unknown_classroom_reads_zero(self):
+        with self.app.app_context():
+            stats = attendance_manager.get_classroom_stats('NO_SUCH_ROOM')
+            self.assertEqual(stats, {'total_enrolled': 0, 'scanned_count': 0})
+
+    def test_repair_recomputes_from_source_tables(self):
+        with self.app.app_context():
+            now = datetime.now(pytz.timezone('Asia/Kolkata'))
+            attendance_manager.mark_attendance('C002', 'COUNT_ROOM', timestamp=now)
+
+            # Simulate drift
+            db.session.query(ClassroomCounter).update({'enrolled_count': 99})
+            db.session.query(ClassroomDayCounter).delete()
+            db.session.commit()
+
+            result = repair_counters()
+            self.assertEqual(result, {'classrooms': 1, 'classroom_days': 1})
+            stats = attendance_manager.get_classroom_stats('COUNT_ROOM', now.date())
+            self.assertEqual(stats, {'total_enrolled': 3, 'scanned_count': 1})
+
+    def test_sessions_count_each_student_once_per_day(self):
+        with self.app.app_context():
+            sessions = [ClassSession(classroom_id='COUNT_ROOM', day_of_week=0, start_time=time(9 + i, 0),
+                                     end_time=time(10 + i, 0)) for i in range(3)]
+            db.session.add_all(sessions)
+            db.session.commit()
+            day = datetime(2025, 3, 3)
+            self.assertTrue(attendance_manager.mark_attendance('C000', 'COUNT_ROOM', day.replace(hour=9),
+                                                               session_id=sessions[0].id))
+            self.assertTrue(attendance_manager.mark_attendance('C000', 'COUNT_ROOM', day.replace(hour=10),
+                                                               session_id=sessions[1].id))
+            # Write-behind path: a batch with a new session for C000 and two for C001
+            commit_scan_entries([
+                {'student_id': 'C000', 'classroom_id': 'COUNT_ROOM', 'session_id': sessions[2].id,
+                 'timestamp': day.replace(hour=11).isoformat()},
+                {'student_id': 'C001', 'classroom_id': 'COUNT_ROOM', 'session_id': sessions[1].id,
+                 'timestamp': day.replace(hour=10).isoformat()},
+                {'student_id': 'C001', 'classroom_id': 'COUNT_ROOM', 'session_id': sessions[2].id,
+                 'timestamp': day.replace(hour=11).isoformat()},
+            ])
+
+            live = attendance_manager.get_classroom_stats('COUNT_ROOM', day.date())
+            self.assertEqual(live, {'total_enrolled': 3, 'scanned_count': 2})
+            repair_counters()
+            self.assertEqual(attendance_manager.get_classroom_stats('COUNT_ROOM', day.date()), live)
+
+    def test_backends_without_on_conflict(self):
+        # Other dialects take the update-then-insert path
+        with self.app.app_context(), mock.patch.dict(ON_CONFLICT_INSERTS, clear=True):
+            db.session.add(Student(id='C003', name='Counter 3'))
+            db.session.commit()
+            attendance_manager.enroll_student('C003', 'COUNT_ROOM')
+            day = datetime(2025, 3, 4, 9, 0)
+            for student_id in ('C000', 'C003'):
+                self.assertTrue(attendance_manager.mark_attendance(student_id, 'COUNT_ROOM', timestamp=day))
+
+            self.assertEqual(attendance_manager.get_classroom_stats('COUNT_ROOM', day.date()),
+                             {'total_enrolled': 4, 'scanned_count': 2})
+            self.assertEqual(present_students('COUNT_ROOM', day.date()), ['C000', 'C003'])
+
+if __name__ == '__main__':
+    unittest.main()
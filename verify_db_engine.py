@@ -0,0 +1,64 @@
+
+import unittest
+import os
+import shutil
+import tempfile
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from app.models import db
+from app.db_engine import run_with_lock_retry
+
+class TestDbEngineProfile(unittest.TestCase):
+    def setUp(self):
+        # WAL needs a real file, not an in-memory database
+        self.tmp_dir = tempfile.mkdtemp()
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(self.tmp_dir, 'test.db')}"
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+        del os.environ['DATABASE_URL']
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_pragmas_applied(self):
+        with self.app.app_context():
+            journal_mode = db.session.execute(text('PRAGMA journal_mode')).scalar()
+            busy_timeout = db.session.execute(text('PRAGMA busy_timeout')).scalar()
+            synchronous = db.session.execute(text('PRAGMA synchronous')).scalar()
+            self.assertEqual(journal_mode.lower(), 'wal')
+            self.assertEqual(busy_timeout, 20000)
+            self.assertEqual(synchronous, 1)  # NORMAL
+
+    def test_retry_on_lock_error(self):
+        calls = []
+
+        def flaky_write():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('INSERT', {}, Exception('database is locked'))
+            return 'ok'
+
+        with self.app.app_context():
+            self.app.config['SQLITE_RETRY_BASE_DELAY'] = 0.001
+            self.assertEqual(run_with_lock_retry(flaky_write), 'ok')
+            self.assertEqual(len(calls), 3)
+
+    def test_non_lock_error_not_retried(self):
+        calls = []
+
+        def broken_write():
+            calls.append(1)
+            raise OperationalError('INSERT', {}, Exception('no such table: nope'))
+
+        with self.app.app_context():
+            with self.assertRaises(OperationalError):
+                run_with_lock_retry(broken_write)
+            self.assertEqual(len(calls), 1)
+
+if __name__ == '__main__':
+    unittest.main()
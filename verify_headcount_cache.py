@@ -0,0 +1,113 @@
+
+import unittest
+import os
+import io
+import shutil
+import tempfile
+from datetime import time
+from types import SimpleNamespace
+import cv2
+import numpy as np
+from app import create_app
+from app.models import db, Classroom
+from app.headcount_cache import headcount_cache, make_cache_key, SQLiteResultStore
+from app.headcount_detector import DetectorRegistry, headcount_detectors
+
+class TestHeadcountCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        os.environ['HEADCOUNT_CACHE_PATH'] = os.path.join(self.tmp_dir, 'headcount_cache.db')
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+        with self.app.app_context():
+            db.session.add(Classroom(id='CACHE_ROOM', name='Cache Room',
+                                     time_window_start=time(0, 0), time_window_end=time(23, 59)))
+            db.session.commit()
+
+        image = np.full((120, 160, 3), 200, dtype=np.uint8)
+        cv2.rectangle(image, (40, 30), (100, 90), (20, 20, 20), -1)
+        self.png_bytes = cv2.imencode('.png', image)[1].tobytes()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+        del os.environ['HEADCOUNT_CACHE_PATH']
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _upload(self, data):
+        return self.client.post('/headcount', data={
+            'classroom_id': 'CACHE_ROOM',
+            'image': (io.BytesIO(data), 'room.png')
+        }, content_type='multipart/form-data')
+
+    @unittest.skipIf(headcount_detectors.get('haar') is None, 'Haar cascade data not installed')
+    def test_reupload_is_served_from_cache(self):
+        first = self._upload(self.png_bytes).get_json()
+        self.assertFalse(first['cached'])
+
+        second = self._upload(self.png_bytes).get_json()
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['headcount'], first['headcount'])
+        self.assertEqual(second['detections'], first['detections'])
+        self.assertIn('scanned_count', second['comparison'])
+
+    def test_key_depends_on_bytes_and_params(self):
+        params = {'scaleFactor': 1.1, 'minNeighbors': 10}
+        key = make_cache_key(b'abc', params)
+        self.assertEqual(key, make_cache_key(b'abc', dict(params)))
+        self.assertNotEqual(key, make_cache_key(b'abd', params))
+        self.assertNotEqual(key, make_cache_key(b'abc', {'scaleFactor': 1.2, 'minNeighbors': 10}))
+
+    def test_disk_store_shared_and_bounded(self):
+        path = os.path.join(self.tmp_dir, 'shared.db')
+        writer = SQLiteResultStore(path, max_entries=2)
+        for i in range(3):
+            writer.put(f'k{i}', {'count': i, 'detections': []})
+        reader = SQLiteResultStore(path, max_entries=2)
+        self.assertEqual(len(reader), 2)
+        self.assertIsNone(reader.get('k0'))
+        self.assertEqual(reader.get('k2')['count'], 2)
+
+    def test_memory_lru_is_bounded(self):
+        headcount_cache.store = None
+        headcount_cache.max_entries = 2
+        for i in range(3):
+            headcount_cache.put(f'm{i}', i, [])
+        self.assertEqual(len(headcount_cache), 2)
+        self.assertIsNone(headcount_cache.get('m0'))
+        self.assertEqual(headcount_cache.get('m2')['count'], 2)
+
+class TestDetectorModels(unittest.TestCase):
+    def setUp(self):
+        self.models_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.models_dir, ignore_errors=True)
+
+    def init_registry(self, **config):
+        registry = DetectorRegistry()
+        registry.init_app(SimpleNamespace(config={'HEADCOUNT_MODELS_DIR': self.models_dir, **config}))
+        return registry
+
+    def test_model_files_default_to_models_dir(self):
+        registry = self.init_registry()
+        self.assertEqual(registry.paths['lbp'], os.path.join(self.models_dir, 'lbpcascade_frontalface_improved.xml'))
+        self.assertEqual(registry.paths['dnn'], os.path.join(self.models_dir, 'face_detection_yunet_2023mar.onnx'))
+
+    def test_explicit_backend_that_cannot_load_fails_startup(self):
+        with self.assertRaises(RuntimeError):
+            self.init_registry(HEADCOUNT_DETECTOR='dnn', HEADCOUNT_DETECTOR_REQUIRED=True)
+        # The implicit default only warns
+        registry = self.init_registry(HEADCOUNT_DETECTOR='dnn')
+        self.assertIsNone(registry.get())
+
+if __name__ == '__main__':
+    unittest.main()
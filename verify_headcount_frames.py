@@ -0,0 +1,62 @@
+
+import unittest
+import os
+import shutil
+import tempfile
+import cv2
+import numpy as np
+from app.headcount_frames import FrameHeadcounter, iter_clip_frames, aggregate_counts
+
+class BrightnessDetector:
+    """Stand-in detector: 'detects' one face per 50 levels of mean brightness."""
+    def detect_people(self, image, scale=1.0, profile=None):
+        count = int(image.mean() // 50)
+        return count, [{'x': 0, 'y': 0, 'width': 1, 'height': 1}] * count
+
+class TestHeadcountFrames(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _write_clip(self, levels):
+        path = os.path.join(self.tmp_dir, 'clip.avi')
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+        for level in levels:
+            writer.write(np.full((48, 64, 3), level, dtype=np.uint8))
+        writer.release()
+        return path
+
+    def test_aggregates(self):
+        self.assertEqual(aggregate_counts([3, 4, 4, 5, 12], 'median'), 4)
+        # One outlier frame cannot set max_consensus on its own
+        self.assertEqual(aggregate_counts([3, 4, 4, 5, 12], 'max_consensus'), 5)
+        self.assertEqual(aggregate_counts([7], 'max_consensus'), 7)
+        self.assertEqual(aggregate_counts([], 'median'), 0)
+        with self.assertRaises(ValueError):
+            aggregate_counts([1], 'mean')
+
+    def test_clip_sampled_at_stride(self):
+        path = self._write_clip([i * 10 for i in range(20)])
+        indexes = [index for index, _ in iter_clip_frames(path, stride=5, max_frames=60)]
+        self.assertEqual(indexes, [0, 5, 10, 15])
+        indexes = [index for index, _ in iter_clip_frames(path, stride=5, max_frames=2)]
+        self.assertEqual(indexes, [0, 5])
+
+    def test_parallel_counts_in_frame_order(self):
+        path = self._write_clip([0, 60, 110, 160, 210, 60, 60, 110])
+        counter = FrameHeadcounter()
+        counter.workers = 3
+        try:
+            results = counter.count_frames(iter_clip_frames(path, 1, 60), BrightnessDetector)
+        finally:
+            counter.shutdown()
+        self.assertEqual([r['frame'] for r in results], list(range(8)))
+        counts = [r['count'] for r in results]
+        self.assertEqual(len(results[3]['detections']), counts[3])
+        self.assertEqual(counts[0], 0)
+        self.assertGreater(counts[4], counts[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+
+import unittest
+import os
+from datetime import datetime, date, time
+from app import create_app
+from app.models import db, Classroom, HeadcountRun
+from app.headcount_runs import headcount_runs, get_discrepancy_trend
+
+class TestHeadcountRuns(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+        with self.app.app_context():
+            db.session.add(Classroom(id='RUN_ROOM', name='Run Room',
+                                     time_window_start=time(8, 0), time_window_end=time(18, 0)))
+            db.session.commit()
+
+        params = {'scaleFactor': 1.1}
+        headcount_runs.record('RUN_ROOM', 30, 25, params, 120.5, run_at=datetime(2026, 3, 2, 9, 0))
+        headcount_runs.record('RUN_ROOM', 28, 25, params, 3.1, cached=True, run_at=datetime(2026, 3, 2, 9, 5))
+        headcount_runs.record('RUN_ROOM', 20, 21, params, 99.0, run_at=datetime(2026, 3, 4, 10, 0))
+        headcount_runs.record('RUN_ROOM', 40, 10, params, 99.0, run_at=datetime(2026, 4, 1, 10, 0))
+        headcount_runs.flush()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def test_runs_are_written_in_background(self):
+        with self.app.app_context():
+            self.assertEqual(HeadcountRun.query.count(), 4)
+            run = HeadcountRun.query.filter_by(cached=True).one()
+            self.assertEqual(run.to_dict()['difference'], 3)
+            self.assertEqual(run.to_dict()['detector_params'], {'scaleFactor': 1.1})
+
+    def test_discrepancy_trend_by_day(self):
+        with self.app.app_context():
+            days = get_discrepancy_trend('RUN_ROOM', date(2026, 3, 1), date(2026, 3, 31))
+        self.assertEqual([d['date'] for d in days], ['2026-03-02', '2026-03-04'])
+        self.assertEqual(days[0]['runs'], 2)
+        self.assertEqual(days[0]['max_difference'], 5)
+        self.assertEqual(days[0]['avg_detected'], 29)
+        self.assertEqual(days[1]['min_difference'], -1)
+
+    def test_history_endpoint(self):
+        response = self.client.get('/api/headcount/history?classroom_id=RUN_ROOM&from=2026-03-01&to=2026-04-30&runs=1')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(len(data['days']), 3)
+        self.assertEqual(data['runs'][0]['run_at'], '2026-04-01T10:00:00')
+
+        response = self.client.get('/api/headcount/history?classroom_id=RUN_ROOM&from=2026-05-01&to=2026-04-01')
+        self.assertEqual(response.status_code, 400)
+
+        with self.client.session_transaction() as sess:
+            sess['role'] = 'Student'
+        response = self.client.get('/api/headcount/history?classroom_id=RUN_ROOM')
+        self.assertEqual(response.status_code, 403)
+
+if __name__ == '__main__':
+    unittest.main()
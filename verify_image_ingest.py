@@ -0,0 +1,63 @@
+
+import unittest
+import io
+import struct
+import cv2
+import numpy as np
+from app.image_ingest import ImageIngest, UploadTooLarge, read_image_size, choose_reduction
+
+class TestImageIngest(unittest.TestCase):
+    def setUp(self):
+        self.image = np.zeros((300, 437, 3), dtype=np.uint8)
+        cv2.circle(self.image, (200, 150), 80, (200, 100, 50), -1)
+        self.ingest = ImageIngest()
+        self.ingest.max_bytes = 1024 * 1024
+        self.ingest.max_side = 200
+
+    def test_header_dimensions(self):
+        for ext in ('.jpg', '.png', '.bmp', '.webp'):
+            data = cv2.imencode(ext, self.image)[1].tobytes()
+            self.assertEqual(read_image_size(data), (437, 300), ext)
+        progressive = cv2.imencode('.jpg', self.image, [cv2.IMWRITE_JPEG_PROGRESSIVE, 1])[1].tobytes()
+        self.assertEqual(read_image_size(progressive), (437, 300))
+        self.assertIsNone(read_image_size(b'not an image'))
+
+    def test_reduction_choice(self):
+        self.assertEqual(choose_reduction(1000, 800, 1280), 1)
+        self.assertEqual(choose_reduction(2400, 1800, 1280), 2)
+        self.assertEqual(choose_reduction(4000, 3000, 1280), 4)
+        self.assertEqual(choose_reduction(20000, 100, 1280), 8)
+
+    def test_decode_reduced_grayscale(self):
+        data = self.ingest.read_upload(io.BytesIO(cv2.imencode('.jpg', self.image)[1].tobytes()))
+        image, scale = self.ingest.decode_for_detection(data)
+        self.assertEqual(image.ndim, 2)
+        self.assertLessEqual(max(image.shape), 200)
+        self.assertAlmostEqual(scale, 437 / image.shape[1])
+
+        image, _ = self.ingest.decode_for_detection(data, color=True)
+        self.assertEqual(image.shape[2], 3)
+
+    def test_exif_rotated_jpeg_scale(self):
+        # APP1 Exif segment with Orientation = 6 (rotate 90 degrees clockwise)
+        ifd = struct.pack('>HHHIHHI', 1, 0x0112, 3, 1, 6, 0, 0)
+        exif = b'Exif\x00\x00' + b'MM\x00\x2a' + struct.pack('>I', 8) + ifd
+        jpeg = cv2.imencode('.jpg', self.image)[1].tobytes()
+        rotated = jpeg[:2] + b'\xff\xe1' + struct.pack('>H', len(exif) + 2) + exif + jpeg[2:]
+
+        image, scale = self.ingest.decode_for_detection(self.ingest.read_upload(io.BytesIO(rotated)))
+        # Decoded upright (taller than wide); the scale is still the reduction factor
+        self.assertGreater(image.shape[0], image.shape[1])
+        self.assertAlmostEqual(scale, 437 / image.shape[0])
+        self.assertAlmostEqual(scale, 300 / image.shape[1], delta=0.05)
+
+    def test_buffer_reused_and_bounded(self):
+        first = self.ingest.read_upload(io.BytesIO(b'abc'))
+        self.assertEqual(bytes(first), b'abc')
+        second = self.ingest.read_upload(io.BytesIO(b'xy'))
+        self.assertIs(first.obj, second.obj)
+        with self.assertRaises(UploadTooLarge):
+            self.ingest.read_upload(io.BytesIO(b'\0' * (1024 * 1024 + 1)))
+
+if __name__ == '__main__':
+    unittest.main()
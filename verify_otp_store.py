@@ -0,0 +1,83 @@
+
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from app import create_app
+from app.models import db, User
+from app.otp_store import (otp_store, MemoryOTPBackend, SQLiteOTPBackend,
+                           OTP_OK, OTP_INVALID, OTP_EXPIRED, OTP_LOCKED)
+
+class TestOTPStore(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _check_backend(self, backend):
+        now = time.time()
+        backend.put('a@x', '123456', expires_at=now + 100)
+        self.assertEqual(backend.check('a@x', '000000', now=now, max_attempts=2), OTP_INVALID)
+        self.assertEqual(backend.check('a@x', '123456', now=now, max_attempts=2), OTP_OK)
+        # Consumed on success
+        self.assertEqual(backend.check('a@x', '123456', now=now, max_attempts=2), OTP_INVALID)
+
+        backend.put('b@x', '111111', expires_at=now + 100)
+        self.assertEqual(backend.check('b@x', '111111', now=now + 101, max_attempts=2), OTP_EXPIRED)
+
+        backend.put('c@x', '222222', expires_at=now + 100)
+        backend.check('c@x', '000000', now=now, max_attempts=2)
+        backend.check('c@x', '000000', now=now, max_attempts=2)
+        self.assertEqual(backend.check('c@x', '222222', now=now, max_attempts=2), OTP_LOCKED)
+
+        backend.put('d@x', '333333', expires_at=now + 50)
+        self.assertEqual(backend.purge_expired(now=now + 60), 1)
+        self.assertEqual(len(backend), 0)
+
+    def test_memory_backend(self):
+        self._check_backend(MemoryOTPBackend())
+
+    def test_sqlite_backend_shared_between_instances(self):
+        path = os.path.join(self.tmp_dir, 'otp.db')
+        self._check_backend(SQLiteOTPBackend(path))
+
+        # A second instance (another worker) sees entries written by the first
+        SQLiteOTPBackend(path).put('e@x', '444444', expires_at=1e12)
+        self.assertEqual(SQLiteOTPBackend(path).check('e@x', '444444', now=0, max_attempts=5), OTP_OK)
+
+    def test_login_does_not_write_users_table(self):
+        email = 'new_202499999@smit.smu.edu.in'
+        response = self.client.post('/login', json={'email': email})
+        self.assertEqual(response.status_code, 200)
+
+        with self.app.app_context():
+            self.assertIsNone(User.query.filter_by(email=email).first())
+
+        # Issue a known code and verify it: the user is created only now
+        otp = otp_store.issue(email)
+        response = self.client.post('/verify', json={'email': email, 'otp': otp})
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            self.assertIsNotNone(User.query.filter_by(email=email).first())
+
+    def test_wrong_otp_rejected(self):
+        email = 'other_202488888@smit.smu.edu.in'
+        otp_store.issue(email)
+        response = self.client.post('/verify', json={'email': email, 'otp': '000000'})
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Invalid OTP', response.get_json()['error'])
+        with self.app.app_context():
+            self.assertIsNone(User.query.filter_by(email=email).first())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+
+import unittest
+import os
+from datetime import datetime, time, timedelta
+from app import create_app
+from app.models import db, Student, Classroom, AttendanceRecord
+
+class TestKeysetPagination(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Admin'
+
+        with self.app.app_context():
+            for i in range(7):
+                db.session.add(Student(id=f'P{i:03d}', name=f'Pupil {i}'))
+            for i in range(3):
+                db.session.add(Classroom(id=f'ROOM_{i}', name=f'Room {i}',
+                                         time_window_start=time(8, 0), time_window_end=time(18, 0)))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def _collect(self, url, key):
+        items, cursor = [], None
+        while True:
+            page_url = url + (f'&after={cursor}' if cursor else '')
+            data = self.client.get(page_url).get_json()
+            items.extend(data[key])
+            cursor = data['next_cursor']
+            if not cursor:
+                return items
+
+    def test_students_pages_cover_everything_once(self):
+        students = self._collect('/api/students?limit=3', 'students')
+        names = [s['name'] for s in students]
+        self.assertEqual(len(names), 8)  # 7 + the auto-seeded student
+        self.assertEqual(names, sorted(names))
+
+    def test_cursor_stable_across_inserts(self):
+        first = self.client.get('/api/students?limit=3').get_json()
+        # A row inserted before the cursor position must not shift the next page
+        with self.app.app_context():
+            db.session.add(Student(id='AAA', name='Aaron'))
+            db.session.commit()
+        second = self.client.get(f"/api/students?limit=3&after={first['next_cursor']}").get_json()
+        first_ids = {s['id'] for s in first['students']}
+        self.assertFalse(first_ids & {s['id'] for s in second['students']})
+        self.assertNotIn('AAA', [s['id'] for s in second['students']])
+
+    def test_invalid_cursor_rejected(self):
+        response = self.client.get('/api/students?after=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor_rejected_for_every_format(self):
+        from app.pagination import encode_cursor
+        bad_contents = encode_cursor(['yesterday', 'x'])
+        for url in ['/api/students?after=not-a-cursor', '/api/admin/data?after=not-a-cursor',
+                    '/api/attendance/ROOM_0?after=not-a-cursor', f'/api/attendance/ROOM_0?after={bad_contents}',
+                    '/api/attendance/ROOM_0?limit=many']:
+            for fmt in ['', '&format=columnar']:
+                response = self.client.get(url + fmt)
+                self.assertEqual(response.status_code, 400, url + fmt)
+                self.assertIn('error', response.get_json())
+
+    def test_legacy_flag_keeps_old_shapes(self):
+        students = self.client.get('/api/students?legacy=1').get_json()
+        self.assertNotIn('next_cursor', students)
+        self.assertEqual(len(students['students']), 8)
+
+        admin_data = self.client.get('/api/admin/data?legacy=1').get_json()
+        self.assertEqual(set(admin_data.keys()), {'ROOM_0', 'ROOM_1', 'ROOM_2'})
+
+    def test_admin_data_pages(self):
+        classrooms = self._collect('/api/admin/data?limit=2', 'classrooms')
+        self.assertEqual([c['classroom_id'] for c in classrooms], ['ROOM_0', 'ROOM_1', 'ROOM_2'])
+
+    def test_attendance_pages_newest_first(self):
+        now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        with self.app.app_context():
+            for i in range(5):
+                db.session.add(AttendanceRecord(student_id=f'P{i:03d}', classroom_id='ROOM_0',
+                                                timestamp=now + timedelta(minutes=i)))
+            db.session.commit()
+
+        with self.app.app_context():
+            from app.attendance_manager import attendance_manager
+            records, cursor = attendance_manager.get_attendance_page('ROOM_0', day=now.date(), limit=2)
+            collected = list(records)
+            while cursor:
+                from app.pagination import decode_cursor
+                records, cursor = attendance_manager.get_attendance_page(
+                    'ROOM_0', day=now.date(), after=decode_cursor(cursor, 2), limit=2)
+                collected.extend(records)
+        self.assertEqual([r['student_id'] for r in collected], ['P004', 'P003', 'P002', 'P001', 'P000'])
+
+    def test_columnar_matches_object_shape(self):
+        students = self.client.get('/api/students?limit=500').get_json()['students']
+        columnar = self.client.get('/api/students?format=columnar&limit=3').get_json()
+        self.assertEqual(columnar['columns'], ['id', 'name', 'email'])
+        self.assertTrue(columnar['has_more'])
+        rows = columnar['rows']
+        while columnar['next_cursor']:
+            columnar = self.client.get(f"/api/students?format=columnar&limit=3&after={columnar['next_cursor']}").get_json()
+            rows.extend(columnar['rows'])
+        self.assertEqual([dict(zip(['id', 'name', 'email'], row)) for row in rows], students)
+
+        admin_data = self.client.get('/api/admin/data?legacy=1').get_json()
+        columnar = self.client.get('/api/admin/data?format=columnar&legacy=1').get_json()
+        self.assertNotIn('next_cursor', columnar)
+        self.assertEqual({row[0]: dict(zip(columnar['columns'][1:], row[1:])) for row in columnar['rows']}, admin_data)
+
+    def test_columnar_attendance(self):
+        now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        with self.app.app_context():
+            for i in range(3):
+                db.session.add(AttendanceRecord(student_id=f'P{i:03d}', classroom_id='ROOM_0',
+                                                timestamp=now + timedelta(minutes=i)))
+            db.session.commit()
+            from app.attendance_manager import attendance_manager
+            expected = attendance_manager.get_attendance_list('ROOM_0', now)
+            columns, rows, cursor = attendance_manager.get_attendance_rows('ROOM_0', day=now.date())
+        self.assertIsNone(cursor)
+        self.assertEqual([dict(zip(columns, row)) for row in rows], expected)
+
+    def test_recent_scans_since_id(self):
+        import pytz
+        today = datetime.now(pytz.timezone('Asia/Kolkata')).date()
+        with self.app.app_context():
+            for i in range(3):
+                db.session.add(AttendanceRecord(student_id=f'P{i:03d}', classroom_id='ROOM_1',
+                                                timestamp=datetime.combine(today, time(9, i))))
+            db.session.commit()
+
+        first = self.client.get('/api/dashboard/recent-scans?classroom_id=ROOM_1&limit=2').get_json()
+        self.assertEqual([s['student_id'] for s in first['scans']], ['P002', 'P001'])
+        self.assertEqual(first['day'], today.isoformat())
+
+        # Nothing new: empty delta, cursor unchanged
+        idle = self.client.get(f"/api/dashboard/recent-scans?classroom_id=ROOM_1&since_id={first['last_id']}").get_json()
+        self.assertEqual(idle['scans'], [])
+        self.assertEqual(idle['last_id'], first['last_id'])
+
+        with self.app.app_context():
+            db.session.add(AttendanceRecord(student_id='P003', classroom_id='ROOM_1',
+                                            timestamp=datetime.combine(today, time(9, 5))))
+            db.session.add(AttendanceRecord(student_id='P004', classroom_id='ROOM_2',
+                                            timestamp=datetime.combine(today, time(9, 5))))
+            db.session.commit()
+        delta = self.client.get(f"/api/dashboard/recent-scans?classroom_id=ROOM_1&since_id={first['last_id']}").get_json()
+        self.assertEqual([s['student_id'] for s in delta['scans']], ['P003'])
+        self.assertGreater(delta['last_id'], first['last_id'])
+
+        response = self.client.get('/api/dashboard/recent-scans?classroom_id=ROOM_1&since_id=abc')
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+
+import unittest
+import os
+import time
+from types import SimpleNamespace
+from sqlalchemy import event
+from app import create_app
+from app.models import db, User, Student
+from app.qr_payload import QRPayloadCodec, InvalidQRPayload, qr_codec
+
+def make_codec(**config):
+    codec = QRPayloadCodec()
+    codec.init_app(SimpleNamespace(config={'SECRET_KEY': 'dev', 'QR_SECRET_KEY': 'test-secret', 'QR_SIGNED': True, **config}))
+    return codec
+
+class TestQRPayload(unittest.TestCase):
+    def test_signed_round_trip(self):
+        codec = make_codec()
+        payload = codec.encode('2024.001')
+        self.assertTrue(payload.startswith('SA1.2024.001.'))
+        self.assertEqual(codec.decode(payload), '2024.001')
+
+    def test_forged_and_malformed_rejected(self):
+        codec = make_codec()
+        payload = codec.encode('S1', issued_at=1700000000)
+        for bad in (payload.replace('S1', 'S2', 1), payload[:-1] + ('A' if payload[-1] != 'A' else 'B'),
+                    'SA1.S1.notanumber.abc', 'SA1.S1', 'has space', 'x' * 51,
+                    make_codec(QR_SECRET_KEY='other').encode('S1')):
+            with self.assertRaises(InvalidQRPayload, msg=bad):
+                codec.decode(bad)
+
+    def test_revocation_and_migration_window(self):
+        codec = make_codec(QR_MIN_ISSUED_AT=1700000000, QR_PLAIN_ACCEPTED_UNTIL='2026-01-31')
+        with self.assertRaises(InvalidQRPayload):
+            codec.decode(codec.encode('S1', issued_at=1600000000))
+        self.assertEqual(codec.decode(codec.encode('S1', issued_at=1700000001)), 'S1')
+
+        # Plain ids pass through the end of the cutoff day, then are refused
+        self.assertEqual(codec.decode('S1', now=codec.plain_accepted_until - 1), 'S1')
+        with self.assertRaises(InvalidQRPayload):
+            codec.decode('S1', now=codec.plain_accepted_until + 1)
+
+    def test_unsigned_mode_emits_plain_ids(self):
+        codec = make_codec(QR_SIGNED=False)
+        self.assertEqual(codec.encode('S1'), 'S1')
+
+    def test_signing_requires_a_configured_key(self):
+        # The built-in SECRET_KEY is public, so signing with it would not stop forgeries
+        with self.assertRaises(RuntimeError):
+            make_codec(QR_SECRET_KEY=None)
+        self.assertEqual(make_codec(QR_SECRET_KEY=None, QR_SIGNED=False).encode('S1'), 'S1')
+
+class TestScanRejectsForgedQR(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def test_forged_payload_rejected_without_query(self):
+        forged = f'SA1.202400015.{int(time.time())}.AAAAAAAAAAAAAA'
+        with self.app.app_context():
+            statements = []
+            def count_statement(conn, cursor, statement, *args):
+                statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                response = self.client.post('/scan_qr', json={'student_id': forged})
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['status'], 'rejected')
+        self.assertEqual(statements, [])
+
+    def test_signed_payload_accepted_as_student_id(self):
+        qr_codec.sign_new_codes = True
+        try:
+            payload = qr_codec.encode('NOT_A_STUDENT')
+        finally:
+            qr_codec.sign_new_codes = False
+        response = self.client.post('/scan_qr', json={'student_id': payload})
+        # Passes verification and reaches the roster checks
+        self.assertNotEqual(response.status_code, 400)
+
+class TestStudentQRAccess(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            user = User(email='qr.owner@smit.smu.edu.in', password_hash='x', role='Student')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Student(id='QR_OWN', name='QR Owner', user_id=user.id))
+            db.session.add(Student(id='QR_OTHER', name='QR Other'))
+            db.session.commit()
+            self.user_id = user.id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def login(self, role, user_id):
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['role'] = role
+
+    def test_student_only_gets_own_code(self):
+        self.login('Student', self.user_id)
+        self.assertEqual(self.client.get('/admin/generate_student_qr/QR_OWN').status_code, 200)
+        self.assertEqual(self.client.get('/admin/generate_student_qr/QR_OTHER').status_code, 403)
+
+        self.login('Teacher', 1)
+        self.assertEqual(self.client.get('/admin/generate_student_qr/QR_OTHER').status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
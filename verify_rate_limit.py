@@ -0,0 +1,96 @@
+
+import unittest
+import os
+from sqlalchemy import event
+from app import create_app
+from app.models import db
+from app.rate_limit import TokenBucketLimiter, DebounceWindow
+from app.scanner_tokens import scanner_tokens
+
+class TestScanRateLimit(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        os.environ['SCAN_RATE_LIMIT_BURST'] = '2'
+        os.environ['SCAN_RATE_LIMIT_PER_SECOND'] = '0.01'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        for key in ('DATABASE_URL', 'SCAN_RATE_LIMIT_BURST', 'SCAN_RATE_LIMIT_PER_SECOND'):
+            del os.environ[key]
+
+    def test_token_bucket_refills(self):
+        limiter = TokenBucketLimiter(rate=1.0, burst=2)
+        self.assertTrue(limiter.allow('scanner', now=0.0)[0])
+        self.assertTrue(limiter.allow('scanner', now=0.0)[0])
+        allowed, retry_after = limiter.allow('scanner', now=0.0)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 1.0)
+        self.assertTrue(limiter.allow('scanner', now=1.0)[0])
+        # Other scanners have their own bucket
+        self.assertTrue(limiter.allow('other', now=1.0)[0])
+
+    def test_debounce_window(self):
+        debounce = DebounceWindow(window=2.0)
+        self.assertTrue(debounce.allow('S1', now=0.0)[0])
+        self.assertFalse(debounce.allow('S1', now=1.0)[0])
+        self.assertTrue(debounce.allow('S2', now=1.0)[0])
+        self.assertTrue(debounce.allow('S1', now=2.5)[0])
+
+    def test_scanner_over_limit_rejected_before_database(self):
+        self.client.post('/scan_qr', json={'student_id': 'A1'})
+        self.client.post('/scan_qr', json={'student_id': 'A2'})
+
+        statements = []
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                response = self.client.post('/scan_qr', json={'student_id': 'A3'})
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+        self.assertEqual(statements, [])
+
+        snapshot = self.client.get('/api/metrics').get_json()
+        self.assertGreaterEqual(snapshot['counters']['scan_rate_limited'], 1)
+        self.assertEqual(snapshot['gauges']['scan_rate_limit.burst'], 2)
+
+    def test_repeat_student_debounced(self):
+        first = self.client.post('/scan_qr', json={'student_id': 'B1'})
+        self.assertNotEqual(first.status_code, 429)
+        second = self.client.post('/scan_qr', json={'student_id': 'B1'})
+        self.assertEqual(second.status_code, 429)
+        self.assertEqual(second.get_json()['status'], 'rejected')
+
+    def test_bound_scanners_have_own_buckets(self):
+        # One teacher login running scanners in two rooms
+        with self.app.app_context():
+            room_a, room_b = scanner_tokens.issue('ROOM_A'), scanner_tokens.issue('ROOM_B')
+        for student_id in ('C1', 'C2'):
+            self.client.post('/scan_qr', json={'student_id': student_id, 'scanner_token': room_a})
+        response = self.client.post('/scan_qr', json={'student_id': 'C3', 'scanner_token': room_a})
+        self.assertEqual(response.status_code, 429)
+
+        response = self.client.post('/scan_qr', json={'student_id': 'C4', 'scanner_token': room_b})
+        self.assertNotEqual(response.status_code, 429)
+        # Unbound scans from the same login use the browser session's bucket
+        response = self.client.post('/scan_qr', json={'student_id': 'C5'})
+        self.assertNotEqual(response.status_code, 429)
+        # A forged token does not get a bucket of its own: it spends the session's last token
+        self.client.post('/scan_qr', json={'student_id': 'C6', 'scanner_token': room_a[:-2] + 'xx'})
+        response = self.client.post('/scan_qr', json={'student_id': 'C7', 'scanner_token': room_b[:-2] + 'yy'})
+        self.assertEqual(response.status_code, 429)
+
+if __name__ == '__main__':
+    unittest.main()
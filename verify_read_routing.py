@@ -0,0 +1,73 @@
+
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import time
+from app import create_app
+from app.models import db, Classroom
+from app.attendance_manager import attendance_manager
+from app.read_routing import READ_ENGINE, read_snapshot
+
+class TestReadRouting(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(self.dir, 'primary.db')}"
+        os.environ['READ_SNAPSHOT_SECONDS'] = '3600'
+        os.environ['READ_SNAPSHOT_PATH'] = os.path.join(self.dir, 'replica.db')
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Admin'
+
+    def tearDown(self):
+        read_snapshot.shutdown()
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        self.app.extensions[READ_ENGINE].dispose()
+        for key in ('DATABASE_URL', 'READ_SNAPSHOT_SECONDS', 'READ_SNAPSHOT_PATH'):
+            del os.environ[key]
+        shutil.rmtree(self.dir)
+
+    def add_classroom(self, client, classroom_id):
+        response = client.post('/api/admin/add', json={
+            'classroom_id': classroom_id, 'subject': 'Physics', 'department': 'Science',
+            'classroom': classroom_id, 'start_time': '09:00', 'end_time': '10:00',
+            'student_ids': ['202400015']
+        })
+        self.assertEqual(response.status_code, 201, response.get_json())
+
+    def listed(self, client):
+        return [c['classroom_id'] for c in client.get('/api/admin/data?limit=500').get_json()['classrooms']]
+
+    def test_reads_use_snapshot_until_refresh(self):
+        with self.app.app_context():
+            self.assertIn(READ_ENGINE, self.app.extensions)
+            db.session.add(Classroom(id='LATE_ROOM', name='Late Room',
+                                     time_window_start=time(9, 0), time_window_end=time(10, 0)))
+            db.session.commit()
+
+            # Writes go to the primary, decorated reads to the (older) snapshot
+            self.assertIsNotNone(db.session.get(Classroom, 'LATE_ROOM'))
+            self.assertNotIn('LATE_ROOM', attendance_manager.get_all_admin_data())
+
+            self.assertTrue(read_snapshot.refresh(force=True))
+            self.assertIn('LATE_ROOM', attendance_manager.get_all_admin_data())
+
+    def test_read_your_writes_is_per_client(self):
+        self.add_classroom(self.client, 'RYW_ROOM')
+        # The writing client reads the primary...
+        self.assertIn('RYW_ROOM', self.listed(self.client))
+
+        # ...another client still sees the snapshot
+        other = self.app.test_client()
+        with other.session_transaction() as sess:
+            sess['user_id'] = 2
+            sess['role'] = 'Admin'
+        self.assertNotIn('RYW_ROOM', self.listed(other))
+
+if __name__ == '__main__':
+    unittest.main()
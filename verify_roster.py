@@ -0,0 +1,88 @@
+
+import unittest
+import os
+from datetime import time
+from app import create_app
+from app.models import db, Classroom
+from app.attendance_manager import attendance_manager
+from app.scanner_tokens import scanner_tokens
+
+class TestScannerRoster(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+        with self.app.app_context():
+            db.session.add(Classroom(id='ROSTER_ROOM', name='Roster Room',
+                                     time_window_start=time(8, 0), time_window_end=time(18, 0)))
+            db.session.commit()
+            for student_id in ('R1', 'R2', 'R3'):
+                attendance_manager.add_student(student_id, f'Student {student_id}')
+            attendance_manager.enroll_student('R1', 'ROSTER_ROOM')
+            attendance_manager.enroll_student('R2', 'ROSTER_ROOM')
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def roster(self, since=None, **kwargs):
+        url = '/api/scanner/roster?classroom_id=ROSTER_ROOM'
+        if since is not None:
+            url += f'&since={since}'
+        return self.client.get(url, **kwargs)
+
+    def test_full_then_delta(self):
+        full = self.roster().get_json()
+        self.assertTrue(full['full'])
+        self.assertEqual(full['student_ids'], ['R1', 'R2'])
+
+        # Nothing changed: empty delta at the same version
+        delta = self.roster(full['version']).get_json()
+        self.assertEqual((delta['added'], delta['removed'], delta['version']), ([], [], full['version']))
+
+        with self.app.app_context():
+            attendance_manager.enroll_student('R3', 'ROSTER_ROOM')
+            attendance_manager.unenroll_student('R1', 'ROSTER_ROOM')
+            # Added then removed again: only the final state is sent
+            attendance_manager.unenroll_student('R3', 'ROSTER_ROOM')
+            attendance_manager.enroll_student('R3', 'ROSTER_ROOM')
+            self.assertEqual(attendance_manager.get_classroom_stats('ROSTER_ROOM')['total_enrolled'], 2)
+
+        delta = self.roster(full['version']).get_json()
+        self.assertFalse(delta['full'])
+        self.assertEqual(delta['added'], ['R3'])
+        self.assertEqual(delta['removed'], ['R1'])
+        self.assertGreater(delta['version'], full['version'])
+
+    def test_unknown_version_gets_full_roster(self):
+        response = self.roster(10 ** 6).get_json()
+        self.assertTrue(response['full'])
+        self.assertEqual(response['student_ids'], ['R1', 'R2'])
+
+    def test_scanner_token_auth(self):
+        with self.client.session_transaction() as sess:
+            sess['role'] = 'Student'
+        self.assertEqual(self.roster().status_code, 403)
+
+        with self.app.app_context():
+            token = scanner_tokens.issue('ROSTER_ROOM')
+            other = scanner_tokens.issue('OTHER_ROOM')
+        self.assertEqual(self.roster(headers={'X-Scanner-Token': token}).status_code, 200)
+        self.assertEqual(self.roster(headers={'X-Scanner-Token': other}).status_code, 403)
+
+    def test_unenroll_endpoint(self):
+        response = self.client.delete('/api/enroll', json={'student_id': 'R2', 'classroom_id': 'ROSTER_ROOM'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.delete('/api/enroll', json={'student_id': 'R2', 'classroom_id': 'ROSTER_ROOM'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.roster().get_json()['student_ids'], ['R1'])
+
+if __name__ == '__main__':
+    unittest.main()
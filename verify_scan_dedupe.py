@@ -0,0 +1,59 @@
+
+import unittest
+import os
+from datetime import timedelta
+from sqlalchemy import event
+from app import create_app
+from app.models import db, AttendanceRecord
+from app.attendance_manager import attendance_manager
+from app.scan_dedupe import scan_dedupe
+
+class TestScanDedupe(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def test_duplicate_rejected_without_query(self):
+        with self.app.app_context():
+            self.assertTrue(attendance_manager.mark_attendance('S1', 'ROOM_A'))
+
+            statements = []
+            def count_statement(conn, cursor, statement, *args):
+                statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                self.assertFalse(attendance_manager.mark_attendance('S1', 'ROOM_A'))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+            self.assertEqual(statements, [])
+            self.assertEqual(AttendanceRecord.query.count(), 1)
+
+    def test_warmed_from_todays_records(self):
+        with self.app.app_context():
+            attendance_manager.mark_attendance('S2', 'ROOM_B')
+            scan_dedupe.clear()
+            self.assertFalse(scan_dedupe.contains('S2', 'ROOM_B'))
+
+            scan_dedupe.init_app(self.app)
+            self.assertTrue(scan_dedupe.contains('S2', 'ROOM_B'))
+
+    def test_cleared_at_midnight(self):
+        with self.app.app_context():
+            attendance_manager.mark_attendance('S3', 'ROOM_C')
+            self.assertTrue(scan_dedupe.contains('S3', 'ROOM_C'))
+
+            # Pretend the set was built yesterday
+            scan_dedupe._day = scan_dedupe._day - timedelta(days=1)
+            self.assertFalse(scan_dedupe.contains('S3', 'ROOM_C'))
+            self.assertEqual(len(scan_dedupe), 0)
+
+if __name__ == '__main__':
+    unittest.main()
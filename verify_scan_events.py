@@ -0,0 +1,135 @@
+
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+from unittest import mock
+import pytz
+from app import create_app
+from app.models import db, Classroom, AttendanceRecord
+from app.attendance_manager import attendance_manager
+from app.scan_events import ScanEventJournal, scan_events, replay_attendance
+from app.scanner_tokens import scanner_tokens
+
+class TestScanEventJournal(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.journal = ScanEventJournal()
+        self.journal.init_app(SimpleNamespace(instance_path=self.dir, config={
+            'SCAN_EVENTS_DIR': self.dir, 'SCAN_EVENTS_SEGMENT_BYTES': 512
+        }))
+
+    def tearDown(self):
+        self.journal.shutdown()
+        shutil.rmtree(self.dir)
+
+    def test_segments_rotate_and_read_in_order(self):
+        # Rotation is checked per written batch
+        for i in range(40):
+            self.journal.append('accepted', student_id=f'S{i}', classroom_id='ROOM')
+            if i % 5 == 4:
+                self.journal.flush()
+
+        self.assertGreater(len(self.journal.segments()), 1)
+        events = [event['student_id'] for _, event in self.journal.read()]
+        self.assertEqual(events, [f'S{i}' for i in range(40)])
+
+    def test_cursor_resumes_and_skips_partial_line(self):
+        for i in range(3):
+            self.journal.append('rejected', 'Student not found', student_id=f'S{i}')
+        self.journal.flush()
+
+        page = self.journal.tail(self.journal.start_cursor(), limit=2)
+        self.assertEqual([e['student_id'] for e in page['events']], ['S0', 'S1'])
+
+        # A write in progress (no trailing newline) is not returned until it is complete
+        with open(self.journal._path(self.journal.segments()[-1]), 'a') as segment:
+            segment.write('{"decision":"accep')
+        page = self.journal.tail(page['cursor'])
+        self.assertEqual([e['student_id'] for e in page['events']], ['S2'])
+        self.assertEqual(self.journal.tail(page['cursor'])['events'], [])
+
+class TestScanEventRoutes(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        os.environ['SCAN_EVENTS_DIR'] = self.dir
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+        with self.app.app_context():
+            db.session.add(Classroom(id='EVENT_ROOM', name='Event Room',
+                                     time_window_start=time(0, 0), time_window_end=time(23, 59, 59)))
+            db.session.commit()
+            attendance_manager.add_student('EV1', 'Event Student')
+            attendance_manager.enroll_student('EV1', 'EVENT_ROOM')
+
+    def tearDown(self):
+        scan_events.shutdown()
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+        del os.environ['SCAN_EVENTS_DIR']
+        shutil.rmtree(self.dir)
+
+    def test_decisions_journaled_and_replayed(self):
+        cursor = self.client.get('/api/scan-events').get_json()['cursor']
+        self.assertEqual(self.client.post('/scan_qr', json={'student_id': 'EV1'}).status_code, 200)
+        self.assertEqual(self.client.post('/scan_qr', json={'student_id': 'EV1'}).status_code, 429)
+        scan_events.flush()
+
+        events = self.client.get(f'/api/scan-events?cursor={cursor}').get_json()['events']
+        self.assertEqual([(e['decision'], e['http_status']) for e in events], [('accepted', 200), ('rejected', 429)])
+        self.assertEqual((events[0]['student_id'], events[0]['classroom_id'], events[0]['source']),
+                         ('EV1', 'EVENT_ROOM', 'qr'))
+        self.assertIsNone(events[0]['reason'])
+        self.assertTrue(events[1]['reason'])
+
+        with self.app.app_context():
+            AttendanceRecord.query.delete()
+            db.session.commit()
+            self.assertEqual(replay_attendance(scan_events)[0], 1)
+            # Replaying again inserts nothing new
+            replay_attendance(scan_events)
+            self.assertEqual(AttendanceRecord.query.filter_by(student_id='EV1').count(), 1)
+
+    def test_offline_scan_replayed_at_capture_time(self):
+        captured = datetime.now(pytz.timezone('Asia/Kolkata')).replace(microsecond=0) - timedelta(minutes=5)
+        with self.app.app_context(), mock.patch('itsdangerous.timed.TimestampSigner.get_timestamp',
+                                                return_value=int(captured.timestamp()) - 300):
+            token = scanner_tokens.issue('EVENT_ROOM', None)
+
+        cursor = self.client.get('/api/scan-events').get_json()['cursor']
+        response = self.client.post('/scan_qr', json={'student_id': 'EV1', 'scanner_token': token,
+                                                      'captured_at': int(captured.timestamp() * 1000)})
+        self.assertEqual(response.status_code, 200)
+        scan_events.flush()
+
+        event = self.client.get(f'/api/scan-events?cursor={cursor}').get_json()['events'][0]
+        self.assertEqual(event['scanned_at'], captured.replace(tzinfo=None).isoformat())
+        self.assertNotEqual(event['ts'], event['scanned_at'])
+
+        with self.app.app_context():
+            AttendanceRecord.query.delete()
+            db.session.commit()
+            replay_attendance(scan_events, cursor)
+            record = AttendanceRecord.query.filter_by(student_id='EV1').one()
+            self.assertEqual(record.timestamp, captured.replace(tzinfo=None))
+
+    def test_tail_requires_staff(self):
+        with self.client.session_transaction() as sess:
+            sess['role'] = 'Student'
+        self.assertEqual(self.client.get('/api/scan-events').status_code, 403)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/scan-events?cursor=abc').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from unittest import mock
+from app import create_app
+from app.models import AttendanceRecord
+from app.attendance_manager import attendance_manager
+from app import scan_queue as scan_queue_module
+from app.scan_queue import scan_queue
+
+class TestWriteBehindQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.journal_dir = os.path.join(self.tmp_dir, 'journal')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(self.tmp_dir, 'test.db')}"
+        os.environ['SCAN_WRITE_BEHIND'] = '1'
+        os.environ['SCAN_JOURNAL_DIR'] = self.journal_dir
+        # Long interval so the test controls when flushes happen
+        os.environ['SCAN_FLUSH_INTERVAL'] = '3600'
+
+    def tearDown(self):
+        scan_queue.shutdown()
+        for key in ('DATABASE_URL', 'SCAN_WRITE_BEHIND', 'SCAN_JOURNAL_DIR', 'SCAN_FLUSH_INTERVAL'):
+            os.environ.pop(key, None)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_scans_are_batched(self):
+        app = create_app()
+        with app.app_context():
+            self.assertTrue(attendance_manager.mark_attendance('S1', 'ROOM_A'))
+            self.assertTrue(attendance_manager.mark_attendance('S2', 'ROOM_A'))
+            # Duplicate is rejected from the in-memory state before it is flushed
+            self.assertFalse(attendance_manager.mark_attendance('S1', 'ROOM_A'))
+            self.assertEqual(AttendanceRecord.query.count(), 0)
+
+            self.assertEqual(scan_queue.flush(), 2)
+            self.assertEqual(AttendanceRecord.query.count(), 2)
+
+            # Already in the database now, so still rejected
+            self.assertFalse(attendance_manager.mark_attendance('S1', 'ROOM_A'))
+
+    def test_orphaned_journal_replayed_on_startup(self):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        entry = {
+            'student_id': 'S9',
+            'classroom_id': 'ROOM_B',
+            'timestamp': datetime.now().isoformat(),
+            'ai_headcount': None,
+            'qr_scan_count': None
+        }
+        orphan_path = os.path.join(self.journal_dir, 'scans-999999.ndjson')
+        with open(orphan_path, 'w') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.write(json.dumps(entry) + '\n')  # Replayed duplicates must not double-insert
+            f.write('{"student_id": "S1')      # Torn write from a crash
+
+        app = create_app()
+        with app.app_context():
+            records = AttendanceRecord.query.filter_by(student_id='S9').all()
+            self.assertEqual(len(records), 1)
+            self.assertEqual(records[0].classroom_id, 'ROOM_B')
+        self.assertFalse(os.path.exists(orphan_path))
+
+    def test_journal_compacted_while_scans_keep_arriving(self):
+        app = create_app()
+        commit = scan_queue_module.commit_scan_entries
+
+        def commit_during_rush(entries):
+            # A scan accepted while the batch is being committed
+            scan_queue.enqueue('S_LATE', 'ROOM_A', datetime.now())
+            commit(entries)
+
+        with app.app_context():
+            for student_id in ('S1', 'S2', 'S3'):
+                self.assertTrue(attendance_manager.mark_attendance(student_id, 'ROOM_A'))
+            with mock.patch.object(scan_queue_module, 'commit_scan_entries', side_effect=commit_during_rush):
+                self.assertEqual(scan_queue.flush(), 3)
+
+            journal_path = os.path.join(self.journal_dir, f'scans-{os.getpid()}.ndjson')
+            with open(journal_path) as f:
+                self.assertEqual([json.loads(line)['student_id'] for line in f], ['S_LATE'])
+
+            # Later appends go to the compacted journal
+            self.assertTrue(attendance_manager.mark_attendance('S4', 'ROOM_A'))
+            with open(journal_path) as f:
+                self.assertEqual([json.loads(line)['student_id'] for line in f], ['S_LATE', 'S4'])
+
+            self.assertEqual(scan_queue.flush(), 2)
+            self.assertEqual(os.path.getsize(journal_path), 0)
+            self.assertEqual(AttendanceRecord.query.count(), 5)
+
+if __name__ == '__main__':
+    unittest.main()
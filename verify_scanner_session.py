@@ -0,0 +1,112 @@
+
+import unittest
+import os
+from datetime import datetime, time, timedelta
+from unittest import mock
+import pytz
+from app import create_app
+from app.models import db, Classroom, AttendanceRecord
+from app.attendance_manager import attendance_manager
+from app.scanner_tokens import scanner_tokens
+from app.rate_limit import scan_rate_limiter
+
+class TestScannerSession(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+        with self.app.app_context():
+            for room_id in ('ROOM_A', 'ROOM_B'):
+                db.session.add(Classroom(id=room_id, name=room_id,
+                                         time_window_start=time(0, 0), time_window_end=time(23, 59, 59)))
+            db.session.commit()
+            attendance_manager.add_student('SCAN1', 'Scanner Student')
+            attendance_manager.enroll_student('SCAN1', 'ROOM_B')
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def open_scanner(self, **body):
+        return self.client.post('/api/scanner/session', json=body)
+
+    def test_bound_scan_routes_to_classroom(self):
+        response = self.open_scanner(classroom_id='ROOM_B')
+        self.assertEqual(response.status_code, 201)
+        token = response.get_json()['scanner_token']
+
+        response = self.client.post('/scan_qr', json={'student_id': 'SCAN1', 'scanner_token': token})
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(response.get_json()['classroom_id'], 'ROOM_B')
+        with self.app.app_context():
+            self.assertEqual(AttendanceRecord.query.filter_by(student_id='SCAN1').one().classroom_id, 'ROOM_B')
+
+    def test_forged_token_rejected(self):
+        token = self.open_scanner(classroom_id='ROOM_B').get_json()['scanner_token']
+        response = self.client.post('/scan_qr', json={'student_id': 'SCAN1', 'scanner_token': token[:-2] + 'xx'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_session_outside_window_rejected(self):
+        tomorrow = (datetime.now(pytz.timezone('Asia/Kolkata')).weekday() + 1) % 7
+        session_id = self.client.post('/api/classroom/ROOM_B/sessions', json={
+            'day_of_week': tomorrow, 'start_time': '00:00', 'end_time': '23:59'
+        }).get_json()['session']['id']
+
+        token = self.open_scanner(classroom_id='ROOM_B', session_id=session_id).get_json()['scanner_token']
+        response = self.client.post('/scan_qr', headers={'X-Scanner-Token': token}, json={'student_id': 'SCAN1'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_open_scanner_validation(self):
+        self.assertEqual(self.open_scanner(classroom_id='NOWHERE').status_code, 404)
+        self.assertEqual(self.open_scanner(classroom_id='ROOM_A', session_id=999).status_code, 404)
+        self.assertEqual(self.open_scanner().status_code, 400)
+
+        response = self.client.get('/student/scanner?classroom_id=ROOM_A')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'SCANNER_TOKEN = "', response.data)
+
+        with self.client.session_transaction() as sess:
+            sess['role'] = 'Student'
+        self.assertEqual(self.open_scanner(classroom_id='ROOM_A').status_code, 403)
+
+    def test_queued_scan_judged_at_capture_time(self):
+        # Captured three hours ago during a session that has since ended
+        captured = datetime.now(pytz.timezone('Asia/Kolkata')).replace(microsecond=0) - timedelta(hours=3)
+        session_id = self.client.post('/api/classroom/ROOM_B/sessions', json={
+            'day_of_week': captured.weekday(),
+            'start_time': f'{captured.hour:02d}:00', 'end_time': f'{captured.hour:02d}:59'
+        }).get_json()['session']['id']
+        with self.app.app_context(), mock.patch('itsdangerous.timed.TimestampSigner.get_timestamp',
+                                                return_value=int(captured.timestamp()) - 600):
+            token = scanner_tokens.issue('ROOM_B', session_id)
+
+        captured_ms = int(captured.timestamp() * 1000)
+        # Repeat posts of one student would otherwise be debounced
+        debounce = mock.patch.object(scan_rate_limiter, 'check_student', return_value=(True, 0))
+        debounce.start()
+        self.addCleanup(debounce.stop)
+        # Too early for the token (issued ten minutes before the capture)
+        response = self.client.post('/scan_qr', json={'student_id': 'SCAN1', 'scanner_token': token,
+                                                      'captured_at': captured_ms - 3600 * 1000})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post('/scan_qr', json={'student_id': 'SCAN1', 'scanner_token': token,
+                                                      'captured_at': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/scan_qr', json={'student_id': 'SCAN1', 'scanner_token': token,
+                                                      'captured_at': captured_ms})
+        self.assertEqual(response.status_code, 200, response.get_json())
+        with self.app.app_context():
+            record = AttendanceRecord.query.filter_by(student_id='SCAN1').one()
+            self.assertEqual(record.timestamp, captured.replace(tzinfo=None))
+            self.assertEqual(record.session_id, session_id)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+
+import unittest
+import os
+from app import create_app
+from app.models import db
+from app.attendance_manager import attendance_manager
+from app.otp_store import otp_store
+
+class TestStudentSearch(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Teacher'
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def _search(self, q):
+        response = self.client.get(f'/api/students/search?q={q}')
+        self.assertEqual(response.status_code, 200)
+        return [s['id'] for s in response.get_json()['students']]
+
+    def test_add_student_is_searchable(self):
+        with self.app.app_context():
+            attendance_manager.add_student('202411111', 'Karma Dorjee', email='karma_202411111@smit.smu.edu.in')
+        self.assertEqual(self._search('karm'), ['202411111'])
+        self.assertEqual(self._search('2024111'), ['202411111'])
+        self.assertEqual(self._search('karma dor'), ['202411111'])
+
+    def test_rename_updates_index(self):
+        with self.app.app_context():
+            attendance_manager.add_student('S100', 'Pema Lhamo')
+            attendance_manager.add_student('S100', 'Sonam Lhamo')
+        self.assertEqual(self._search('pema'), [])
+        self.assertEqual(self._search('sonam'), ['S100'])
+
+    def test_verify_otp_auto_created_student_is_searchable(self):
+        email = 'dawa_tsering_202477777@smit.smu.edu.in'
+        otp = otp_store.issue(email)
+        self.client.post('/verify', json={'email': email, 'otp': otp})
+        self.assertEqual(self._search('tsering'), ['202477777'])
+
+    def test_seeded_students_indexed_and_operators_escaped(self):
+        # Auto-seeded student exists before the index is first built
+        self.assertEqual(self._search('tenzin'), ['202400015'])
+        # FTS query syntax in user input is treated as plain text
+        self.assertEqual(self._search('tenzin OR NEAR('), [])
+
+    def test_missing_query_rejected(self):
+        self.assertEqual(self.client.get('/api/students/search').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+
+import unittest
+import os
+from datetime import datetime, time
+from sqlalchemy import event
+from app import create_app
+from app.models import db, Classroom, AttendanceRecord
+from app.attendance_manager import attendance_manager
+from app.timetable import timetable
+
+# 2026-03-02 is a Monday
+MONDAY = datetime(2026, 3, 2)
+
+class TestTimetable(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['role'] = 'Admin'
+
+        with self.app.app_context():
+            # Auto-seeded classrooms would also be open during the day
+            Classroom.query.delete()
+            db.session.add(Classroom(id='HALL', name='Lecture Hall',
+                                     time_window_start=time(8, 0), time_window_end=time(18, 0)))
+            db.session.add(Classroom(id='LAB', name='Lab',
+                                     time_window_start=time(8, 0), time_window_end=time(18, 0)))
+            db.session.commit()
+            timetable.rebuild()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        del os.environ['DATABASE_URL']
+
+    def add_session(self, classroom_id, **body):
+        response = self.client.post(f'/api/classroom/{classroom_id}/sessions', json=body)
+        self.assertEqual(response.status_code, 201, response.get_json())
+        return response.get_json()['session']['id']
+
+    def test_daily_window_without_sessions(self):
+        with self.app.app_context():
+            slot = timetable.resolve('LAB', MONDAY.replace(hour=9))
+            self.assertIsNotNone(slot)
+            self.assertIsNone(slot.session_id)
+            self.assertIsNone(timetable.resolve('LAB', MONDAY.replace(hour=19)))
+
+    def test_sessions_replace_daily_window(self):
+        maths = self.add_session('HALL', day_of_week=0, start_time='09:00', end_time='10:00', subject='Maths')
+        physics = self.add_session('HALL', day_of_week=0, start_time='11:00', end_time='12:00', subject='Physics',
+                                   term_start='2026-01-05', term_end='2026-04-30')
+
+        with self.app.app_context():
+            self.assertEqual(timetable.resolve('HALL', MONDAY.replace(hour=9, minute=30)).session_id, maths)
+            self.assertEqual(timetable.resolve('HALL', MONDAY.replace(hour=10)).session_id, maths)
+            self.assertIsNone(timetable.resolve('HALL', MONDAY.replace(hour=10, minute=0, second=30)))
+            self.assertEqual(timetable.resolve('HALL', MONDAY.replace(hour=11, minute=15)).session_id, physics)
+            # Outside the term and on other weekdays the room is closed
+            self.assertIsNone(timetable.resolve('HALL', datetime(2026, 5, 4, 11, 15)))
+            self.assertIsNone(timetable.resolve('HALL', datetime(2026, 3, 3, 9, 30)))
+
+            # A timetabled session wins over another room's daily window
+            active = attendance_manager.get_active_session(MONDAY.replace(hour=9, minute=5))
+            self.assertEqual((active.classroom_id, active.subject), ('HALL', 'Maths'))
+            self.assertEqual(attendance_manager.get_active_classroom(MONDAY.replace(hour=10, minute=30)), 'LAB')
+
+    def test_edits_recompile_incrementally(self):
+        session_id = self.add_session('HALL', day_of_week=0, start_time='09:00', end_time='10:00')
+
+        with self.app.app_context():
+            statements = []
+            def count_statement(conn, cursor, statement, *args):
+                statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                # The first lookup after the edit recompiles only the edited room...
+                self.assertIsNotNone(timetable.resolve('HALL', MONDAY.replace(hour=9)))
+                self.assertTrue(statements)
+                self.assertTrue(all('IN (?)' in statement for statement in statements))
+                # ...and later lookups do not touch the database
+                del statements[:]
+                self.assertIsNotNone(timetable.resolve('HALL', MONDAY.replace(hour=9)))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_statement)
+            self.assertEqual(statements, [])
+
+        response = self.client.put(f'/api/sessions/{session_id}',
+                                   json={'day_of_week': 0, 'start_time': '14:00', 'end_time': '15:00'})
+        self.assertEqual(response.status_code, 200)
+        with self.app.app_context():
+            self.assertIsNone(timetable.resolve('HALL', MONDAY.replace(hour=9)))
+            self.assertEqual(timetable.resolve('HALL', MONDAY.replace(hour=14, minute=30)).session_id, session_id)
+
+        self.assertEqual(self.client.delete(f'/api/sessions/{session_id}').status_code, 200)
+        with self.app.app_context():
+            # Back to the daily window
+            self.assertIsNone(timetable.resolve('HALL', MONDAY.replace(hour=9)).session_id)
+
+    def test_invalid_session_rejected(self):
+        for body in ({'day_of_week': 7, 'start_time': '09:00', 'end_time': '10:00'},
+                     {'day_of_week': 1, 'start_time': '10:00', 'end_time': '09:00'},
+                     {'day_of_week': 1, 'start_time': '9am', 'end_time': '10:00'}):
+            response = self.client.post('/api/classroom/HALL/sessions', json=body)
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/classroom/NOWHERE/sessions',
+                                    json={'day_of_week': 1, 'start_time': '09:00', 'end_time': '10:00'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_attendance_keyed_to_session(self):
+        first = self.add_session('HALL', day_of_week=0, start_time='09:00', end_time='10:00')
+        second = self.add_session('HALL', day_of_week=0, start_time='11:00', end_time='12:00')
+
+        with self.app.app_context():
+            self.assertTrue(attendance_manager.mark_attendance('S1', 'HALL', MONDAY.replace(hour=9), session_id=first))
+            self.assertFalse(attendance_manager.mark_attendance('S1', 'HALL', MONDAY.replace(hour=9, minute=5),
+                                                                session_id=first))
+            self.assertTrue(attendance_manager.mark_attendance('S1', 'HALL', MONDAY.replace(hour=11), session_id=second))
+            self.assertEqual(sorted(r.session_id for r in AttendanceRecord.query.all()), sorted([first, second]))
+
+if __name__ == '__main__':
+    unittest.main()